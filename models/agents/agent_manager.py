@@ -12,8 +12,10 @@ from data.input_data.agent_data.agent_localization_data.importer_exporter_cities
 from models.agents.exporter_agent import ExporterAgent
 from models.industrial_building.factory_manager import FactoryManager
 from models.industrial_building.retail_store_manager import RetailStoreManager
+from models.delivery.delivery import Delivery
 from models.delivery.delivery_manager import DeliveryManager
 
+from network.profile_router import find_profile_routes
 from network.simulation_graph import SimulationGraph
 from utils.graph_helper import haversine_km
 
@@ -119,7 +121,8 @@ class AgentManager:
 
     def initialize_agents(self, graph: SimulationGraph) -> dict[str, list]:
         """
-        Initialize all agent types, attach them to the network and compute routes.
+        Initialize all agent types, attach them to the network and compute routes priced
+        with every exporter's courier company.
 
         Returns
         -------
@@ -189,9 +192,13 @@ class AgentManager:
             self.product_importers.append(importer)
         return self.product_importers
 
-    def initialize_routes(self, graph: SimulationGraph, exporters: list[ExporterAgent], importers: list[BaseAgent]) -> list[dict]:
+    def initialize_routes(self, graph: SimulationGraph, exporters: list[ExporterAgent],
+                          importers: list[BaseAgent]) -> list[dict]:
         """
-        Compute cheapest routes between exporter and importer pairs.
+        Compute cheapest routes between exporter and importer pairs, every route priced with
+        the per-km rates of its exporter's courier company. They size the parcels of the
+        deliveries; the capacity-aware flow solve then fixes the final routes, which are
+        written back with `update_routes`.
 
         Parameters
         ----------
@@ -206,43 +213,66 @@ class AgentManager:
         -------
         list[dict]
             A list of route metadata dictionaries, each containing:
-            - agent_id, exporter_node, importer_node, path, total_distance_km,
-              estimated_cost, estimated_lead_time_days, etc. (as returned by
-              `ExporterAgent.find_cheapest_path`).
+            - agent_id, exporter_node, importer_node, path, edges, total_distance_km,
+              estimated_cost, estimated_lead_time_days, min_capacity, etc. (as returned by
+              `ExporterAgent.find_cheapest_path`; `edges` are routing snapshot indices,
+              valid for the `snapshot_checksum` saved next to them in paths.pkl).
         """
+        pairs = [(exp.node_id, imp.node_id) for exp, imp in zip(exporters, importers)]
+        # one search per distinct exporter node answers all of its importers and couriers
+        routes = find_profile_routes(graph, pairs, [exp.courier_params() for exp in exporters])
+
         results = []
+        for exp, imp, route in zip(exporters, importers, routes):
+            results.append({
+                "agent_id": exp.agent_id,
+                "exporter_node": exp.node_id,
+                "importer_node": imp.node_id,
+                **route
+            })
+
+        self.save_routes(graph, results)
+        #print(results)
+
+        return results
+
+    def update_routes(self, graph: SimulationGraph, routes: list[dict], deliveries: list[Delivery]) -> None:
+        """
+        Rewrites route descriptions from the final routes of their deliveries (e.g. after the
+        capacity-aware flow solve moved them) and saves them to paths.pkl, so the tables and
+        the file describe the routes the deliveries actually take.
 
-        # graph_undirected = SimulationGraph(default_capacity=graph.default_capacity,
-        #                                    default_price=graph.default_price,
-        #                                    incoming_graph_data=graph)
-
-        for _, (exp, imp) in enumerate(zip(exporters, importers), start=0):
-            # print(exp)
-            try:
-                params = {
-                    "default_unit_cost": courier_companies[exp.courier_company]
-                }
-                result = exp.find_cheapest_path(
-                    graph, dest_node=imp.node_id, params=params)
-                results.append({
-                    "agent_id": exp.agent_id,
-                    "exporter_node": exp.node_id,
-                    "importer_node": imp.node_id,
-                    **result
-                })
-                # print(f"✅ Agent {i}: {exp_node} → {imp_node} | dystans: {result['total_distance_km']:.2f} km | koszt: {result['estimated_cost']:.2f}")
-            except Exception as e:
-                print(f"❌ {exp.node_id} → {imp.node_id} | błąd: {e}")
+        Parameters
+        ----------
+        graph : SimulationGraph
+            Network the deliveries are routed on.
+        routes : list[dict]
+            Route descriptions returned by `initialize_routes`; updated in-place.
+        deliveries : list[Delivery]
+            Deliveries initialized from `routes`, in the same order.
+        """
+        snapshot = graph.get_routing_snapshot()
+        for route, delivery in zip(routes, deliveries):
+            route.update({
+                "path": delivery.route,
+                "edges": delivery.edges_on(snapshot),
+                "total_distance_km": delivery.length,
+                "total_weight": delivery.cost,
+                "estimated_cost": delivery.cost,
+                "estimated_lead_time_days": delivery.lead_time,
+                "min_capacity": delivery.capacity
+            })
+        self.save_routes(graph, routes)
 
+    def save_routes(self, graph: SimulationGraph, results: list[dict]) -> None:
         data = {
             "exporter_node": [r["exporter_node"] for r in results],
             "importer_node": [r["importer_node"] for r in results],
-            "results": results
+            "results": results,
+            # indeksy krawędzi są ważne tylko dla tej samej migawki grafu
+            "snapshot_checksum": graph.get_routing_snapshot().checksum()
         }
         self.save_paths_to_pkl(data)
-        #print(results)
-
-        return results
 
     def save_paths_to_pkl(self, data: dict):
         path = Path(__file__).parent.parent.parent / "data" / "input_data" / "network_data" / "paths.pkl"
@@ -2,8 +2,12 @@ from models.agents.base_agent import BaseAgent
 from typing import Optional, Dict, Any, Union
 import networkx as nx
 
+from data.input_data.delivery_data.courier_companies import courier_companies
 from models.product.product import Product
+from network.router import find_route
+from network.transport_types import SearchStrategy
 from utils.find_quantity_by_product import find_quantity_by_product
+from utils.graph_helper import parse_maxspeed
 
 
 class ExporterAgent(BaseAgent):
@@ -34,6 +38,11 @@ class ExporterAgent(BaseAgent):
         self.unit_demand = 0
         self.finances = float(finances)
 
+    def courier_params(self) -> Dict[str, Any]:
+        """Routing parameters pricing edges with the per-km rates of the exporter's courier company."""
+        prices = courier_companies.get(self.courier_company)
+        return {"default_unit_cost": prices} if prices else {}
+
     def to_dict(self):
         return {
             "agent_id": self.agent_id,
@@ -86,173 +95,29 @@ class ExporterAgent(BaseAgent):
         ms może być: int/float, string ('50', '50 mph', '50;70'), list ['50','70'] itd.
         Zwraca speed w km/h lub None jeśli nie da się sparsować.
         """
-        if ms is None:
-            return None
-
-        if isinstance(ms, (int, float)):
-            return float(ms)
-
-        if isinstance(ms, (list, tuple)):
-            vals = [ExporterAgent._parse_maxspeed(x) for x in ms]
-            valid_vals = [v for v in vals if v is not None]
-            return max(valid_vals) if valid_vals else None
-
-        if isinstance(ms, str):
-            s = ms.strip().lower()
-            s = s.replace("[", "").replace("]", "").replace(
-                "(", "").replace(")", "").replace(" ", "")
-
-            def get_num(val_str):
-                try:
-                    return float(''.join(c for c in val_str if (c.isdigit() or c == '.')))
-                except ValueError:
-                    return None
-
-            is_mph = "mph" in s
-
-            for sep in [";", ",", "|"]:
-                if sep in s:
-                    parts = [get_num(p) for p in s.split(sep) if p]
-                    valid = [p for p in parts if p is not None]
-                    val = max(valid) if valid else None
-                    return val * 1.60934 if (val and is_mph) else val
-
-            val = get_num(s)
-            if val is not None:
-                return val * 1.60934 if is_mph else val
-
-        return None
+        return parse_maxspeed(ms)
 
-    def find_cheapest_path(self, sim_graph, dest_node: int, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def find_cheapest_path(self, sim_graph, dest_node: int, params: Optional[Dict[str, Any]] = None,
+                           strategy: SearchStrategy | str | None = None) -> Dict[str, Any]:
         """
-        Finds the cheapest path based on monetary cost (length_km * unit_cost) on the *active* graph.
-
-        - If `sim_graph` has get_active_graph(), routing is done on that active subgraph.
-        - If no path exists in the active graph but exists in the full graph, we treat it
-          as a disruption-caused disconnection and return a structured "no path" result.
+        Finds the cheapest path based on monetary cost (length_km * unit_cost).
+
+        - Routing runs on the array-backed `RoutingSnapshot` of `sim_graph`. A `SimulationGraph`
+          keeps its snapshot between calls; any other networkx graph gets a one-off snapshot.
+        - Inactive nodes and edges are skipped through the masks of the graph's `ActiveView`,
+          so there is no need to pass an active copy of the graph.
+        - `strategy` selects the search ("dijkstra", "bidirectional" or "contraction_hierarchy").
+          By default the graph's contraction hierarchy is used if attached, otherwise
+          bidirectional Dijkstra; all strategies return the same cost.
+        - If no path exists, an empty dict is returned.
+        - For many destinations at once use `network.router.find_routes`, which shares
+          one shortest-path tree per source.
         """
-        if params is None:
-            params = {}
-
-        driving_hours = float(params.get("driving_hours_per_day", 24.0))
-        # default_speed = float(params.get("default_speed_kmh", 60.0))
-
-        prices = {
-            "price_per_km_land": 1.0,
-            "price_per_km_air": 5.0,
-            "price_per_km_sea": 0.5
-        }
-        speed_land_default = 60.0
-        speed_air_default = 800.0
-        speed_sea_default = 35.0
-
         if sim_graph is None or nx is None:
             return {"error": "Graph or NetworkX not available"}
 
-        def get_edge_mode(edge_data):
-            """Returns 'air', 'sea', or 'land' based on OSM tags."""
-            if edge_data.get("type") == "airline_route":
-                return "air"
-            if edge_data.get("type") == "sea_route":
-                return "sea"
-
-            if edge_data.get("route") == "ferry":
-                return "sea"
-            if "aeroway" in edge_data:
-                return "air"
-
-            return "land"
-
-        def weight_function(u, v, d):
-            if not sim_graph.nodes[u].get("active", True) or not sim_graph.nodes[v].get("active", True)\
-                    or not d.get("active", True):
-                return float("inf")  # traktuj jako niedostępne
-
-            if d.get("active") is False:
-                return float("inf")
-
-            mode = get_edge_mode(d)
-            if mode == "air":
-                unit_cost = prices["price_per_km_air"]
-            elif mode == "sea":
-                unit_cost = prices["price_per_km_sea"]
-            else:
-                unit_cost = prices["price_per_km_land"]
-
-            return d.get('cost', unit_cost)
-
         try:
-            if self.node_id not in sim_graph:
-                raise nx.NetworkXNoPath(f"source node {self.node_id} not in routing graph")
-            if dest_node not in sim_graph:
-                raise nx.NetworkXNoPath(f"target node {dest_node} not in routing graph")
-
-            # path = nx.shortest_path(
-            #     sim_graph,
-            #     source=self.node_id,
-            #     target=dest_node,
-            #     weight='cost',
-            # )
-            path = nx.dijkstra_path(nx.MultiGraph(sim_graph), self.node_id, dest_node, weight="cost")
-
-            #path = sim_graph.astar(start_node=self.node_id, end_node=dest_node)
-
-            total_distance_km = 0.0
-            total_money_cost = 0.0
-            total_lead_time_days = 0.0
-            #print(len(path))
-
-            for i in range(len(path) - 1):
-                u = path[i]
-                v = path[i + 1]
-                edges_data = sim_graph.get_edge_data(u, v)
-                if not edges_data:
-                    continue  # Should not happen, but be defensive
-
-                best_edge = None
-                best_cost_val = float("inf")
-                for key, attr in edges_data.items():
-                    w = weight_function(u, v, attr)
-                    if w < best_cost_val:
-                        best_cost_val = w
-                        best_edge = attr
-
-                if best_edge is None:
-                    continue
-
-                length_m = best_edge.get("length", 0.0)
-                dist_km = length_m / 1000.0
-                mode = get_edge_mode(best_edge)
-
-                if mode == "land":
-                    ms = self._parse_maxspeed(best_edge.get("maxspeed"))
-                    speed = ms if (ms and ms > 0) else speed_land_default
-                    hours_driving = dist_km / speed
-
-                    if driving_hours > 0:
-                        total_lead_time_days += (hours_driving / driving_hours)
-                    else:
-                        total_lead_time_days += (hours_driving / 24.0)
-                elif mode == "air":
-                    speed = speed_air_default
-                    hours_flying = dist_km / speed
-                    total_lead_time_days += (hours_flying / 24.0)
-                elif mode == "sea":
-                    speed = speed_sea_default
-                    hours_sailing = dist_km / speed
-                    total_lead_time_days += (hours_sailing / 24.0)
-
-                total_distance_km += dist_km
-                total_money_cost += best_cost_val
-
-            return {
-                "method": "multimodal_cost_min",
-                "path": path,
-                "total_weight": total_money_cost,
-                "estimated_cost": total_money_cost,
-                "total_distance_km": total_distance_km,
-                "estimated_lead_time_days": total_lead_time_days,
-            }
+            return find_route(sim_graph, self.node_id, dest_node, params, strategy)
 
         except nx.NetworkXNoPath:
             return {}
@@ -2,6 +2,9 @@ import numpy as np
 
 from models.agents.exporter_agent import ExporterAgent
 from models.product.product import Product
+from network.active_view import ActiveView
+from network.router import bottleneck_capacity
+from network.routing_snapshot import RoutingSnapshot
 from network.simulation_graph import SimulationGraph
 
 
@@ -15,8 +18,8 @@ class Delivery:
             ID of the node where the delivery starts (exporter).
         end_node_id : int
             ID of the node where the delivery ends (importer).
-        route : list[int]
-            Ordered list of node IDs representing the path.
+        edges : np.ndarray | None
+            Collapsed edge indices (int32) of the path in `snapshot`, from start to end.
         length : float
             Total route distance in kilometers.
         cost : float
@@ -27,16 +30,22 @@ class Delivery:
             A list of `(product, quantity)` pairs.
         disrupted : bool, optional
             Flag indicating whether the delivery is currently disrupted.
+        snapshot : RoutingSnapshot, optional
+            Routing snapshot `edges` refer to; None for a delivery without a route.
+
+        The node path is not stored: `route` materializes the list of node IDs from the
+        edge array on access, which only the map and analysis code needs. `to_dict` writes
+        both, with the checksum of the snapshot the edge indices belong to.
     """
-    def __init__(self, delivery_id: int, start_node_id: int, end_node_id: int, route: list[int], length: float,
+    def __init__(self, delivery_id: int, start_node_id: int, end_node_id: int, edges: np.ndarray, length: float,
                  cost: float, lead_time: float, parcel: list[tuple[Product, int]], disrupted: bool = False,
-                 is_product: bool = True):
+                 is_product: bool = True, snapshot: RoutingSnapshot = None):
         self.delivery_id = delivery_id
 
         self.start_node_id = start_node_id
         self.end_node_id = end_node_id
 
-        self.route = route
+        self.set_route(edges, snapshot)
         self.length = length
         self.cost = cost
         self.lead_time = lead_time
@@ -53,6 +62,9 @@ class Delivery:
             "start_node_id": self.start_node_id,
             "end_node_id": self.end_node_id,
             "route": self.route,
+            "edges": self.edges.tolist(),
+            # indeksy krawędzi są ważne tylko dla tej samej migawki grafu
+            "snapshot_checksum": self.snapshot.checksum() if self.snapshot is not None else None,
             "length": self.length,
             "cost": self.cost,
             "lead_time": self.lead_time,
@@ -61,12 +73,54 @@ class Delivery:
             "is_product": self.is_product
         }
 
+    @property
+    def route(self) -> list[int | str]:
+        """Node IDs of the route, built from `edges` on every access; [] without a route."""
+        if self.snapshot is None:
+            return []
+        source = self.snapshot.index_of(self.start_node_id)
+        return self.snapshot.to_node_ids(self.snapshot.edge_path_nodes(source, self.edges))
+
+    def set_route(self, edges: np.ndarray | None, snapshot: RoutingSnapshot | None) -> None:
+        if edges is None or snapshot is None:
+            self.edges = np.empty(0, dtype=np.int32)
+            self.snapshot = None
+            return
+        self.edges = np.asarray(edges, dtype=np.int32)
+        self.snapshot = snapshot
+
+    def edges_on(self, snapshot: RoutingSnapshot) -> np.ndarray | None:
+        """
+        `edges` in terms of `snapshot`. A route found on an older snapshot (the network was
+        modified since) is mapped once through its node path and kept on the new one.
+        """
+        if self.snapshot is not snapshot and self.snapshot is not None:
+            self.set_route(snapshot.path_edges(self.route), snapshot)
+        return self.edges if self.snapshot is snapshot else None
+
+    def touches_inactive(self, view: ActiveView) -> bool:
+        """Whether the route uses an inactive node or edge of `view`, checked with two mask gathers."""
+        edges = self.edges_on(view.snapshot)
+        if edges is None:
+            return False
+        if not view.edge_mask[edges].all():
+            return True
+        snapshot = view.snapshot
+        return not (view.node_mask[snapshot.edge_u[edges]].all() and view.node_mask[snapshot.edge_v[edges]].all()
+                    and view.node_mask[snapshot.index_of(self.start_node_id)])
+
     def find_parcel_retail_price(self) -> float:
         retail_price = 0
         for product, quantity in self.parcel:
             retail_price += product.retail_price * quantity
         return retail_price
 
+    def find_parcel_quantity(self) -> float:
+        quantity = 0
+        for _, product_quantity in self.parcel:
+            quantity += product_quantity
+        return quantity
+
     def find_parcel_shipping_cost(self) -> float:
         shipping_prices = {
             # --- HEAVY / BULKY (Furniture & Large Equipment) ---
@@ -99,18 +153,22 @@ class Delivery:
         return parcel_price
 
     def find_minimum_capacity(self, network: SimulationGraph) -> float:
-        minimum_capacity = np.inf
-        for i in range(len(self.route) - 1):
-            if network.edges[self.route[i], self.route[i + 1], 0]['capacity'] < minimum_capacity:
-                minimum_capacity = network.edges[self.route[i], self.route[i + 1], 0]['capacity']
-        return minimum_capacity
+        """
+        Bottleneck capacity of the route, read from the network's routing snapshot
+        (capacity of the cheapest edge between every pair of consecutive nodes).
+        """
+        snapshot = network.get_routing_snapshot()
+        edges = self.edges_on(snapshot)
+        if edges is None:
+            return np.inf
+        return bottleneck_capacity(snapshot, edges)
 
     def reset_delivery(self) -> None:
         """
-        - Clears `route` and sets capacity, length, cost and lead time to zero.
+        - Clears the route and sets capacity, length, cost and lead time to zero.
         - Does not modify `parcel`, `start_node_id`, `end_node_id` or `disrupted`.
         """
-        self.route = []
+        self.set_route(None, None)
         self.capacity = 0
         self.length = 0
         self.cost = 0
@@ -118,7 +176,7 @@ class Delivery:
 
     def update_delivery(self, node_to_exporter: dict[int, ExporterAgent], network: SimulationGraph, disruption: bool) -> None:
         """
-        Updates `route`, `capacity`, `length`, `cost` and `lead_time` in-place based on
+        Updates the route, `capacity`, `length`, `cost` and `lead_time` in-place based on
         the cheapest path to `end_node_id`.
 
         Parameters
@@ -129,12 +187,19 @@ class Delivery:
             Directed simulation graph providing distances, costs and capacities.
         """
         exporter = node_to_exporter[self.start_node_id]
-        # graph_undirected = SimulationGraph(default_capacity=network.default_capacity,
-        #                                    default_price=network.default_price,
-        #                                    incoming_graph_data=network)
-        path = exporter.find_cheapest_path(network, self.end_node_id)
+        path = exporter.find_cheapest_path(network, self.end_node_id, exporter.courier_params())
+        self.apply_route(path, network)
+
+    def apply_route(self, path: dict, network: SimulationGraph) -> None:
+        """
+        Sets the route, `capacity`, `length`, `cost` and `lead_time` from a route description
+        as returned by `ExporterAgent.find_cheapest_path` or `network.router.find_routes`.
+        Only its `edges` are kept, the node `path` is looked up only if they are missing.
+        """
+        snapshot = network.get_routing_snapshot()
+        edges = path.get('edges')
         self.length = path['total_distance_km']
         self.cost = path['estimated_cost']
         self.lead_time = path['estimated_lead_time_days']
-        self.route = path['path']
+        self.set_route(edges if edges is not None else snapshot.path_edges(path['path']), snapshot)
         self.capacity = self.find_minimum_capacity(network)
\ No newline at end of file
@@ -7,6 +7,12 @@ from models.delivery.delivery import Delivery
 from models.product.product import Product
 from models.product.product_manager import ProductManager
 from models.product.raw_material import RawMaterial
+from network.dynamic_router import DynamicRouter
+from network.flow_assignment import FlowAssignment, assign_flows, reassign_flows
+from network.pareto_router import choose_by_time_budget, pareto_routes
+from network.alternative_routes import AlternativeRoutes
+from network.profile_router import find_profile_routes
+from network.router import find_routes, route_result
 from network.simulation_graph import SimulationGraph
 from utils.find_delivery import find_delivery_by_starting_node_id
 from utils.get_dataframe_from_csv import get_dataframe_from_csv
@@ -27,10 +33,19 @@ class DeliveryManager:
             Used to load and categorize products.
         deliveries : list[Delivery]
             All deliveries that have been initialized in the current simulation.
+        alternative_routes : AlternativeRoutes | None
+            Precomputed failover routes of deliveries (see `compute_alternatives`).
+        flow_assignment : FlowAssignment | None
+            Capacity-aware assignment of the deliveries passed to `assign_flows`, kept in step
+            with their routes by `update_deliveries`.
         """
     def __init__(self):
         self.product_manager = ProductManager()
         self.deliveries = []
+        self.alternative_routes = None
+        self.flow_assignment = None
+        self.flow_deliveries = []
+        self.flow_params = []
 
 
     def initialize_deliveries(self, network: SimulationGraph, node_to_exporter: dict[int, ExporterAgent],
@@ -47,6 +62,7 @@ class DeliveryManager:
             - 'exporter_node': int
             - 'importer_node': int
             - 'path': list[int]
+            - 'edges': np.ndarray, optional (snapshot edge indices of 'path', stored by the delivery)
             - 'total_distance_km': float
             - 'estimated_cost': float
             - 'estimated_lead_time_days': float
@@ -60,6 +76,7 @@ class DeliveryManager:
             The list of all deliveries initialized (including any existing ones).
         """
         self.product_manager.sort_products()
+        snapshot = network.get_routing_snapshot()
         deliveries = []
         for agent_dict in paths:
             agent = node_to_exporter[agent_dict['exporter_node']]
@@ -72,15 +89,194 @@ class DeliveryManager:
 
                 p_delivery = find_delivery_by_starting_node_id(self.deliveries, agent_dict['importer_node'])
                 parcel = self.initialize_raw_material_batch(p_delivery.parcel)
+            edges = agent_dict.get('edges')
+            if edges is None:
+                edges = snapshot.path_edges(agent_dict['path'])
             delivery = Delivery(len(self.deliveries), agent_dict['exporter_node'], agent_dict['importer_node'],
-                                agent_dict['path'], agent_dict['total_distance_km'], agent_dict['estimated_cost'],
-                                agent_dict['estimated_lead_time_days'], parcel, False, product_delivery)
+                                edges, agent_dict['total_distance_km'], agent_dict['estimated_cost'],
+                                agent_dict['estimated_lead_time_days'], parcel, False, product_delivery, snapshot)
             delivery.capacity = delivery.find_minimum_capacity(network)
             agent.delivery = delivery
             self.deliveries.append(delivery)
             deliveries.append(delivery)
         return deliveries
 
+    def compute_alternatives(self, deliveries: list[Delivery], network: SimulationGraph,
+                             node_to_exporter: dict[int, ExporterAgent] = None, k: int = 3) -> AlternativeRoutes:
+        """
+        Precomputes up to `k` diverse routes per delivery around its current route (see
+        `network.alternative_routes`), priced with each exporter's courier company, for the
+        failover of `update_deliveries`. Call it once the routes are final, i.e. after
+        `assign_flows`.
+        """
+        snapshot = network.get_routing_snapshot()
+        if self.alternative_routes is None or self.alternative_routes.snapshot is not snapshot:
+            self.alternative_routes = AlternativeRoutes(snapshot, k=k)
+        self.alternative_routes.compute(deliveries, params=self.courier_params(deliveries, node_to_exporter))
+        return self.alternative_routes
+
+    def update_deliveries(self, deliveries: list[Delivery], network: SimulationGraph,
+                          router: DynamicRouter = None,
+                          node_to_exporter: dict[int, ExporterAgent] = None,
+                          lead_time_budget_ratio: float = None) -> None:
+        """
+        Reroutes many deliveries at once on the active network. Deliveries sharing a start
+        node are answered from a single shortest-path tree (see `network.router.find_routes`).
+
+        Parameters
+        ----------
+        deliveries : list[Delivery]
+            Deliveries to reroute; updated in-place.
+        network : SimulationGraph
+            The transportation network, inactive nodes are skipped through its active view.
+        router : DynamicRouter | ParallelRouter, optional
+            If given, routes are read from its incrementally repaired shortest-path trees
+            (or computed by its process pool).
+        node_to_exporter : dict[int, ExporterAgent], optional
+            If given, every route is priced with its exporter's courier company (see
+            `network.profile_router.find_profile_routes`) instead of the edge `cost`.
+        lead_time_budget_ratio : float, optional
+            If given, every delivery takes the cheapest route of its cost / lead-time
+            Pareto frontier (see `network.pareto_router`) whose lead time stays within this
+            multiple of its current `lead_time`, or the fastest one if none does, instead
+            of the cheapest route overall.
+
+        Deliveries with precomputed alternatives take the cheapest one that avoids every
+        inactive node and edge; only the rest are searched. If the deliveries take part in
+        the flow assignment (see `assign_flows`), it is adjusted to the new routes.
+        """
+        rerouted = deliveries
+        deliveries = self.apply_alternative_routes(deliveries, network, node_to_exporter)
+        pairs = [(delivery.start_node_id, delivery.end_node_id) for delivery in deliveries]
+        params = self.courier_params(deliveries, node_to_exporter)
+
+        if lead_time_budget_ratio is not None:
+            routes = []
+            for delivery, (source_node, target_node), pair_params in zip(deliveries, pairs, params):
+                # dostawa bez wyznaczonej trasy nie ma jeszcze budżetu czasu
+                budget = lead_time_budget_ratio * delivery.lead_time if delivery.lead_time > 0 else float("inf")
+                routes.append(choose_by_time_budget(pareto_routes(network, source_node, target_node, pair_params),
+                                                    budget))
+        elif node_to_exporter is not None:
+            if router is not None:
+                routes = router.find_profile_routes(pairs, params)
+            else:
+                routes = find_profile_routes(network, pairs, params)
+        elif router is not None:
+            routes = router.find_routes(pairs)
+        else:
+            routes = find_routes(network, pairs)
+        for delivery, route in zip(deliveries, routes):
+            delivery.apply_route(route, network)
+        self.adjust_flows(rerouted, network)
+
+    def apply_alternative_routes(self, deliveries: list[Delivery], network: SimulationGraph,
+                                 node_to_exporter: dict[int, ExporterAgent] = None) -> list[Delivery]:
+        """
+        Moves deliveries onto their cheapest usable precomputed alternative, priced with the
+        exporter's courier company if `node_to_exporter` is given.
+
+        Returns
+        -------
+        list[Delivery]
+            Deliveries without a usable alternative, which still need a full search.
+        """
+        alternative_routes = self.alternative_routes
+        if alternative_routes is None or alternative_routes.snapshot is not network.get_routing_snapshot():
+            return deliveries
+        view = network.get_active_view()
+        remaining = []
+        for delivery, params in zip(deliveries, self.courier_params(deliveries, node_to_exporter)):
+            found = alternative_routes.lookup(delivery.delivery_id, view)
+            if found is None:
+                remaining.append(delivery)
+                continue
+            delivery.apply_route(route_result(alternative_routes.snapshot, found[0], found[1].tolist(), params),
+                                 network)
+        return remaining
+
+    @staticmethod
+    def courier_params(deliveries: list[Delivery],
+                       node_to_exporter: dict[int, ExporterAgent] = None) -> list[dict]:
+        """Courier parameters of every delivery's exporter ({} without one)."""
+        if node_to_exporter is None:
+            return [{} for _ in deliveries]
+        return [node_to_exporter[delivery.start_node_id].courier_params()
+                if delivery.start_node_id in node_to_exporter else {} for delivery in deliveries]
+
+    def assign_flows(self, deliveries: list[Delivery], network: SimulationGraph,
+                     node_to_exporter: dict[int, ExporterAgent] = None) -> FlowAssignment:
+        """
+        Routes all deliveries in one capacity-aware solve (see `network.flow_assignment.assign_flows`).
+        The parcel quantity of every delivery is its demand, each delivery takes the path
+        carrying most of its parcel, and the per-edge flows are written to the network.
+
+        Parameters
+        ----------
+        deliveries : list[Delivery]
+            Product and material deliveries; routes are updated in-place.
+        network : SimulationGraph
+            The transportation network whose `flow` edge attributes are overwritten.
+        node_to_exporter : dict[int, ExporterAgent], optional
+            If given, every delivery is routed and priced with its exporter's courier company
+            (as in `update_deliveries`) instead of the edge `cost`.
+
+        Returns
+        -------
+        FlowAssignment
+            Per-edge flows and the split of every delivery.
+        """
+        commodities = [(delivery.start_node_id, delivery.end_node_id, delivery.find_parcel_quantity())
+                       for delivery in deliveries]
+        params = self.courier_params(deliveries, node_to_exporter)
+        assignment = assign_flows(network, commodities, params=params)
+        for c, delivery in enumerate(deliveries):
+            route = assignment.primary_route(c, params[c])
+            if route:
+                delivery.apply_route(route, network)
+        assignment.write_back(network)
+        self.flow_assignment = assignment
+        self.flow_deliveries = list(deliveries)
+        self.flow_params = params
+        return assignment
+
+    def adjust_flows(self, deliveries: list[Delivery], network: SimulationGraph) -> None:
+        """
+        Moves the flow of rerouted deliveries onto their new routes. Deliveries whose new
+        route overloads an edge are re-solved on the capacity left by the others (see
+        `network.flow_assignment.reassign_flows`), then the `flow` attributes are rewritten.
+        If the routing snapshot was rebuilt since the solve, the flows of all deliveries are
+        carried over to it along their current routes first.
+        """
+        assignment = self.flow_assignment
+        if assignment is None:
+            return
+        snapshot = network.get_routing_snapshot()
+        commodity_of = {delivery.delivery_id: c for c, delivery in enumerate(self.flow_deliveries)}
+        if assignment.snapshot is not snapshot:
+            # indeksy krawędzi pochodzą z poprzedniej migawki
+            assignment = FlowAssignment(snapshot, [snapshot.index_of(d.start_node_id) for d in self.flow_deliveries],
+                                        [snapshot.index_of(d.end_node_id) for d in self.flow_deliveries],
+                                        assignment.demands)
+            self.flow_assignment = assignment
+            deliveries = self.flow_deliveries
+
+        commodities = []
+        for delivery in deliveries:
+            c = commodity_of.get(delivery.delivery_id)
+            if c is None:
+                continue
+            assignment.reroute(c, delivery.edges_on(snapshot))
+            commodities.append(c)
+        congested = assignment.congested(commodities)
+        if congested:
+            reassign_flows(network, assignment, congested, self.flow_params)
+            for c in congested:
+                route = assignment.primary_route(c, self.flow_params[c])
+                if route:
+                    self.flow_deliveries[c].apply_route(route, network)
+        assignment.write_back(network)
+
     def initialize_parcel(self, products: list[Product], number_of_products: int) -> list[tuple[Product, int]]:
         """
         Parameters
@@ -18,6 +18,8 @@ from utils.find_nodes_to_disrupt import bfs_limited, find_closest_hub_node
 from utils.find_nodes_to_disrupt import find_nodes_to_disrupt
 from utils.find_delivery import find_delivery_by_agent
 
+from network.dynamic_router import DynamicRouter
+from network.parallel_router import ParallelRouter, create_pool
 from network.network import NetworkManager
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..\\..')))
@@ -38,6 +40,10 @@ class Simulation:
         Current simulation time step.
     network : SimulationGraph
         Underlying transportation network (road/air).
+    router : DynamicRouter | ParallelRouter
+        With one routing worker keeps shortest-path trees of all deliveries and repairs them
+        on disruptions, with more workers fans large route batches out over a process pool
+        (forked before any thread starts) and leaves small ones to a `DynamicRouter`.
     agent_manager : AgentManager
         Manages creation and configuration of agents and routes.
     material_exporters, importer_exporters, product_importers : list
@@ -46,6 +52,8 @@ class Simulation:
         Precomputed path metadata for material and product flows.
     deliveries : list[Delivery]
         Deliveries derived from precomputed paths.
+    flow_assignment : FlowAssignment
+        Capacity-aware assignment of all deliveries; its flows are written to the network edges.
     max_time : int
         Number of discrete time steps to simulate.
     time_manager : TimeManager
@@ -59,9 +67,11 @@ class Simulation:
     statistics_manager : StatisticsManager
         Collects and persists simulation statistics.
     """
-    def __init__(self):
+    def __init__(self, routing_workers: int = 1):
         """ Time and path initialization """
         self.initializing = 0
+        # pulę procesów trzeba sforkować, zanim wystartuje jakikolwiek wątek
+        routing_pool = create_pool(routing_workers) if routing_workers > 1 else None
         thread = Thread(target=self.loading_percentage)
         thread.start()
         self.path = Path(__file__).parent.parent.parent
@@ -72,7 +82,15 @@ class Simulation:
         """ Network initialization"""
         self.initializing = 1
         network_manager = NetworkManager()
-        self.network = network_manager.get_graph_from_file("world_ports", road_type="motorway")
+        # trasy dostaw liczone są cenami kurierów: hierarchia i nakładka znają tylko koszt krawędzi,
+        # więc nie są tu wczytywane, a tablice hubów każdego kuriera są częścią artefaktu
+        # (zob. network.router.compute_route)
+        self.network = network_manager.get_graph_from_file("world_ports", road_type="motorway", prebuilt=True)
+        self.network.get_routing_snapshot()
+        if routing_pool is not None:
+            self.router = ParallelRouter(self.network, workers=routing_workers, pool=routing_pool)
+        else:
+            self.router = DynamicRouter(self.network)
 
         """ Agents initialization """
         self.initializing = 2
@@ -94,6 +112,15 @@ class Simulation:
                                                                                         self.node_to_exporter,
                                                                                         self.material_paths, False)
         self.deliveries = self.product_deliveries + self.material_deliveries
+        # jedno globalne przypisanie przepływów z uwzględnieniem przepustowości krawędzi
+        self.flow_assignment = self.agent_manager.delivery_manager.assign_flows(self.deliveries, self.network,
+                                                                               self.node_to_exporter)
+        # tabele tras i paths.pkl opisują trasy wybrane przez przypisanie przepływów
+        self.agent_manager.update_routes(self.network, self.material_paths, self.material_deliveries)
+        self.agent_manager.update_routes(self.network, self.product_paths, self.product_deliveries)
+        # trasy awaryjne wokół tras z przypisania, liczone od razu (bez wątku obok serwera)
+        self.agent_manager.delivery_manager.compute_alternatives(self.deliveries, self.network,
+                                                                 self.node_to_exporter, k=3)
 
         """ Disruption parameters """
         self.disruption = {}
@@ -374,13 +401,12 @@ class Simulation:
             print(f"❌ Błąd podczas zapisu mapy: {e}")
 
     def find_deactivated_deliveries(self) -> list[Delivery]:
+        view = self.network.get_active_view()
         disrupted_deliveries = []
         for delivery in self.deliveries:
-            for node in delivery.route:
-                if not self.network.nodes[node].get('active'):
-                    self.statistics_manager.changed_routes += 1
-                    disrupted_deliveries.append(delivery)
-                    break
+            if delivery.touches_inactive(view):
+                self.statistics_manager.changed_routes += 1
+                disrupted_deliveries.append(delivery)
         return disrupted_deliveries
 
     def mark_deliveries_disrupted(self, deliveries: list[Delivery], disrupted: bool) -> list[Delivery]:
@@ -399,12 +425,13 @@ class Simulation:
         In only product deliveries update:
             * loss
         """
-        active_network = self.network.get_active_graph()
         disrupted_product_deliveries = [d for d in disrupted_deliveries if d in self.product_deliveries]
         old_cost = [d.cost for d in disrupted_product_deliveries]
 
-        for delivery in disrupted_deliveries:
-            delivery.update_delivery(self.node_to_exporter, active_network, disrupted)
+        # routing honors the network's active masks and the router repairs its trees on every
+        # (de)activation, so rerouting is mostly reading already repaired trees
+        self.agent_manager.delivery_manager.update_deliveries(disrupted_deliveries, self.network, self.router,
+                                                              self.node_to_exporter)
         self.update_statistics(disrupted_product_deliveries, old_cost, disrupted)
         print("Deliveries have been updated.")
 
@@ -445,10 +472,16 @@ class Simulation:
                 print(f"Json loading error: {str(e)}")
                 return
 
+        snapshot = self.network.get_routing_snapshot()
         for o in data:
             try:
                 if self.deliveries[o["delivery_id"]] in deliveries:
-                    self.deliveries[o["delivery_id"]].route = o["route"]
+                    # indeksy krawędzi tylko z tej samej migawki, inaczej trasa z identyfikatorów węzłów
+                    if "edges" in o and o.get("snapshot_checksum") == snapshot.checksum():
+                        edges = o["edges"]
+                    else:
+                        edges = snapshot.path_edges(o["route"]) if o.get("route") else None
+                    self.deliveries[o["delivery_id"]].set_route(edges, snapshot)
                     self.deliveries[o["delivery_id"]].length = o["length"]
                     self.deliveries[o["delivery_id"]].cost = o["cost"]
                     self.deliveries[o["delivery_id"]].lead_time = o["lead_time"]
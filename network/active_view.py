@@ -0,0 +1,136 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.routing_snapshot import RoutingSnapshot
+
+FINGERPRINT_SEED = 2024
+
+
+class ActiveView:
+    """
+    Cheap "active graph" over a `RoutingSnapshot`, backed by boolean node and edge masks.
+
+    Instead of copying the graph and removing inactive nodes, routing reads the masks
+    directly. `deactivate_nodes`/`activate_nodes` (and the edge equivalents) flip mask
+    bits in O(k). The inactive index sets are kept next to the masks because set
+    membership is what the pure-Python search loops check.
+
+    Attributes
+    ----------
+    snapshot : RoutingSnapshot
+        Snapshot the masks are aligned with.
+    node_mask : np.ndarray[bool]
+        True for every active node.
+    edge_mask : np.ndarray[bool]
+        True for every active collapsed edge.
+    inactive_nodes, inactive_edges : set[int]
+        Dense indices of inactive nodes and edges.
+    version : int
+        Incremented every time any mask bit changes.
+    fingerprint : int
+        Zobrist hash of the inactive node/edge sets, updated in O(k) on every change.
+        Equal sets always give the same fingerprint, e.g. after a full recovery.
+    listeners : list
+        Objects notified about every change through `nodes_changed(indices, active)`
+        and `edges_changed(indices, active)`, e.g. `DynamicRouter`.
+    """
+    def __init__(self, snapshot: RoutingSnapshot, inactive_nodes: set[int] = None, inactive_edges: set[int] = None):
+        self.snapshot = snapshot
+        self.inactive_nodes = set(inactive_nodes or ())
+        self.inactive_edges = set(inactive_edges or ())
+        self.node_mask = np.ones(snapshot.number_of_nodes, dtype=bool)
+        self.edge_mask = np.ones(snapshot.number_of_edges, dtype=bool)
+        self.node_mask[list(self.inactive_nodes)] = False
+        self.edge_mask[list(self.inactive_edges)] = False
+        self.version = 0
+        self.listeners = []
+
+        rng = np.random.default_rng(FINGERPRINT_SEED)
+        self.node_hashes = rng.integers(1, 2 ** 62, size=snapshot.number_of_nodes, dtype=np.int64).tolist()
+        self.edge_hashes = rng.integers(1, 2 ** 62, size=snapshot.number_of_edges, dtype=np.int64).tolist()
+        self.fingerprint = 0
+        for i in self.inactive_nodes:
+            self.fingerprint ^= self.node_hashes[i]
+        for e in self.inactive_edges:
+            self.fingerprint ^= self.edge_hashes[e]
+
+    @classmethod
+    def from_graph(cls, snapshot: RoutingSnapshot, graph) -> "ActiveView":
+        """Builds masks from the `active` attributes of the graph's nodes and edges."""
+        inactive_nodes = {snapshot.node_index[node] for node, data in graph.nodes(data=True)
+                          if data.get("active", True) is False}
+        inactive_edges = set()
+        for e, (iu, iv) in enumerate(zip(snapshot.edge_u.tolist(), snapshot.edge_v.tolist())):
+            u = snapshot.node_ids[iu]
+            v = snapshot.node_ids[iv]
+            data = graph.get_edge_data(u, v, key=snapshot.edge_keys[e]) if graph.is_multigraph() \
+                else graph.get_edge_data(u, v)
+            if data is not None and data.get("active", True) is False:
+                inactive_edges.add(e)
+        return cls(snapshot, inactive_nodes, inactive_edges)
+
+    def is_unrestricted(self) -> bool:
+        return not self.inactive_nodes and not self.inactive_edges
+
+    def deactivate_nodes(self, nodes) -> None:
+        indices = [i for i in self._node_indices(nodes) if i not in self.inactive_nodes]
+        self.node_mask[indices] = False
+        self.inactive_nodes.update(indices)
+        self.version += 1
+        for i in indices:
+            self.fingerprint ^= self.node_hashes[i]
+        for listener in self.listeners:
+            listener.nodes_changed(indices, False)
+
+    def activate_nodes(self, nodes) -> None:
+        indices = [i for i in self._node_indices(nodes) if i in self.inactive_nodes]
+        self.node_mask[indices] = True
+        self.inactive_nodes.difference_update(indices)
+        self.version += 1
+        for i in indices:
+            self.fingerprint ^= self.node_hashes[i]
+        for listener in self.listeners:
+            listener.nodes_changed(indices, True)
+
+    def deactivate_edges(self, edges) -> None:
+        indices = [e for e in self._edge_indices(edges) if e not in self.inactive_edges]
+        self.edge_mask[indices] = False
+        self.inactive_edges.update(indices)
+        self.version += 1
+        for i in indices:
+            self.fingerprint ^= self.edge_hashes[i]
+        for listener in self.listeners:
+            listener.edges_changed(indices, False)
+
+    def activate_edges(self, edges) -> None:
+        indices = [e for e in self._edge_indices(edges) if e in self.inactive_edges]
+        self.edge_mask[indices] = True
+        self.inactive_edges.difference_update(indices)
+        self.version += 1
+        for i in indices:
+            self.fingerprint ^= self.edge_hashes[i]
+        for listener in self.listeners:
+            listener.edges_changed(indices, True)
+
+    def is_node_active(self, node: int | str) -> bool:
+        i = self.snapshot.index_of(node)
+        return i is not None and bool(self.node_mask[i])
+
+    def _node_indices(self, nodes) -> list[int]:
+        node_index = self.snapshot.node_index
+        return [node_index[node] for node in nodes if node in node_index]
+
+    def _edge_indices(self, edges) -> list[int]:
+        indices = []
+        for u, v in edges:
+            iu = self.snapshot.index_of(u)
+            iv = self.snapshot.index_of(v)
+            if iu is None or iv is None:
+                continue
+            e = self.snapshot.find_edge(iu, iv)
+            if e is not None:
+                indices.append(e)
+        return indices
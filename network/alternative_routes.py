@@ -0,0 +1,130 @@
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.router import profile_prices
+from network.routing_snapshot import RoutingSnapshot
+
+
+def penalty_alternatives(snapshot: RoutingSnapshot, source: int, target: int, k: int = 3,
+                         penalty: float = 0.5, weights: list[float] = None,
+                         prices: tuple[float, float, float] = None,
+                         current: np.ndarray = None) -> list[np.ndarray]:
+    """
+    Up to `k` diverse routes between two dense node indices found with the penalty method:
+    after every search the cost of the edges it used is raised by `penalty` (relative), so
+    the next search prefers other edges. Returns edge-index arrays sorted by real cost.
+
+    Parameters
+    ----------
+    weights : list[float], optional
+        Scratch copy of the cost column (of the `prices` profile) to penalize in place; it is
+        restored before returning, so one copy can be reused for many pairs.
+    prices : tuple[float, float, float], optional
+        Courier price profile (see `network.router.profile_prices`) the routes are searched
+        and ranked on instead of the edge `cost`.
+    current : np.ndarray, optional
+        Route the pair already takes (e.g. chosen by the flow assignment); it is kept as an
+        alternative and its edges are penalized before the first search.
+    """
+    cost = snapshot.cost if prices is None else snapshot.profile_cost(prices)
+    if weights is None:
+        weights = cost.tolist()
+    original = {}
+    routes = []
+    if current is not None:
+        routes.append(np.asarray(current, dtype=np.int32))
+        for e in routes[0].tolist():
+            original.setdefault(e, weights[e])
+            weights[e] *= 1.0 + penalty
+    for _ in range(2 * k):
+        if len(routes) >= k:
+            break
+        found = snapshot.dijkstra_path(source, target, weights=weights)
+        if found is None:
+            break
+        edges = np.asarray(found[1], dtype=np.int32)
+        if not any(np.array_equal(edges, route) for route in routes):
+            routes.append(edges)
+            if len(routes) == k:
+                break
+        for e in found[1]:
+            original.setdefault(e, weights[e])
+            weights[e] *= 1.0 + penalty
+
+    for e, weight in original.items():
+        weights[e] = weight
+    routes.sort(key=lambda route: float(cost[route].sum()))
+    return routes
+
+
+class AlternativeRoutes:
+    """
+    Precomputed alternative routes of deliveries, used for instant failover on disruptions.
+
+    Alternatives are computed on the unrestricted network around the route every delivery
+    takes (so after the flow assignment has fixed it) and stored as int32 edge-index
+    arrays into `snapshot`. When a route is needed
+    on a disrupted network, the cheapest alternative whose nodes and edges are all still
+    active is taken; only if all of them are blocked a full search is required.
+
+    Attributes
+    ----------
+    snapshot : RoutingSnapshot
+        Snapshot the stored edge indices refer to.
+    k : int
+        Number of alternatives per delivery.
+    routes : dict[int, list[np.ndarray]]
+        Mapping: delivery ID -> alternatives sorted by cost (under the delivery's courier
+        prices, if `compute` was given them).
+    sources : dict[int, int]
+        Mapping: delivery ID -> dense index of its start node.
+    """
+    def __init__(self, snapshot: RoutingSnapshot, k: int = 3, penalty: float = 0.5):
+        self.snapshot = snapshot
+        self.k = k
+        self.penalty = penalty
+        self.routes = {}
+        self.sources = {}
+
+    def compute(self, deliveries: list, params: list[dict] = None) -> None:
+        """
+        Computes alternatives of `deliveries` (anything with delivery_id, start_node_id and
+        end_node_id), searched and ranked with the courier `params` of each delivery if given.
+        A delivery with a route on `snapshot` (`edges_on`) keeps it among its alternatives.
+        """
+        params = params or [None] * len(deliveries)
+        # osobna kopia robocza wag dla każdego profilu cen (kopie w pamięci podręcznej snapshotu są współdzielone)
+        scratch = {}
+        for delivery, delivery_params in zip(deliveries, params):
+            source = self.snapshot.index_of(delivery.start_node_id)
+            target = self.snapshot.index_of(delivery.end_node_id)
+            if source is None or target is None:
+                continue
+            prices = profile_prices(delivery_params)
+            current = delivery.edges_on(self.snapshot) if hasattr(delivery, "edges_on") else None
+            if current is not None and not len(current) and source != target:
+                current = None
+            if prices not in scratch:
+                scratch[prices] = (self.snapshot.cost if prices is None else self.snapshot.profile_cost(prices)).tolist()
+            self.sources[delivery.delivery_id] = source
+            self.routes[delivery.delivery_id] = penalty_alternatives(self.snapshot, source, target, self.k, self.penalty,
+                                                                     scratch[prices], prices, current)
+
+    def lookup(self, delivery_id: int, view=None) -> tuple[list[int], np.ndarray] | None:
+        """
+        Cheapest stored alternative avoiding every inactive node and edge of `view`, as
+        `(node_indices, edge_indices)`, or None if none is usable (or not computed yet).
+        """
+        routes = self.routes.get(delivery_id)
+        if not routes:
+            return None
+        snapshot = self.snapshot
+        for edges in routes:
+            if view is not None and not (view.edge_mask[edges].all() and view.node_mask[snapshot.edge_u[edges]].all()
+                                         and view.node_mask[snapshot.edge_v[edges]].all()):
+                continue
+            return snapshot.edge_path_nodes(self.sources[delivery_id], edges), edges
+        return None
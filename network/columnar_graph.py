@@ -0,0 +1,162 @@
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+import shapely
+from shapely.geometry.base import BaseGeometry
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.region_arrays import EDGE_COLUMNS, RegionArrays
+
+# wersja układu plików (zmiana wymusza ponowny zapis kolumn)
+COLUMNAR_VERSION = 2
+MANIFEST = "manifest.json"
+SIDE_TABLE = "attributes.json"
+
+
+def json_value(value):
+    """`json.dump` fallback for NumPy scalars and arrays stored in attribute dicts."""
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    raise TypeError(f"Attribute value of type {type(value).__name__} cannot be stored in columns")
+
+
+def split_attributes(attributes: list[dict]) -> tuple[dict, dict]:
+    """
+    Sparse attributes as {name: (positions, values)}: JSON values and shapely geometries
+    (stored as WKB) separately.
+    """
+    table = {}
+    for i, data in enumerate(attributes):
+        for name, value in data.items():
+            positions, values = table.setdefault(name, ([], []))
+            positions.append(i)
+            values.append(value)
+    geometries = {name: entry for name, entry in table.items()
+                  if all(isinstance(value, BaseGeometry) for value in entry[1])}
+    plain = {name: entry for name, entry in table.items() if name not in geometries}
+    return plain, geometries
+
+
+def save_columns(directory: str, arrays: RegionArrays, key: str = None) -> None:
+    """
+    Writes `arrays` as a directory of `.npy` columns (coordinates, edge endpoints and keys,
+    `EDGE_COLUMNS` with their integer flags, transport mode, WKB geometries) plus
+    `attributes.json`, the side table of the remaining sparse attributes. The manifest,
+    holding the optional content `key` of the inputs (see
+    `network.graph_artifact.artifact_key`), is written last and the directory replaced as
+    a whole, so readers never see a partial table.
+    """
+    temporary = directory + ".tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+
+    def column(name: str, values) -> None:
+        np.save(os.path.join(temporary, name + ".npy"), np.asarray(values))
+
+    integer_ids = all(isinstance(node, (int, np.integer)) and not isinstance(node, bool) for node in arrays.node_ids)
+    if integer_ids:
+        column("node_ids", np.asarray(arrays.node_ids, dtype=np.int64))
+    column("x", arrays.x)
+    column("y", arrays.y)
+    column("edge_u", arrays.edge_u.astype(np.int32))
+    column("edge_v", arrays.edge_v.astype(np.int32))
+    column("edge_keys", arrays.edge_keys.astype(np.int64))
+    for name in EDGE_COLUMNS:
+        column("edge_" + name, arrays.edge_columns[name])
+    column("transport_mode", arrays.transport_mode.astype(np.int8))
+    column("edge_integer_columns", arrays.integer_columns.astype(np.uint8))
+
+    side_table = {}
+    geometry_attributes = {}
+    for kind, attributes in (("nodes", arrays.node_attributes), ("edges", arrays.edge_attributes)):
+        plain, geometries = split_attributes(attributes)
+        side_table[kind] = plain
+        geometry_attributes[kind] = sorted(geometries)
+        for name, (positions, values) in geometries.items():
+            # WKB wszystkich geometrii atrybutu sklejone w jeden bufor z tablicą przesunięć
+            blobs = shapely.to_wkb(np.asarray(values, dtype=object))
+            offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+            np.cumsum([len(blob) for blob in blobs], out=offsets[1:])
+            column(f"{kind}.{name}.index", np.asarray(positions, dtype=np.int32))
+            column(f"{kind}.{name}.offsets", offsets)
+            column(f"{kind}.{name}.wkb", np.frombuffer(b"".join(blobs), dtype=np.uint8))
+    if not integer_ids:
+        side_table["node_ids"] = arrays.node_ids
+    with open(os.path.join(temporary, SIDE_TABLE), "w") as file:
+        json.dump(side_table, file, default=json_value)
+
+    manifest = {
+        "version": COLUMNAR_VERSION,
+        "key": key,
+        "number_of_nodes": arrays.number_of_nodes,
+        "number_of_edges": arrays.number_of_edges,
+        "integer_node_ids": integer_ids,
+        "edge_columns": list(EDGE_COLUMNS),
+        "geometry_attributes": geometry_attributes,
+        "graph_attributes": arrays.graph_attributes,
+    }
+    with open(os.path.join(temporary, MANIFEST), "w") as file:
+        json.dump(manifest, file, default=json_value, indent=4)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(temporary, directory)
+
+
+def read_manifest(directory: str, key: str = None) -> dict | None:
+    """
+    Manifest of a columnar graph; None if missing, written by another format version or,
+    with `key`, built from other inputs.
+    """
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as file:
+        manifest = json.load(file)
+    if manifest.get("version") != COLUMNAR_VERSION or manifest.get("edge_columns") != list(EDGE_COLUMNS):
+        return None
+    if key is not None and manifest.get("key") != key:
+        return None
+    return manifest
+
+
+def load_columns(directory: str, mmap_mode: str | None = "r", key: str = None) -> RegionArrays | None:
+    """
+    Reads a directory written by `save_columns`. With `mmap_mode="r"` the numeric columns
+    are read-only memory maps: opening them costs milliseconds and worker processes share
+    their pages through the OS page cache. Only the side table and geometries are decoded.
+    With `key`, a table built from other inputs counts as missing.
+    """
+    manifest = read_manifest(directory, key)
+    if manifest is None:
+        return None
+
+    def column(name: str) -> np.ndarray:
+        return np.load(os.path.join(directory, name + ".npy"), mmap_mode=mmap_mode)
+
+    with open(os.path.join(directory, SIDE_TABLE), "r") as file:
+        side_table = json.load(file)
+    n = manifest["number_of_nodes"]
+    m = manifest["number_of_edges"]
+    node_ids = column("node_ids").tolist() if manifest["integer_node_ids"] else side_table["node_ids"]
+
+    element_attributes = {}
+    for kind, size in (("nodes", n), ("edges", m)):
+        attributes = [{} for _ in range(size)]
+        for name, (positions, values) in side_table[kind].items():
+            for i, value in zip(positions, values):
+                attributes[i][name] = value
+        for name in manifest["geometry_attributes"][kind]:
+            offsets = column(f"{kind}.{name}.offsets")
+            wkb = column(f"{kind}.{name}.wkb").tobytes()
+            blobs = [wkb[start:end] for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
+            for i, geometry in zip(column(f"{kind}.{name}.index").tolist(), shapely.from_wkb(blobs)):
+                attributes[i][name] = geometry
+        element_attributes[kind] = attributes
+
+    return RegionArrays(node_ids, column("x"), column("y"), element_attributes["nodes"], column("edge_u"),
+                        column("edge_v"), column("edge_keys"),
+                        {name: column("edge_" + name) for name in EDGE_COLUMNS}, column("transport_mode"),
+                        column("edge_integer_columns"), element_attributes["edges"], manifest["graph_attributes"])
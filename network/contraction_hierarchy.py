@@ -0,0 +1,293 @@
+import heapq
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.routing_snapshot import RoutingSnapshot
+
+INF = float("inf")
+
+
+class ContractionHierarchy:
+    """
+    Contraction hierarchy over the cost metric of a `RoutingSnapshot`.
+
+    Nodes are contracted in order of increasing importance (edge difference plus the number
+    of already contracted neighbours); a shortcut is added only when a bounded witness
+    search finds no path avoiding the contracted node. Queries are bidirectional searches
+    that only follow arcs to higher-ranked nodes.
+
+    Disruptions are supported by validation: the query computes the optimum of the
+    unrestricted graph, unpacks its shortcuts and, if the path touches an inactive node or
+    edge, falls back to plain Dijkstra on the active view. An unrestricted optimum that
+    avoids every inactive element is also optimal for the restricted graph.
+
+    Only the edge `cost` is contracted, so the hierarchy answers unpriced queries only;
+    queries with a courier price profile run bidirectional Dijkstra on the courier's edge
+    costs (see `network.router.compute_route`). The simulation prices every delivery with
+    its courier and does not build a hierarchy at startup.
+
+    Attributes
+    ----------
+    rank : np.ndarray[int32]
+        Contraction order of every node.
+    arc_u, arc_v : np.ndarray[int32]
+        Endpoints of every arc (original edges first, then shortcuts).
+    arc_cost : np.ndarray[float64]
+        Cost of every arc.
+    arc_first, arc_second : np.ndarray[int32]
+        For shortcuts the two arcs they replace, -1 for original edges.
+    arc_edge : np.ndarray[int32]
+        Collapsed snapshot edge of original arcs, -1 for shortcuts.
+    up_offsets, up_arcs : np.ndarray[int32]
+        CSR of upward arcs, stored at their lower-ranked endpoint.
+    checksum : str
+        `RoutingSnapshot.checksum` of the snapshot the hierarchy was built for.
+    """
+    def __init__(self, rank: np.ndarray, arc_u: np.ndarray, arc_v: np.ndarray, arc_cost: np.ndarray,
+                 arc_first: np.ndarray, arc_second: np.ndarray, arc_edge: np.ndarray,
+                 up_offsets: np.ndarray, up_arcs: np.ndarray, checksum: str):
+        self.rank = rank
+        self.arc_u = arc_u
+        self.arc_v = arc_v
+        self.arc_cost = arc_cost
+        self.arc_first = arc_first
+        self.arc_second = arc_second
+        self.arc_edge = arc_edge
+        self.up_offsets = up_offsets
+        self.up_arcs = up_arcs
+        self.checksum = checksum
+        self._lists = None
+
+    @property
+    def number_of_shortcuts(self) -> int:
+        return int((self.arc_edge < 0).sum())
+
+    def lists(self) -> tuple:
+        if self._lists is None:
+            self._lists = (self.up_offsets.tolist(), self.up_arcs.tolist(), self.arc_u.tolist(),
+                           self.arc_v.tolist(), self.arc_cost.tolist(), self.arc_first.tolist(),
+                           self.arc_second.tolist(), self.arc_edge.tolist())
+        return self._lists
+
+    @classmethod
+    def build(cls, snapshot: RoutingSnapshot, witness_limit: int = 100) -> "ContractionHierarchy":
+        if snapshot.directed:
+            raise ValueError("Contraction hierarchy supports undirected routing snapshots only")
+
+        n = snapshot.number_of_nodes
+        arc_u = snapshot.edge_u.tolist()
+        arc_v = snapshot.edge_v.tolist()
+        arc_cost = snapshot.cost.tolist()
+        arc_first = [-1] * len(arc_u)
+        arc_second = [-1] * len(arc_u)
+        arc_edge = list(range(len(arc_u)))
+
+        # remaining overlay graph: node -> {neighbour: (cost, arc)}
+        overlay = [dict() for _ in range(n)]
+        for a, (u, v, c) in enumerate(zip(arc_u, arc_v, arc_cost)):
+            current = overlay[u].get(v)
+            if current is None or c < current[0]:
+                overlay[u][v] = (c, a)
+                overlay[v][u] = (c, a)
+
+        contracted = [False] * n
+        deleted_neighbours = [0] * n
+        rank = [0] * n
+
+        def witness_search(source: int, excluded: int, max_cost: float) -> dict:
+            dist = {source: 0.0}
+            heap = [(0.0, source)]
+            settled = 0
+            while heap and settled < witness_limit:
+                d, x = heapq.heappop(heap)
+                if d > dist[x]:
+                    continue
+                if d > max_cost:
+                    break
+                settled += 1
+                for y, (c, _) in overlay[x].items():
+                    if y == excluded or contracted[y]:
+                        continue
+                    nd = d + c
+                    if nd < dist.get(y, INF):
+                        dist[y] = nd
+                        heapq.heappush(heap, (nd, y))
+            return dist
+
+        def needed_shortcuts(v: int) -> list[tuple[int, int, float, int, int]]:
+            neighbours = [(u, c, a) for u, (c, a) in overlay[v].items() if not contracted[u]]
+            shortcuts = []
+            for i, (u, cu, au) in enumerate(neighbours):
+                others = neighbours[i + 1:]
+                if not others:
+                    continue
+                max_cost = cu + max(cw for _, cw, _ in others)
+                dist = witness_search(u, v, max_cost)
+                for w, cw, aw in others:
+                    via = cu + cw
+                    if dist.get(w, INF) > via:
+                        shortcuts.append((u, w, via, au, aw))
+            return shortcuts
+
+        def priority(v: int) -> int:
+            degree = sum(1 for u in overlay[v] if not contracted[u])
+            return len(needed_shortcuts(v)) - degree + deleted_neighbours[v]
+
+        heap = [(priority(v), v) for v in range(n)]
+        heapq.heapify(heap)
+        order = 0
+        while heap:
+            _, v = heapq.heappop(heap)
+            if contracted[v]:
+                continue
+            current = priority(v)
+            if heap and current > heap[0][0]:
+                heapq.heappush(heap, (current, v))
+                continue
+
+            for u, w, c, au, aw in needed_shortcuts(v):
+                existing = overlay[u].get(w)
+                if existing is not None and existing[0] <= c:
+                    continue
+                a = len(arc_u)
+                arc_u.append(u)
+                arc_v.append(w)
+                arc_cost.append(c)
+                arc_first.append(au)
+                arc_second.append(aw)
+                arc_edge.append(-1)
+                overlay[u][w] = (c, a)
+                overlay[w][u] = (c, a)
+
+            contracted[v] = True
+            rank[v] = order
+            order += 1
+            for u in overlay[v]:
+                if not contracted[u]:
+                    deleted_neighbours[u] += 1
+
+        rank = np.asarray(rank, dtype=np.int32)
+        arc_u = np.asarray(arc_u, dtype=np.int32)
+        arc_v = np.asarray(arc_v, dtype=np.int32)
+        lower = np.where(rank[arc_u] < rank[arc_v], arc_u, arc_v)
+        order = np.argsort(lower, kind="stable").astype(np.int32)
+        up_offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(lower, minlength=n), out=up_offsets[1:])
+
+        return cls(rank, arc_u, arc_v, np.asarray(arc_cost, dtype=np.float64),
+                   np.asarray(arc_first, dtype=np.int32), np.asarray(arc_second, dtype=np.int32),
+                   np.asarray(arc_edge, dtype=np.int32), up_offsets, order, snapshot.checksum())
+
+    def save(self, path: str) -> None:
+        np.savez(path, rank=self.rank, arc_u=self.arc_u, arc_v=self.arc_v, arc_cost=self.arc_cost,
+                 arc_first=self.arc_first, arc_second=self.arc_second, arc_edge=self.arc_edge,
+                 up_offsets=self.up_offsets, up_arcs=self.up_arcs, checksum=np.array(self.checksum))
+
+    @classmethod
+    def load(cls, path: str) -> "ContractionHierarchy":
+        with np.load(path) as data:
+            return cls(data["rank"], data["arc_u"], data["arc_v"], data["arc_cost"], data["arc_first"],
+                       data["arc_second"], data["arc_edge"], data["up_offsets"], data["up_arcs"],
+                       str(data["checksum"]))
+
+    def matches(self, snapshot: RoutingSnapshot) -> bool:
+        return self.checksum == snapshot.checksum()
+
+    def query(self, source: int, target: int) -> tuple[float, list[int]] | None:
+        """
+        Bidirectional upward search on the unrestricted graph. Returns the cost and the
+        arcs (possibly shortcuts) of the cheapest path from `source` to `target`.
+        """
+        if source == target:
+            return 0.0, []
+        up_offsets, up_arcs, arc_u, arc_v, arc_cost, _, _, _ = self.lists()
+        dist = ({source: 0.0}, {target: 0.0})
+        pred = ({}, {})
+        heaps = ([(0.0, source)], [(0.0, target)])
+        best = INF
+        meet = None
+
+        while heaps[0] or heaps[1]:
+            for side in (0, 1):
+                heap = heaps[side]
+                if heap and heap[0][0] >= best:
+                    heap.clear()
+                if not heap:
+                    continue
+                d, x = heapq.heappop(heap)
+                own = dist[side]
+                if d > own[x]:
+                    continue
+                other = dist[1 - side]
+                for i in range(up_offsets[x], up_offsets[x + 1]):
+                    a = up_arcs[i]
+                    y = arc_v[a] if arc_u[a] == x else arc_u[a]
+                    nd = d + arc_cost[a]
+                    if nd >= best or nd >= own.get(y, INF):
+                        continue
+                    own[y] = nd
+                    pred[side][y] = (x, a)
+                    heapq.heappush(heap, (nd, y))
+                    if y in other and nd + other[y] < best:
+                        best = nd + other[y]
+                        meet = y
+                if x in other and d + other[x] < best:
+                    best = d + other[x]
+                    meet = x
+        if meet is None:
+            return None
+
+        up = []
+        node = meet
+        while node != source:
+            node, a = pred[0][node]
+            up.append(a)
+        up.reverse()
+        node = meet
+        while node != target:
+            node, a = pred[1][node]
+            up.append(a)
+        return best, up
+
+    def unpack(self, arcs: list[int], source: int) -> tuple[list[int], list[int]]:
+        """Expands arcs into the original `(node_indices, edge_indices)` path starting at `source`."""
+        _, _, arc_u, arc_v, _, arc_first, arc_second, arc_edge = self.lists()
+        nodes = [source]
+        edges = []
+        stack = list(reversed(arcs))
+        while stack:
+            a = stack.pop()
+            current = nodes[-1]
+            if arc_edge[a] >= 0:
+                edges.append(arc_edge[a])
+                nodes.append(arc_v[a] if arc_u[a] == current else arc_u[a])
+                continue
+            first = arc_first[a]
+            second = arc_second[a]
+            # the first half must start at the current node
+            if current not in (arc_u[first], arc_v[first]):
+                first, second = second, first
+            stack.append(second)
+            stack.append(first)
+        return nodes, edges
+
+    def shortest_path(self, snapshot: RoutingSnapshot, source: int, target: int,
+                      view=None) -> tuple[list[int], list[int]] | None:
+        """
+        Cheapest `(node_indices, edge_indices)` path on the active graph. Uses the hierarchy
+        and falls back to `snapshot.dijkstra_path` when its path crosses inactive elements.
+        """
+        if view is not None and (source in view.inactive_nodes or target in view.inactive_nodes):
+            return None
+        found = self.query(source, target)
+        if found is None:
+            return None
+        _, arcs = found
+        nodes, edges = self.unpack(arcs, source)
+        if view is not None and (any(n in view.inactive_nodes for n in nodes) or
+                                 any(e in view.inactive_edges for e in edges)):
+            return snapshot.dijkstra_path(source, target, view=view)
+        return nodes, edges
@@ -0,0 +1,331 @@
+import heapq
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.router import profile_prices, route_cache_key, route_result
+
+INF = float("inf")
+
+
+class DynamicShortestPathTree:
+    """
+    Resumable cheapest-path tree from one source that can be repaired in place.
+
+    Besides labels the tree keeps its Dijkstra heap, so a search stopped at its targets
+    can be resumed later for new targets or after a repair. Label decreases of already
+    settled nodes are pushed back on the heap and propagated, which is what lets
+    reactivations be repaired by relaxing only the edges around the reactivated elements.
+
+    Attributes
+    ----------
+    source : int
+        Dense index of the root.
+    label : dict[int, float]
+        Best known cost of every reached node (exact for settled nodes once grown).
+    settled : set[int]
+        Nodes that have been popped and relaxed.
+    pred : dict[int, tuple[int, int]]
+        Mapping: node -> (parent node, collapsed edge index).
+    children : dict[int, set[int]]
+        Tree children of every settled node.
+    targets : set[int]
+        Nodes the tree must keep exact.
+    prices : tuple[float, float, float] | None
+        Courier price profile the edges are weighted with (see `network.router.profile_prices`),
+        None for the edge `cost`.
+    """
+    def __init__(self, router: "DynamicRouter", source: int, prices: tuple[float, float, float] = None):
+        self.router = router
+        self.source = source
+        self.prices = prices
+        self.targets = set()
+        self.reset()
+
+    def costs(self) -> list[float]:
+        snapshot = self.router.snapshot
+        if self.prices is None:
+            return snapshot.adjacency_lists()[3]
+        return snapshot.profile_list(self.prices)
+
+    def reset(self) -> None:
+        self.label = {self.source: 0.0}
+        self.settled = set()
+        self.pred = {}
+        self.children = defaultdict(set)
+        self.heap = [(0.0, self.source)]
+
+    def path_to(self, target: int) -> tuple[list[int], list[int]] | None:
+        if target not in self.settled:
+            return None
+        nodes = [target]
+        edges = []
+        current = target
+        while current != self.source:
+            current, e = self.pred[current]
+            nodes.append(current)
+            edges.append(e)
+        return nodes[::-1], edges[::-1]
+
+    def grow(self) -> None:
+        """
+        Resumes the search until every reachable target is settled and no pending label
+        on the heap can still improve one of them.
+        """
+        offsets, neighbors, half_edges, _ = self.router.snapshot.adjacency_lists()
+        cost = self.costs()
+        blocked_nodes = self.router.view.inactive_nodes
+        blocked_edges = self.router.view.inactive_edges
+        if self.source in blocked_nodes:
+            return
+
+        remaining = {t for t in self.targets if t not in self.settled and t not in blocked_nodes}
+        bound = self.target_bound() if not remaining else INF
+        heap = self.heap
+        while heap and (remaining or heap[0][0] < bound):
+            d, u = heapq.heappop(heap)
+            if self.label.get(u) != d:
+                continue
+            self.settle(u)
+            if u in remaining:
+                remaining.discard(u)
+                if not remaining:
+                    bound = self.target_bound()
+            for i in range(offsets[u], offsets[u + 1]):
+                v = neighbors[i]
+                e = half_edges[i]
+                if v in blocked_nodes or e in blocked_edges:
+                    continue
+                nd = d + cost[e]
+                if nd < self.label.get(v, INF):
+                    self.label[v] = nd
+                    self.set_parent(v, u, e)
+                    heapq.heappush(heap, (nd, v))
+
+    def target_bound(self) -> float:
+        return max((self.label[t] for t in self.targets if t in self.label), default=0.0)
+
+    def settle(self, u: int) -> None:
+        if u in self.settled:
+            return
+        self.settled.add(u)
+        if u in self.pred:
+            self.children[self.pred[u][0]].add(u)
+
+    def set_parent(self, v: int, u: int, e: int) -> None:
+        if v in self.settled and v in self.pred:
+            self.children[self.pred[v][0]].discard(v)
+        self.pred[v] = (u, e)
+        if v in self.settled:
+            self.children[u].add(v)
+
+    def best_incoming(self, x: int) -> tuple[float, int, int] | None:
+        """Cheapest (label, parent, edge) for `x` over its settled, active neighbours."""
+        offsets, neighbors, half_edges, _ = self.router.snapshot.adjacency_lists()
+        cost = self.costs()
+        blocked_edges = self.router.view.inactive_edges
+        best = None
+        for i in range(offsets[x], offsets[x + 1]):
+            w = neighbors[i]
+            e = half_edges[i]
+            if w not in self.settled or e in blocked_edges:
+                continue
+            nd = self.label[w] + cost[e]
+            if best is None or nd < best[0]:
+                best = (nd, w, e)
+        return best
+
+    def repair_removal(self, removed_nodes: list[int], removed_edges: list[int]) -> None:
+        """
+        Repairs the tree after nodes/edges were deactivated. Only the subtrees hanging
+        below the removed elements are invalidated and re-seeded from their boundary.
+        """
+        offsets, neighbors, _, _ = self.router.snapshot.adjacency_lists()
+        snapshot = self.router.snapshot
+        blocked_nodes = self.router.view.inactive_nodes
+
+        roots = [n for n in removed_nodes if n in self.label]
+        for e in removed_edges:
+            for endpoint in (int(snapshot.edge_u[e]), int(snapshot.edge_v[e])):
+                if endpoint in self.pred and self.pred[endpoint][1] == e:
+                    roots.append(endpoint)
+        if not roots:
+            return
+        if self.source in roots:
+            self.reset()
+            return
+
+        affected = set()
+        stack = list(roots)
+        while stack:
+            node = stack.pop()
+            if node in affected:
+                continue
+            affected.add(node)
+            stack.extend(self.children.pop(node, ()))
+            # unsettled nodes whose tentative label came from this node
+            for i in range(offsets[node], offsets[node + 1]):
+                v = neighbors[i]
+                if v not in self.settled and v in self.pred and self.pred[v][0] == node:
+                    stack.append(v)
+
+        for node in affected:
+            if node in self.pred:
+                self.children[self.pred[node][0]].discard(node)
+                del self.pred[node]
+            self.label.pop(node, None)
+            self.settled.discard(node)
+
+        for x in affected:
+            if x in blocked_nodes:
+                continue
+            best = self.best_incoming(x)
+            if best is not None:
+                self.label[x] = best[0]
+                self.pred[x] = (best[1], best[2])
+                heapq.heappush(self.heap, (best[0], x))
+
+        self.grow()
+
+    def repair_insertion(self, added_nodes: list[int], added_edges: list[int]) -> None:
+        """
+        Repairs the tree after nodes/edges were reactivated. Only edges around the
+        reactivated elements are relaxed; improvements then propagate through `grow`.
+        """
+        snapshot = self.router.snapshot
+        cost = self.costs()
+        blocked_nodes = self.router.view.inactive_nodes
+        if self.source in blocked_nodes:
+            return
+        if not self.settled:
+            self.reset()
+            self.grow()
+            return
+
+        def relax(v: int, nd: float, u: int, e: int) -> None:
+            if v in blocked_nodes or nd >= self.label.get(v, INF):
+                return
+            self.label[v] = nd
+            self.set_parent(v, u, e)
+            heapq.heappush(self.heap, (nd, v))
+
+        for x in added_nodes:
+            best = self.best_incoming(x)
+            if best is not None:
+                relax(x, best[0], best[1], best[2])
+        for e in added_edges:
+            a = int(snapshot.edge_u[e])
+            b = int(snapshot.edge_v[e])
+            if a in self.settled:
+                relax(b, self.label[a] + cost[e], a, e)
+            if b in self.settled and not snapshot.directed:
+                relax(a, self.label[b] + cost[e], b, e)
+
+        self.grow()
+
+
+class DynamicRouter:
+    """
+    Routing engine that keeps one shortest-path tree per delivery source (and courier price
+    profile) and repairs the trees incrementally when the graph's active set changes.
+
+    The router registers itself as a listener of the graph's `ActiveView`, so every
+    `deactivate_nodes`/`activate_nodes` call on the graph repairs the kept trees instead of
+    forcing a full recomputation for every disrupted delivery. If the routing snapshot is
+    rebuilt (topology change) all trees are dropped and regrown on demand; if only the
+    snapshot's cost column was replaced (`RoutingSnapshot.cost_version`), only the trees
+    grown on it are dropped, courier profile trees do not depend on it.
+
+    Attributes
+    ----------
+    graph : SimulationGraph
+        Network the routes are computed on.
+    trees : dict[tuple[int, tuple | None], DynamicShortestPathTree]
+        Mapping: (dense source index, courier price profile) -> kept tree.
+    """
+    def __init__(self, graph):
+        self.graph = graph
+        self.view = None
+        self.snapshot = None
+        self.cost_version = None
+        self.trees = {}
+        self.attach()
+
+    def attach(self) -> None:
+        view = self.graph.get_active_view()
+        if view is self.view:
+            if self.cost_version != view.snapshot.cost_version:
+                self.trees = {key: tree for key, tree in self.trees.items() if key[1] is not None}
+                self.cost_version = view.snapshot.cost_version
+            return
+        if self.view is not None and self in self.view.listeners:
+            self.view.listeners.remove(self)
+        self.view = view
+        self.snapshot = view.snapshot
+        self.cost_version = view.snapshot.cost_version
+        self.trees = {}
+        view.listeners.append(self)
+
+    def nodes_changed(self, indices: list[int], active: bool) -> None:
+        for tree in self.trees.values():
+            if active:
+                tree.repair_insertion(indices, [])
+            else:
+                tree.repair_removal(indices, [])
+
+    def edges_changed(self, indices: list[int], active: bool) -> None:
+        for tree in self.trees.values():
+            if active:
+                tree.repair_insertion([], indices)
+            else:
+                tree.repair_removal([], indices)
+
+    def find_routes(self, pairs: list[tuple[int | str, int | str]],
+                    params: Optional[Dict[str, Any]] = None) -> list[Dict[str, Any]]:
+        """
+        Same contract as `network.router.find_routes`, answered from the graph's
+        `route_cache` or the kept trees. Unreachable pairs get an empty dict.
+        """
+        return self.find_profile_routes(pairs, [params] * len(pairs))
+
+    def find_profile_routes(self, pairs: list[tuple[int | str, int | str]],
+                            params: list[Optional[Dict[str, Any]]]) -> list[Dict[str, Any]]:
+        """
+        Same contract as `network.profile_router.find_profile_routes`: every pair has its
+        own parameters, and a separate tree is kept per source and courier price profile.
+        """
+        self.attach()
+        snapshot = self.snapshot
+
+        keys = [route_cache_key(self.graph, source_node, target_node, pair_params)
+                for (source_node, target_node), pair_params in zip(pairs, params)]
+        cached = [self.graph.route_cache.get(key) if key is not None else None for key in keys]
+
+        for (source_node, target_node), pair_params, route in zip(pairs, params, cached):
+            if route is not None:
+                continue
+            source = snapshot.index_of(source_node)
+            target = snapshot.index_of(target_node)
+            if source is None or target is None:
+                continue
+            tree_key = (source, profile_prices(pair_params))
+            if tree_key not in self.trees:
+                self.trees[tree_key] = DynamicShortestPathTree(self, source, tree_key[1])
+            self.trees[tree_key].targets.add(target)
+
+        for tree in self.trees.values():
+            tree.grow()
+
+        results = []
+        for (source_node, target_node), pair_params, key, route in zip(pairs, params, keys, cached):
+            if route is None:
+                tree = self.trees.get((snapshot.index_of(source_node), profile_prices(pair_params)))
+                target = snapshot.index_of(target_node)
+                found = tree.path_to(target) if tree is not None and target is not None else None
+                route = route_result(snapshot, found[0], found[1], pair_params) if found is not None else {}
+                if key is not None:
+                    self.graph.route_cache.put(key, route)
+            results.append(route)
+        return results
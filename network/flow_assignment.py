@@ -0,0 +1,251 @@
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.active_view import ActiveView
+from network.router import get_routing_state, profile_prices, route_result, shortest_path_tree
+from network.routing_snapshot import RoutingSnapshot
+
+EPSILON = 1e-9
+
+
+class FlowAssignment:
+    """
+    Result of a capacity-aware multi-commodity flow assignment on a `RoutingSnapshot`.
+
+    Attributes
+    ----------
+    snapshot : RoutingSnapshot
+        Snapshot the edge indices refer to.
+    sources, targets : list[int | None]
+        Dense endpoint indices of every commodity (None if the node is not in the graph).
+    demands : np.ndarray[float64]
+        Requested amount of every commodity.
+    paths : list[list[tuple[np.ndarray, float]]]
+        For every commodity the `(edge indices, amount)` pairs it was split into.
+    edge_flow : np.ndarray[float64]
+        Total flow assigned to every collapsed edge.
+    overflow : np.ndarray[float64]
+        Amount of every commodity routed over saturated edges because no path with free
+        capacity was left (only with `allow_overflow`).
+    unassigned : np.ndarray[float64]
+        Amount of every commodity that could not be routed at all.
+    """
+    def __init__(self, snapshot: RoutingSnapshot, sources: list, targets: list, demands: np.ndarray):
+        self.snapshot = snapshot
+        self.sources = sources
+        self.targets = targets
+        self.demands = demands
+        self.paths = [[] for _ in demands]
+        self.edge_flow = np.zeros(snapshot.number_of_edges, dtype=np.float64)
+        self.overflow = np.zeros(len(demands), dtype=np.float64)
+        self.unassigned = np.zeros(len(demands), dtype=np.float64)
+
+    def add_path(self, commodity: int, edges: np.ndarray, amount: float) -> None:
+        for i, (known, known_amount) in enumerate(self.paths[commodity]):
+            if np.array_equal(known, edges):
+                self.paths[commodity][i] = (known, known_amount + amount)
+                break
+        else:
+            self.paths[commodity].append((edges, amount))
+        self.edge_flow[edges] += amount
+
+    def clear(self, commodity: int) -> None:
+        """Removes every path of the commodity and its flow."""
+        for edges, amount in self.paths[commodity]:
+            self.edge_flow[edges] -= amount
+        self.paths[commodity] = []
+        self.overflow[commodity] = 0.0
+        self.unassigned[commodity] = 0.0
+
+    def reroute(self, commodity: int, edges: np.ndarray | None) -> None:
+        """
+        Moves the whole demand of the commodity onto `edges` (a route chosen outside the
+        solve, e.g. after a disruption); None leaves it unassigned.
+        """
+        self.clear(commodity)
+        if edges is None:
+            self.unassigned[commodity] = self.demands[commodity]
+        else:
+            self.add_path(commodity, np.asarray(edges, dtype=np.int32), float(self.demands[commodity]))
+
+    def congested(self, commodities: list[int]) -> list[int]:
+        """Commodities of `commodities` with a path over an edge whose flow exceeds its capacity."""
+        over = self.edge_flow > self.snapshot.capacity + EPSILON
+        return [c for c in commodities if any(over[edges].any() for edges, _ in self.paths[c])]
+
+    def primary_edges(self, commodity: int) -> np.ndarray | None:
+        """Edges of the path carrying the largest share of the commodity."""
+        if not self.paths[commodity]:
+            return None
+        return max(self.paths[commodity], key=lambda path: path[1])[0]
+
+    def primary_route(self, commodity: int, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Route description (as `network.router.route_result`) of the primary path, {} if unrouted."""
+        edges = self.primary_edges(commodity)
+        if edges is None:
+            return {}
+        nodes = self.snapshot.edge_path_nodes(self.sources[commodity], edges)
+        return route_result(self.snapshot, nodes, edges.tolist(), params)
+
+    def utilization(self) -> np.ndarray:
+        """Flow divided by capacity of every collapsed edge."""
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.snapshot.capacity > 0, self.edge_flow / self.snapshot.capacity, 0.0)
+
+    def write_back(self, graph: nx.MultiGraph) -> None:
+        """Stores the assigned flow in the `flow` attribute of the edges chosen by the snapshot."""
+        snapshot = self.snapshot
+        for e, (iu, iv, flow) in enumerate(zip(snapshot.edge_u.tolist(), snapshot.edge_v.tolist(),
+                                                 self.edge_flow.tolist())):
+            u = snapshot.node_ids[iu]
+            v = snapshot.node_ids[iv]
+            if graph.is_multigraph():
+                graph[u][v][snapshot.edge_keys[e]]["flow"] = flow
+            else:
+                graph[u][v]["flow"] = flow
+
+
+def assign_flows(graph: nx.Graph, commodities: list[tuple[int | str, int | str, float]],
+                 max_rounds: int = 50, allow_overflow: bool = True,
+                 params: list[Optional[Dict[str, Any]]] = None) -> FlowAssignment:
+    """
+    Batched successive-shortest-path assignment of many commodities under edge capacities.
+
+    Every round grows one cheapest-path tree per source over the residual network (active
+    edges with free capacity) and pushes each pending commodity of that source along its
+    tree path, up to the path's residual bottleneck. Commodities that hit a saturated edge
+    keep their remainder for the next round, so capacity only changes routes where it is
+    actually binding, and far fewer searches run than one Dijkstra per delivery.
+
+    Parameters
+    ----------
+    graph : nx.Graph
+        Network; capacities come from the routing snapshot, inactive elements are skipped.
+    commodities : list[tuple]
+        `(source node, target node, demand)` triples.
+    max_rounds : int
+        Upper bound on residual re-routing rounds.
+    allow_overflow : bool
+        Route the remainder that no longer fits anywhere along the cheapest path regardless
+        of capacity (recorded in `overflow`), instead of leaving it `unassigned`.
+    params : list[dict], optional
+        Courier parameters of every commodity (as `network.router.find_route`); a commodity
+        with a price profile is routed on its courier's per-edge prices, the others on `cost`.
+        Commodities of one source share a tree only if they share the price profile.
+
+    Returns
+    -------
+    FlowAssignment
+    """
+    snapshot, view = get_routing_state(graph)
+    sources = [snapshot.index_of(source) for source, _, _ in commodities]
+    targets = [snapshot.index_of(target) for _, target, _ in commodities]
+    demands = np.array([float(demand) for _, _, demand in commodities], dtype=np.float64)
+    assignment = FlowAssignment(snapshot, sources, targets, demands)
+    _solve(assignment, view, list(range(len(commodities))), params, snapshot.capacity.astype(np.float64),
+           max_rounds, allow_overflow)
+    return assignment
+
+
+def reassign_flows(graph: nx.Graph, assignment: FlowAssignment, commodities: list[int],
+                   params: list[Optional[Dict[str, Any]]] = None, max_rounds: int = 50,
+                   allow_overflow: bool = True) -> None:
+    """
+    Re-solves only `commodities` of an existing assignment, on the capacity left over by
+    all the other commodities and the graph's current active view. Used when some
+    deliveries were rerouted and their new routes overload edges.
+
+    Parameters
+    ----------
+    graph : nx.Graph
+        Network the assignment was computed on (same routing snapshot).
+    assignment : FlowAssignment
+        Assignment updated in-place.
+    commodities : list[int]
+        Indices of the commodities to re-solve.
+    params : list[dict], optional
+        Courier parameters of every commodity of the assignment (as in `assign_flows`).
+    max_rounds, allow_overflow
+        As in `assign_flows`.
+    """
+    snapshot, view = get_routing_state(graph)
+    if snapshot is not assignment.snapshot:
+        raise ValueError("the assignment was computed on another routing snapshot")
+    for c in commodities:
+        assignment.clear(c)
+    residual = np.maximum(snapshot.capacity - assignment.edge_flow, 0.0)
+    _solve(assignment, view, commodities, params, residual, max_rounds, allow_overflow)
+
+
+def _solve(assignment: FlowAssignment, view: ActiveView | None, commodities: list[int], params: list[Optional[Dict[str, Any]]],
+           residual: np.ndarray, max_rounds: int, allow_overflow: bool) -> None:
+    """Successive-shortest-path rounds of `assign_flows` for `commodities` on `residual` capacity."""
+    snapshot = assignment.snapshot
+    sources = assignment.sources
+    targets = assignment.targets
+    prices = [profile_prices(commodity_params) for commodity_params in params or [None] * len(sources)]
+    weights = {prices[c]: snapshot.profile_list(prices[c]) for c in commodities if prices[c] is not None}
+
+    saturated = set(np.flatnonzero(residual <= EPSILON).tolist())
+    remaining = np.zeros(len(sources), dtype=np.float64)
+    remaining[commodities] = assignment.demands[commodities]
+    stuck = set()
+    for c in commodities:
+        if sources[c] is None or targets[c] is None:
+            stuck.add(c)
+
+    for _ in range(max_rounds):
+        pending = defaultdict(list)
+        for c in np.flatnonzero(remaining > EPSILON).tolist():
+            if c not in stuck:
+                pending[(sources[c], prices[c])].append(c)
+        if not pending:
+            break
+
+        progress = False
+        for (source, profile), group in pending.items():
+            tree = shortest_path_tree(snapshot, source, view, {targets[c] for c in group}, saturated,
+                                      weights.get(profile))
+            for c in group:
+                found = tree.path_to(targets[c])
+                if found is None:
+                    stuck.add(c)
+                    continue
+                edges = np.asarray(found[1], dtype=np.int32)
+                amount = remaining[c] if len(edges) == 0 else min(remaining[c], float(residual[edges].min()))
+                if amount <= EPSILON:
+                    # saturated by another commodity of this source in the same round
+                    continue
+                residual[edges] -= amount
+                remaining[c] -= amount
+                assignment.add_path(c, edges, amount)
+                saturated.update(edges[residual[edges] <= EPSILON].tolist())
+                progress = True
+        if not progress:
+            break
+
+    left = np.flatnonzero(remaining > EPSILON).tolist()
+    if allow_overflow and left:
+        by_source = defaultdict(list)
+        for c in left:
+            if sources[c] is not None and targets[c] is not None:
+                by_source[(sources[c], prices[c])].append(c)
+        for (source, profile), group in by_source.items():
+            tree = shortest_path_tree(snapshot, source, view, {targets[c] for c in group},
+                                      weights=weights.get(profile))
+            for c in group:
+                found = tree.path_to(targets[c])
+                if found is None:
+                    continue
+                assignment.add_path(c, np.asarray(found[1], dtype=np.int32), remaining[c])
+                assignment.overflow[c] = remaining[c]
+                remaining[c] = 0.0
+
+    for c in commodities:
+        assignment.unassigned[c] = remaining[c] if remaining[c] > EPSILON else 0.0
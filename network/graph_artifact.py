@@ -0,0 +1,100 @@
+import gc
+import hashlib
+import os
+import pickle
+import sys
+from pathlib import Path
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.node_order import DEFAULT_NODE_ORDER
+from network.routing_snapshot import EDGE_COLUMNS_VERSION
+from network.simulation_graph import SimulationGraph
+
+# wersja formatu artefaktu (zmiana unieważnia wszystkie zapisane artefakty)
+ARTIFACT_VERSION = 1
+# moduły, od których zależy zawartość artefaktu: ich kod jest częścią klucza
+ARTIFACT_SOURCES = (
+    os.path.join("network", "graph_reader.py"),
+    os.path.join("network", "network.py"),
+    os.path.join("network", "simulation_graph.py"),
+    os.path.join("network", "columnar_graph.py"),
+    os.path.join("network", "region_arrays.py"),
+    os.path.join("network", "graph_builder.py"),
+    os.path.join("network", "lazy_network.py"),
+    os.path.join("network", "routing_snapshot.py"),
+    os.path.join("network", "hub_table.py"),
+    os.path.join("data", "input_data", "delivery_data", "courier_companies.py"),
+    os.path.join("network", "node_order.py"),
+    os.path.join("network", "transport_types.py"),
+    os.path.join("utils", "graph_helper.py"),
+)
+
+
+def file_digest(path: str, digest) -> None:
+    """Feeds the name and content of `path` into `digest` ("missing" if it does not exist)."""
+    digest.update(os.path.basename(path).encode())
+    if not os.path.exists(path):
+        digest.update(b"missing")
+        return
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+
+
+def artifact_key(input_paths: list[str]) -> str:
+    """
+    Content hash identifying a prebuilt graph: the input files (graph pickle and its JSON
+    attributes), the code of `ARTIFACT_SOURCES` and the format and column versions.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(f"{ARTIFACT_VERSION}/{EDGE_COLUMNS_VERSION}/{DEFAULT_NODE_ORDER.value}".encode())
+    root = Path(__file__).parent.parent
+    for source in ARTIFACT_SOURCES:
+        file_digest(os.path.join(root, source), digest)
+    for path in input_paths:
+        file_digest(path, digest)
+    return digest.hexdigest()
+
+
+def save_artifact(path: str, graph: SimulationGraph, key: str) -> None:
+    """
+    Writes a ready-to-route graph: a small header with the key, then the graph with its
+    routing snapshot. The file is replaced atomically, so a reader never sees half of it.
+    """
+    graph.get_routing_snapshot()
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        pickle.dump({"version": ARTIFACT_VERSION, "key": key}, file, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.dump(graph, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary, path)
+
+
+def load_artifact(path: str, key: str) -> SimulationGraph | None:
+    """The graph stored at `path`; None if there is none or it was built for another `key`."""
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as file:
+        header = pickle.load(file)
+        if header.get("version") != ARTIFACT_VERSION or header.get("key") != key:
+            return None
+        # graf to setki tysięcy małych obiektów: bez GC w trakcie wczytywania ok. 2x szybciej
+        gc_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return pickle.load(file)
+        finally:
+            if gc_enabled:
+                gc.enable()
+
+
+if __name__ == "__main__":
+    # krok budowania: python -m network.graph_artifact world_ports [region ...]
+    # (kopia kolumnowa wejścia, potem artefakt gotowy do routingu)
+    from network.network import NetworkManager
+    from utils.graph_helper import normalize_country
+
+    manager = NetworkManager()
+    for region in sys.argv[1:] or ["world_ports"]:
+        manager.graph_manager.build_columnar_graph(f"{normalize_country(region)}_motorway.pkl")
+        graph = manager.get_graph_from_file(region, prebuilt=True)
+        print(region, "ready" if graph is not None else "failed")
@@ -0,0 +1,234 @@
+import os
+import sys
+import tracemalloc
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.region_arrays import EDGE_COLUMNS, RegionArrays, edge_data
+from network.simulation_graph import SimulationGraph
+
+# liczba krawędzi przenoszonych do networkx naraz (ogranicza listy tymczasowe)
+EDGE_CHUNK = 1 << 16
+
+
+class GraphBuilder:
+    """
+    Joins region graphs into one `SimulationGraph` without composing them pairwise.
+
+    Regions are copied as `RegionArrays` into preallocated NumPy buffers (grown
+    geometrically when a region does not fit). Node IDs are deduplicated as regions
+    arrive; edges, identified by their endpoints and MultiGraph key, are deduplicated once
+    in `build` with a lexsort. Attributes of repeated nodes and edges are merged in region
+    order, so the result equals composing the regions one after another, but the
+    networkx graph is materialized only once.
+
+    Attributes
+    ----------
+    node_ids : list
+        Distinct node IDs in order of first appearance.
+    number_of_edges : int
+        Edges collected so far, duplicates included.
+    graph_attributes : dict
+        Graph-level attributes of the first region.
+    memory : list[tuple[str, float, float]]
+        With `trace_memory`: (stage, current MB, high-water MB since the previous stage)
+        of memory traced by `tracemalloc`.
+    """
+    def __init__(self, node_capacity: int = 1024, edge_capacity: int = 1024, trace_memory: bool = False):
+        self.node_ids = []
+        self.node_position = {}
+        self.x = np.full(node_capacity, np.nan)
+        self.y = np.full(node_capacity, np.nan)
+        self.node_attributes = np.empty(node_capacity, dtype=object)
+
+        self.number_of_edges = 0
+        self.edge_u = np.empty(edge_capacity, dtype=np.int64)
+        self.edge_v = np.empty(edge_capacity, dtype=np.int64)
+        self.edge_keys = np.empty(edge_capacity, dtype=np.int64)
+        self.edge_columns = {name: np.empty(edge_capacity) for name in EDGE_COLUMNS}
+        self.transport_mode = np.empty(edge_capacity, dtype=np.int8)
+        self.integer_columns = np.empty(edge_capacity, dtype=np.uint8)
+        self.edge_attributes = np.empty(edge_capacity, dtype=object)
+        self.graph_attributes = None
+
+        self.memory = []
+        self.trace_memory = trace_memory
+        self.started_tracing = False
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+    def record_memory(self, stage: str) -> None:
+        if not self.trace_memory:
+            return
+        current, peak = tracemalloc.get_traced_memory()
+        self.memory.append((stage, current / 2 ** 20, peak / 2 ** 20))
+        tracemalloc.reset_peak()
+
+    def memory_report(self) -> str:
+        return "\n".join(f"{stage:<24} current {current:9.1f} MB   peak {peak:9.1f} MB"
+                         for stage, current, peak in self.memory)
+
+    def _grow_nodes(self, needed: int) -> None:
+        capacity = len(self.x)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, fill in (("x", np.nan), ("y", np.nan)):
+            array = getattr(self, name)
+            grown = np.full(capacity, fill)
+            grown[:len(array)] = array
+            setattr(self, name, grown)
+        attributes = np.empty(capacity, dtype=object)
+        attributes[:len(self.node_attributes)] = self.node_attributes
+        self.node_attributes = attributes
+
+    def _grow_edges(self, needed: int) -> None:
+        capacity = len(self.edge_u)
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+
+        def grown(array: np.ndarray) -> np.ndarray:
+            result = np.empty(capacity, dtype=array.dtype)
+            result[:len(array)] = array
+            return result
+
+        self.edge_u = grown(self.edge_u)
+        self.edge_v = grown(self.edge_v)
+        self.edge_keys = grown(self.edge_keys)
+        self.edge_columns = {name: grown(column) for name, column in self.edge_columns.items()}
+        self.transport_mode = grown(self.transport_mode)
+        self.integer_columns = grown(self.integer_columns)
+        self.edge_attributes = grown(self.edge_attributes)
+
+    def add_graph(self, graph: nx.MultiGraph) -> None:
+        self.add_region(RegionArrays.from_graph(graph))
+
+    def add_region(self, region: RegionArrays) -> None:
+        if self.graph_attributes is None:
+            self.graph_attributes = dict(region.graph_attributes)
+        self._grow_nodes(self.number_of_nodes + region.number_of_nodes)
+
+        # pozycje węzłów regionu w buforach (nowe węzły dopisywane na końcu)
+        positions = np.empty(region.number_of_nodes, dtype=np.int64)
+        node_position = self.node_position
+        for i, (node, data) in enumerate(zip(region.node_ids, region.node_attributes)):
+            position = node_position.get(node)
+            if position is None:
+                position = len(self.node_ids)
+                node_position[node] = position
+                self.node_ids.append(node)
+                self.node_attributes[position] = dict(data)
+            else:
+                self.node_attributes[position].update(data)
+            positions[i] = position
+        has_x = ~np.isnan(region.x)
+        has_y = ~np.isnan(region.y)
+        self.x[positions[has_x]] = region.x[has_x]
+        self.y[positions[has_y]] = region.y[has_y]
+
+        start = self.number_of_edges
+        end = start + region.number_of_edges
+        self._grow_edges(end)
+        self.edge_u[start:end] = positions[region.edge_u]
+        self.edge_v[start:end] = positions[region.edge_v]
+        self.edge_keys[start:end] = region.edge_keys
+        for name in EDGE_COLUMNS:
+            self.edge_columns[name][start:end] = region.edge_columns[name]
+        self.transport_mode[start:end] = region.transport_mode
+        self.integer_columns[start:end] = region.integer_columns
+        self.edge_attributes[start:end] = region.edge_attributes
+        self.number_of_edges = end
+        self.record_memory(f"region {self.number_of_nodes} nodes")
+
+    def deduplicate_edges(self) -> tuple[np.ndarray, list[list[int]]]:
+        """
+        Edges to materialize, as buffer positions of the first occurrence of every distinct
+        (endpoints, key) in insertion order, and the groups of positions holding duplicates.
+        """
+        m = self.number_of_edges
+        low = np.minimum(self.edge_u[:m], self.edge_v[:m])
+        high = np.maximum(self.edge_u[:m], self.edge_v[:m])
+        keys = self.edge_keys[:m]
+        order = np.lexsort((np.arange(m), keys, high, low))
+        starts = np.ones(m, dtype=bool)
+        starts[1:] = (np.diff(low[order]) != 0) | (np.diff(high[order]) != 0) | (np.diff(keys[order]) != 0)
+        first = np.sort(order[starts])
+
+        bounds = np.flatnonzero(starts)
+        sizes = np.diff(np.append(bounds, m))
+        repeated = sizes > 1
+        duplicates = [order[b:b + size].tolist() for b, size in zip(bounds[repeated], sizes[repeated])]
+        return first, duplicates
+
+    def build(self, graph: SimulationGraph = None) -> SimulationGraph:
+        """
+        Materializes the collected regions as one `SimulationGraph`, or adds them to `graph`
+        (keeping its graph-level attributes). Buffered attribute dicts are released as soon
+        as networkx has copied them, and the builder is empty afterwards.
+        """
+        if graph is None:
+            attributes = dict(self.graph_attributes or {})
+            graph = SimulationGraph(default_capacity=attributes.pop("default_capacity", 1000),
+                                    default_price=attributes.pop("default_price", 0.5))
+            graph.graph.update(attributes)
+
+        graph.add_nodes_from(self._materialized_nodes())
+        self.record_memory("nodes materialized")
+
+        first, duplicates = self.deduplicate_edges()
+        merged = {}
+        for group in duplicates:
+            data = {}
+            for e in group:
+                columns = [[float(self.edge_columns[name][e])] for name in EDGE_COLUMNS]
+                data.update(edge_data(self.edge_attributes[e], 0, columns, [int(self.transport_mode[e])],
+                                      [int(self.integer_columns[e])]))
+            merged[group[0]] = data
+        graph.add_edges_from(self._materialized_edges(first, merged))
+        graph.invalidate_routing_snapshot()
+        self.record_memory("edges materialized")
+
+        memory = self.memory
+        self.__init__(0, 0)
+        self.memory = memory
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+        return graph
+
+    def _materialized_nodes(self):
+        node_attributes = self.node_attributes
+        for i, (node, x, y) in enumerate(zip(self.node_ids, self.x.tolist(), self.y.tolist())):
+            data = node_attributes[i]
+            node_attributes[i] = None
+            if x == x:
+                data["x"] = x
+            if y == y:
+                data["y"] = y
+            yield node, data
+
+    def _materialized_edges(self, first: np.ndarray, merged: dict[int, dict]):
+        node_ids = self.node_ids
+        edge_attributes = self.edge_attributes
+        for start in range(0, len(first), EDGE_CHUNK):
+            chunk = first[start:start + EDGE_CHUNK]
+            edge_u = self.edge_u[chunk].tolist()
+            edge_v = self.edge_v[chunk].tolist()
+            edge_keys = self.edge_keys[chunk].tolist()
+            columns = [self.edge_columns[name][chunk].tolist() for name in EDGE_COLUMNS]
+            modes = self.transport_mode[chunk].tolist()
+            integers = self.integer_columns[chunk].tolist()
+            for i, e in enumerate(chunk.tolist()):
+                data = merged.pop(e, None)
+                if data is None:
+                    data = edge_data(edge_attributes[e], i, columns, modes, integers)
+                edge_attributes[e] = None
+                yield node_ids[edge_u[i]], node_ids[edge_v[i]], edge_keys[i], data
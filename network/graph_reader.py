@@ -1,5 +1,6 @@
 import os
 import pickle
+import shutil
 import sys
 from pathlib import Path
 
@@ -11,6 +12,21 @@ import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from network.simulation_graph import SimulationGraph
+from network.routing_snapshot import EDGE_COLUMNS_VERSION
+from network.node_order import DEFAULT_NODE_ORDER, reorder_graph
+from network.contraction_hierarchy import ContractionHierarchy
+from network.landmarks import LandmarkTable
+from network.hub_table import HubTable
+from network.graph_artifact import artifact_key, load_artifact, save_artifact
+from network.columnar_graph import load_columns, save_columns
+from network.region_arrays import RegionArrays
+from network.graph_builder import GraphBuilder
+
+
+def is_normalized(graph_attributes : dict) -> bool:
+    """Whether a stored graph already has the routing columns and the default node order."""
+    return graph_attributes.get("edge_columns_version") == EDGE_COLUMNS_VERSION \
+        and graph_attributes.get("node_order") == DEFAULT_NODE_ORDER.value
 
 
 class GraphManager:
@@ -19,6 +35,11 @@ class GraphManager:
         self.graph = None
 
     def load_pickle_graph(self, pickle_file_name) -> SimulationGraph:
+        """
+        Loads a region graph. The columnar copy written by `build_columnar_graph` is used
+        instead of the pickle when its content key still matches the pickle, its JSON
+        attributes and the loading code; nothing is written here.
+        """
         path = Path(__file__).parent.parent
         json_file_name = pickle_file_name.split(".")[0] + ".json"
         
@@ -33,8 +54,14 @@ class GraphManager:
                 "default_price" : 0.5
             }
 
+        pickle_path = os.path.join(path, self.folder, pickle_file_name)
+        if os.path.exists(self.columnar_path(pickle_file_name)):
+            sim_graph = self.load_columnar_graph(pickle_file_name, attributes,
+                                                 key=self.graph_artifact_key(pickle_file_name))
+            if sim_graph is not None and is_normalized(sim_graph.graph):
+                return sim_graph
+
         try:
-            pickle_path = os.path.join(path, self.folder, pickle_file_name)
             with open(pickle_path, "rb") as pickle_file:
                 graph = pickle.load(pickle_file)
             sim_graph = SimulationGraph(incoming_graph_data = graph, 
@@ -44,8 +71,62 @@ class GraphManager:
             print(f"Error loading pickle: {e}")
             return None
         return sim_graph
-        
-    
+
+
+    def build_columnar_graph(self, pickle_file_name) -> SimulationGraph | None:
+        """
+        Build step of the columnar copy used by `load_pickle_graph`: loads the pickle,
+        parses the routing columns and saves the graph in the columnar format, keyed by
+        `graph_artifact_key`. Returns the loaded graph.
+        """
+        columnar_path = self.columnar_path(pickle_file_name)
+        # bez kopii kolumnowej load_pickle_graph czyta marynatę
+        shutil.rmtree(columnar_path, ignore_errors=True)
+        sim_graph = self.load_pickle_graph(pickle_file_name)
+        if sim_graph is None:
+            return None
+        # węzły zapisane w kolejności lokalności, w jakiej numeruje je migawka routingu
+        save_columns(columnar_path, RegionArrays.from_graph(reorder_graph(sim_graph, DEFAULT_NODE_ORDER)),
+                     key=self.graph_artifact_key(pickle_file_name))
+        return sim_graph
+
+
+    def columnar_path(self, file_name) -> str:
+        path = Path(__file__).parent.parent
+        return os.path.join(path, self.folder, file_name.split(".")[0] + "_columns")
+
+
+    def load_columnar_graph(self, file_name, attributes : dict = None, key : str = None) -> SimulationGraph | None:
+        """
+        Loads a graph saved in the columnar format (see `network.columnar_graph`). Numeric
+        columns are memory-mapped and copied straight into one `SimulationGraph`, without an
+        intermediate MultiGraph. `attributes` overrides the stored `default_capacity` and
+        `default_price`; with `key`, columns built from other inputs are ignored (None).
+        """
+        try:
+            arrays = load_columns(self.columnar_path(file_name), mmap_mode="r", key=key)
+        except Exception as e:
+            print(f"Error loading columnar graph: {e}")
+            return None
+        if arrays is None:
+            return None
+        if attributes:
+            arrays.graph_attributes.update({name: attributes[name] for name in ("default_capacity", "default_price")
+                                            if name in attributes})
+        builder = GraphBuilder()
+        builder.add_region(arrays)
+        return builder.build()
+
+
+    def save_columnar_file(self, file_name, graph):
+        """Language-neutral counterpart of `save_pickle_file`: `.npy` columns plus a JSON side table."""
+        path = Path(__file__).parent.parent
+        if isinstance(graph, SimulationGraph):
+            json_full_path = os.path.join(path, self.folder, file_name.split(".")[0] + ".json")
+            with open(json_full_path, "w") as json_file:
+                json.dump(graph.get_additional_attributes(), json_file, indent=4)
+        save_columns(self.columnar_path(file_name), RegionArrays.from_graph(graph))
+
 
     def save_pickle_file(self, file_name, graph):
         path = Path(__file__).parent.parent
@@ -74,3 +155,102 @@ class GraphManager:
             ox.save_graphml(nx.MultiGraph(graph), full_path)
         else: 
             ox.save_graphml(graph, full_path)
+
+
+    def pickle_path(self, pickle_file_name) -> str:
+        path = Path(__file__).parent.parent
+        return os.path.join(path, self.folder, pickle_file_name)
+
+
+    def contraction_hierarchy_path(self, pickle_file_name) -> str:
+        path = Path(__file__).parent.parent
+        return os.path.join(path, self.folder, pickle_file_name.split(".")[0] + "_ch.npz")
+
+
+    def load_contraction_hierarchy(self, pickle_file_name) -> ContractionHierarchy | None:
+        ch_path = self.contraction_hierarchy_path(pickle_file_name)
+        if not os.path.exists(ch_path):
+            return None
+        try:
+            return ContractionHierarchy.load(ch_path)
+        except Exception as e:
+            print(f"Error loading contraction hierarchy: {e}")
+            return None
+
+
+    def save_contraction_hierarchy(self, pickle_file_name, hierarchy: ContractionHierarchy):
+        hierarchy.save(self.contraction_hierarchy_path(pickle_file_name))
+
+
+    def landmarks_path(self, pickle_file_name, metric) -> str:
+        path = Path(__file__).parent.parent
+        return os.path.join(path, self.folder, pickle_file_name.split(".")[0] + f"_landmarks_{metric}.npz")
+
+
+    def load_landmarks(self, pickle_file_name, metric) -> LandmarkTable | None:
+        landmarks_path = self.landmarks_path(pickle_file_name, metric)
+        if not os.path.exists(landmarks_path):
+            return None
+        try:
+            return LandmarkTable.load(landmarks_path)
+        except Exception as e:
+            print(f"Error loading landmarks: {e}")
+            return None
+
+
+    def save_landmarks(self, pickle_file_name, table: LandmarkTable):
+        table.save(self.landmarks_path(pickle_file_name, table.metric))
+
+
+    def hub_table_path(self, pickle_file_name, prices=None) -> str:
+        path = Path(__file__).parent.parent
+        # tablica na koszcie krawędzi bez sufiksu, tablice kurierów z cenami w nazwie
+        suffix = "" if prices is None else "_" + "_".join(f"{price:g}" for price in prices)
+        return os.path.join(path, self.folder, pickle_file_name.split(".")[0] + f"_hubs{suffix}.npz")
+
+
+    def load_hub_table(self, pickle_file_name, prices=None) -> HubTable | None:
+        hubs_path = self.hub_table_path(pickle_file_name, prices)
+        if not os.path.exists(hubs_path):
+            return None
+        try:
+            return HubTable.load(hubs_path)
+        except Exception as e:
+            print(f"Error loading hub table: {e}")
+            return None
+
+
+    def save_hub_table(self, pickle_file_name, table: HubTable):
+        table.save(self.hub_table_path(pickle_file_name, table.prices))
+
+
+    def graph_artifact_path(self, pickle_file_name) -> str:
+        path = Path(__file__).parent.parent
+        return os.path.join(path, self.folder, pickle_file_name.split(".")[0] + "_prebuilt.pkl")
+
+
+    def graph_artifact_key(self, pickle_file_name) -> str:
+        path = Path(__file__).parent.parent
+        json_file_name = pickle_file_name.split(".")[0] + ".json"
+        return artifact_key([os.path.join(path, self.folder, pickle_file_name),
+                             os.path.join(path, self.folder, json_file_name)])
+
+
+    def load_graph_artifact(self, pickle_file_name, key) -> SimulationGraph | None:
+        try:
+            return load_artifact(self.graph_artifact_path(pickle_file_name), key)
+        except Exception as e:
+            print(f"Error loading graph artifact: {e}")
+            return None
+
+
+    def save_graph_artifact(self, pickle_file_name, graph: SimulationGraph, key):
+        try:
+            save_artifact(self.graph_artifact_path(pickle_file_name), graph, key)
+        except Exception as e:
+            print(f"Error saving graph artifact: {e}")
+
+
+    def lazy_network_path(self, pickle_file_name) -> str:
+        path = Path(__file__).parent.parent
+        return os.path.join(path, self.folder, pickle_file_name.split(".")[0] + "_lazy")
@@ -0,0 +1,342 @@
+import heapq
+import os
+import sys
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.routing_snapshot import RoutingSnapshot
+
+HUB_TYPES = ("airport", "seaport")
+# liczba wierszy liczonych jednym wywołaniem csgraph (ogranicza pamięć macierzy poprzedników)
+ROW_CHUNK = 32
+
+
+class HubTable:
+    """
+    All-pairs cheapest routes between the airport and seaport nodes of a network, on the
+    edge `cost` or on the edge prices of one courier profile (see
+    `network.router.profile_prices`); a network keeps one table per profile.
+
+    The table holds hub-to-hub cost, length and lead time as (hubs x hubs) NumPy matrices
+    and the edge indices of every hub-to-hub route. A query then only searches from the
+    source to its nearby hubs and from the target to its nearby hubs (hubs are reached
+    but never expanded) and joins both sides through the table; the plain road route is
+    found by the same two searches when they meet.
+
+    The table follows an `ActiveView` as a listener. Closing a hub only marks its row and
+    column unreachable; closing other nodes or edges recomputes a small set of rows (and,
+    the graph being undirected, the matching columns) covering the pairs whose stored
+    routes became invalid. Reopening a hub recomputes its row and relaxes the other pairs
+    through it. Only reopening a non-hub element requires recomputing the whole table.
+
+    Attributes
+    ----------
+    hubs : np.ndarray[int32]
+        Dense indices of the hub nodes.
+    cost, length, lead_time : np.ndarray[float64]
+        Matrices of shape (hubs, hubs) along the cheapest route (length in meters, lead
+        time in days); inf where a hub pair is disconnected or a hub is closed.
+    paths : list[np.ndarray]
+        Edge indices of the route from hub `i` to hub `j` at position `i * len(hubs) + j`.
+    checksum : str
+        `RoutingSnapshot.checksum` of the snapshot the table was built for.
+    prices : tuple[float, float, float] | None
+        Courier price profile `cost` is measured in, None for the edge `cost`.
+    """
+    def __init__(self, hubs: np.ndarray, cost: np.ndarray, length: np.ndarray, lead_time: np.ndarray,
+                 paths: list[np.ndarray], checksum: str, prices: tuple[float, float, float] = None):
+        self.hubs = hubs
+        self.prices = prices
+        self.cost = cost
+        self.length = length
+        self.lead_time = lead_time
+        self.paths = paths
+        self.checksum = checksum
+        self.hub_position = {hub: i for i, hub in enumerate(hubs.tolist())}
+        self.snapshot = None
+        self.view = None
+        self.closed = False
+        self.reopened_hubs = set()
+        self.full_refresh = False
+
+    @property
+    def number_of_hubs(self) -> int:
+        return len(self.hubs)
+
+    def edge_costs(self) -> np.ndarray:
+        """Per-edge weights of the table: the snapshot's `cost` or the profile's edge prices."""
+        if self.prices is None:
+            return self.snapshot.cost
+        return self.snapshot.profile_cost(self.prices)
+
+    @classmethod
+    def build(cls, snapshot: RoutingSnapshot, graph: nx.Graph, prices: tuple[float, float, float] = None) -> "HubTable":
+        """
+        Computes the table on the unrestricted network, hubs being nodes typed airport or
+        seaport, on the edge `cost` or on the edge prices of the courier profile `prices`.
+        """
+        if snapshot.directed:
+            raise ValueError("Hub tables are built for undirected graphs only")
+        hubs = np.array([i for i, node in enumerate(snapshot.node_ids)
+                         if graph.nodes[node].get("type") in HUB_TYPES], dtype=np.int32)
+        h = len(hubs)
+        table = cls(hubs, np.full((h, h), np.inf), np.full((h, h), np.inf), np.full((h, h), np.inf),
+                    [None] * (h * h), snapshot.checksum(), prices)
+        table.snapshot = snapshot
+        table.compute_rows(list(range(h)))
+        return table
+
+    def save(self, path: str) -> None:
+        lengths = np.array([len(edges) if edges is not None else 0 for edges in self.paths], dtype=np.int64)
+        offsets = np.zeros(len(self.paths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        edges = [edges for edges in self.paths if edges is not None and len(edges)]
+        path_edges = np.concatenate(edges) if edges else np.empty(0, dtype=np.int32)
+        np.savez(path, hubs=self.hubs, cost=self.cost, length=self.length, lead_time=self.lead_time,
+                 path_offsets=offsets, path_edges=path_edges, checksum=np.array(self.checksum),
+                 prices=np.array(self.prices if self.prices is not None else (), dtype=np.float64))
+
+    @classmethod
+    def load(cls, path: str) -> "HubTable":
+        with np.load(path) as data:
+            cost = data["cost"]
+            offsets = data["path_offsets"]
+            path_edges = data["path_edges"]
+            finite = np.isfinite(cost).ravel()
+            paths = [path_edges[offsets[i]:offsets[i + 1]] if finite[i] else None for i in range(len(finite))]
+            prices = tuple(data["prices"].tolist()) if "prices" in data.files and len(data["prices"]) else None
+            return cls(data["hubs"], cost, data["length"], data["lead_time"], paths, str(data["checksum"]), prices)
+
+    def matches(self, snapshot: RoutingSnapshot, prices: tuple[float, float, float] = None) -> bool:
+        return self.checksum == snapshot.checksum() and self.prices == prices
+
+    def attach(self, snapshot: RoutingSnapshot, view=None) -> None:
+        """
+        Binds the table to the snapshot it was built for and follows the changes of `view`.
+        Elements already inactive in `view` are applied on the next query.
+        """
+        if view is not None and view is self.view:
+            return
+        if self.view is not None and self in self.view.listeners:
+            self.view.listeners.remove(self)
+        self.snapshot = snapshot
+        self.view = view
+        if view is not None:
+            view.listeners.append(self)
+            if not view.is_unrestricted():
+                self.closed = True
+
+    def nodes_changed(self, indices: list[int], active: bool) -> None:
+        if not active:
+            self.closed = True
+            return
+        for i in indices:
+            if i in self.hub_position:
+                self.reopened_hubs.add(i)
+            else:
+                self.full_refresh = True
+
+    def edges_changed(self, indices: list[int], active: bool) -> None:
+        if not active:
+            self.closed = True
+        elif indices:
+            self.full_refresh = True
+
+    def refresh(self) -> None:
+        """Brings the table up to date with the attached view."""
+        if self.full_refresh:
+            self.compute_rows(list(range(self.number_of_hubs)))
+        else:
+            rows = set()
+            if self.closed:
+                rows.update(self.invalid_rows())
+            reopened = [self.hub_position[hub] for hub in self.reopened_hubs]
+            rows.update(reopened)
+            if rows:
+                self.compute_rows(sorted(rows))
+            for k in reopened:
+                self.relax_through(k)
+        self.closed = False
+        self.reopened_hubs = set()
+        self.full_refresh = False
+
+    def invalid_rows(self) -> list[int]:
+        """
+        Rows to recompute after closures. Pairs with a closed hub are marked unreachable
+        directly; the other pairs whose stored route crosses an inactive node or edge are
+        covered greedily by as few rows as possible, every row also refreshing its column.
+        """
+        view = self.view
+        if view is None or view.is_unrestricted():
+            return []
+        snapshot = self.snapshot
+        h = self.number_of_hubs
+        for k in np.flatnonzero(~view.node_mask[self.hubs]).tolist():
+            for j in range(h):
+                self._store(k, j, None)
+                self._store(j, k, None)
+
+        lengths = np.array([len(edges) if edges is not None else 0 for edges in self.paths], dtype=np.int64)
+        if not lengths.sum():
+            return []
+        edges = np.concatenate([edges for edges in self.paths if edges is not None and len(edges)])
+        blocked = ~(view.edge_mask[edges] & view.node_mask[snapshot.edge_u[edges]]
+                    & view.node_mask[snapshot.edge_v[edges]])
+        # liczba zablokowanych krawędzi każdej trasy z sum skumulowanych
+        counts = np.concatenate([[0], np.cumsum(blocked)])
+        ends = np.cumsum(lengths)
+        invalid = np.flatnonzero(counts[ends] > counts[ends - lengths])
+        first, second = invalid // h, invalid % h
+        pairs = np.stack([first, second])[:, first < second]
+
+        rows = []
+        while pairs.shape[1]:
+            row = int(np.argmax(np.bincount(pairs.ravel(), minlength=h)))
+            rows.append(row)
+            pairs = pairs[:, (pairs[0] != row) & (pairs[1] != row)]
+        return sorted(rows)
+
+    def compute_rows(self, rows: list[int]) -> None:
+        """Recomputes rows (and, the graph being undirected, the matching columns) on the active network."""
+        snapshot = self.snapshot
+        view = self.view
+        n = snapshot.number_of_nodes
+        h = self.number_of_hubs
+        usable = np.ones(snapshot.number_of_edges, dtype=bool)
+        if view is not None and not view.is_unrestricted():
+            usable = view.edge_mask & view.node_mask[snapshot.edge_u] & view.node_mask[snapshot.edge_v]
+        matrix = sp.csr_matrix((self.edge_costs()[usable], (snapshot.edge_u[usable], snapshot.edge_v[usable])),
+                               shape=(n, n))
+        hubs = self.hubs.tolist()
+        hub_active = np.ones(h, dtype=bool) if view is None else view.node_mask[self.hubs]
+
+        for start in range(0, len(rows), ROW_CHUNK):
+            chunk = rows[start:start + ROW_CHUNK]
+            _, predecessors = dijkstra(matrix, directed=False, indices=self.hubs[chunk], return_predecessors=True)
+            for row, pred in zip(chunk, predecessors):
+                for j in range(h):
+                    edges = None
+                    if hub_active[row] and hub_active[j]:
+                        edges = self._trace(pred, hubs[row], hubs[j])
+                    self._store(row, j, edges)
+                    if j != row:
+                        self._store(j, row, edges[::-1].copy() if edges is not None else None)
+
+    def _trace(self, pred: np.ndarray, source: int, target: int) -> np.ndarray | None:
+        if source == target:
+            return np.empty(0, dtype=np.int32)
+        if pred[target] < 0:
+            return None
+        edges = []
+        current = target
+        while current != source:
+            parent = int(pred[current])
+            edges.append(self.snapshot.find_edge(parent, current))
+            current = parent
+        return np.asarray(edges[::-1], dtype=np.int32)
+
+    def _store(self, i: int, j: int, edges: np.ndarray | None) -> None:
+        snapshot = self.snapshot
+        self.paths[i * self.number_of_hubs + j] = edges
+        if edges is None:
+            self.cost[i, j] = self.length[i, j] = self.lead_time[i, j] = np.inf
+        else:
+            self.cost[i, j] = self.edge_costs()[edges].sum()
+            self.length[i, j] = snapshot.length[edges].sum()
+            self.lead_time[i, j] = snapshot.lead_time[edges].sum()
+
+    def relax_through(self, k: int) -> None:
+        """Improves every pair whose cheapest route now passes the reopened hub `k`."""
+        h = self.number_of_hubs
+        via = self.cost[:, k][:, None] + self.cost[k, :][None, :]
+        for i, j in zip(*np.nonzero(via < self.cost)):
+            i, j = int(i), int(j)
+            self.paths[i * h + j] = np.concatenate([self.paths[i * h + k], self.paths[k * h + j]])
+            self.cost[i, j] = via[i, j]
+            self.length[i, j] = self.length[i, k] + self.length[k, j]
+            self.lead_time[i, j] = self.lead_time[i, k] + self.lead_time[k, j]
+
+    def shortest_path(self, source: int, target: int) -> tuple[list[int], list[int]] | None:
+        """Same contract as `RoutingSnapshot.dijkstra_path` on the attached view."""
+        snapshot = self.snapshot
+        view = self.view
+        blocked_nodes = view.inactive_nodes if view is not None else ()
+        blocked_edges = view.inactive_edges if view is not None else ()
+        if source in blocked_nodes or target in blocked_nodes:
+            return None
+        if self.closed or self.reopened_hubs or self.full_refresh:
+            self.refresh()
+
+        offsets, neighbors, half_edges, cost = snapshot.adjacency_lists()
+        if self.prices is not None:
+            cost = snapshot.profile_list(self.prices)
+        hub_position = self.hub_position
+        h = self.number_of_hubs
+        # [0] wyszukiwanie od źródła, [1] od celu; huby są osiągane, ale nie rozwijane
+        dist = ({source: 0.0}, {target: 0.0})
+        pred = ({}, {})
+        settled = (set(), set())
+        heaps = ([(0.0, source)], [(0.0, target)])
+        hub_dist = (np.full(h, np.inf), np.full(h, np.inf))
+        best = np.inf
+        best_join = None
+
+        while True:
+            open_sides = [side for side in (0, 1) if heaps[side] and heaps[side][0][0] < best]
+            if not open_sides:
+                break
+            side = min(open_sides, key=lambda s: len(heaps[s]))
+            d, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+
+            if u in settled[1 - side] and d + dist[1 - side][u] < best:
+                best = d + dist[1 - side][u]
+                best_join = (u, u)
+            position = hub_position.get(u)
+            if position is not None:
+                hub_dist[side][position] = d
+                through = self.cost[position] if side == 0 else self.cost[:, position]
+                totals = through + hub_dist[1 - side]
+                other = int(np.argmin(totals))
+                if d + totals[other] < best:
+                    best = d + totals[other]
+                    best_join = (u, int(self.hubs[other])) if side == 0 else (int(self.hubs[other]), u)
+                if u != (source, target)[side]:
+                    continue
+
+            for i in range(offsets[u], offsets[u + 1]):
+                v = neighbors[i]
+                if v in settled[side] or v in blocked_nodes:
+                    continue
+                e = half_edges[i]
+                if e in blocked_edges:
+                    continue
+                nd = d + cost[e]
+                if nd < dist[side].get(v, np.inf):
+                    dist[side][v] = nd
+                    pred[side][v] = (u, e)
+                    heapq.heappush(heaps[side], (nd, v))
+
+        if best_join is None:
+            return None
+
+        first, last = best_join
+        edge_path = []
+        current = first
+        while current != source:
+            current, e = pred[0][current]
+            edge_path.append(e)
+        edge_path.reverse()
+        if first != last:
+            edge_path.extend(self.paths[hub_position[first] * h + hub_position[last]].tolist())
+        current = last
+        while current != target:
+            current, e = pred[1][current]
+            edge_path.append(e)
+        return snapshot.edge_path_nodes(source, edge_path), edge_path
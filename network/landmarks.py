@@ -0,0 +1,128 @@
+import heapq
+import os
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.routing_snapshot import RoutingSnapshot
+
+INF = float("inf")
+
+
+def metric_distances(snapshot: RoutingSnapshot, source: int, metric: str = "length") -> np.ndarray:
+    """Full single-source Dijkstra over the unrestricted snapshot. Unreachable nodes get NaN."""
+    offsets, neighbors, half_edges, _ = snapshot.adjacency_lists()
+    weights = snapshot.metric_list(metric)
+
+    dist = {source: 0.0}
+    settled = set()
+    heap = [(0.0, source)]
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in settled:
+            continue
+        settled.add(u)
+        for i in range(offsets[u], offsets[u + 1]):
+            v = neighbors[i]
+            if v in settled:
+                continue
+            nd = d + weights[half_edges[i]]
+            if nd < dist.get(v, INF):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+
+    distances = np.full(snapshot.number_of_nodes, np.nan, dtype=np.float64)
+    distances[list(dist.keys())] = list(dist.values())
+    return distances
+
+
+class LandmarkTable:
+    """
+    ALT (A*, landmarks, triangle inequality) lower bounds for one edge metric.
+
+    For every landmark `l` the table holds the exact distance `d(l, v)` to every node.
+    By the triangle inequality `|d(l, t) - d(l, v)|` never exceeds `d(v, t)`, so the
+    maximum over all landmarks is an admissible and consistent A* heuristic. The
+    distances are computed on the unrestricted graph; deactivating nodes or edges can
+    only make paths longer, so the bounds stay valid during disruptions.
+
+    The tables serve `SimulationGraph.astar` on `length` or `cost` only; courier priced
+    routing does not use them, and the simulation does not build them.
+
+    Attributes
+    ----------
+    metric : str
+        Edge weight the distances are measured in (`length` or `cost`).
+    landmarks : np.ndarray[int32]
+        Dense indices of the landmark nodes.
+    distances : np.ndarray[float64]
+        Array of shape (number of nodes, number of landmarks); NaN where a node is not
+        reachable from a landmark.
+    count : int
+        Number of landmarks requested at build time (fewer are kept on tiny graphs).
+    checksum : str
+        `RoutingSnapshot.checksum` of the snapshot the table was built for.
+    """
+    def __init__(self, metric: str, landmarks: np.ndarray, distances: np.ndarray, count: int, checksum: str):
+        self.metric = metric
+        self.landmarks = landmarks
+        self.distances = distances
+        self.count = count
+        self.checksum = checksum
+
+    @classmethod
+    def build(cls, snapshot: RoutingSnapshot, count: int = 16, metric: str = "length") -> "LandmarkTable":
+        """
+        Selects up to `count` landmarks by farthest-point selection: every next landmark is
+        the node farthest from all landmarks chosen so far, nodes in components without a
+        landmark being infinitely far. Stops early once every node is a landmark's distance 0.
+        """
+        n = snapshot.number_of_nodes
+        columns = []
+        landmarks = []
+        if n > 0:
+            start = metric_distances(snapshot, 0, metric)
+            nearest = np.where(np.isnan(start), -np.inf, start)
+            candidate = int(np.argmax(nearest))
+            closest = np.full(n, np.inf)
+            while len(landmarks) < count:
+                distances = metric_distances(snapshot, candidate, metric)
+                landmarks.append(candidate)
+                columns.append(distances)
+                closest = np.fmin(closest, distances)
+                candidate = int(np.argmax(closest))
+                if closest[candidate] <= 0.0:
+                    break
+
+        distances = np.column_stack(columns) if columns else np.empty((n, 0), dtype=np.float64)
+        return cls(metric, np.asarray(landmarks, dtype=np.int32), np.ascontiguousarray(distances), count,
+                   snapshot.checksum())
+
+    def save(self, path: str) -> None:
+        np.savez(path, metric=np.array(self.metric), landmarks=self.landmarks, distances=self.distances,
+                 count=np.array(self.count), checksum=np.array(self.checksum))
+
+    @classmethod
+    def load(cls, path: str) -> "LandmarkTable":
+        with np.load(path) as data:
+            return cls(str(data["metric"]), data["landmarks"], data["distances"], int(data["count"]),
+                       str(data["checksum"]))
+
+    def matches(self, snapshot: RoutingSnapshot, count: int = None) -> bool:
+        if count is not None and self.count < count:
+            return False
+        return self.checksum == snapshot.checksum()
+
+    def lower_bounds(self, target: int) -> np.ndarray:
+        """Landmark lower bound of the distance from every node to `target`, in one vectorized pass."""
+        if not len(self.landmarks):
+            return np.zeros(len(self.distances), dtype=np.float64)
+        bounds = np.fmax.reduce(np.abs(self.distances - self.distances[target]), axis=1)
+        return np.nan_to_num(bounds, nan=0.0)
+
+    def separates(self, source: int, target: int) -> bool:
+        """True if some landmark reaches exactly one of the nodes, i.e. they lie in different components."""
+        reached_source = ~np.isnan(self.distances[source])
+        reached_target = ~np.isnan(self.distances[target])
+        return bool(np.any(reached_source != reached_target))
@@ -0,0 +1,431 @@
+import heapq
+import json
+import os
+import shutil
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.columnar_graph import load_columns, save_columns
+from network.graph_builder import GraphBuilder
+from network.region_arrays import RegionArrays
+from network.router import get_routing_state, profile_prices, route_metrics
+from network.routing_snapshot import RoutingSnapshot
+from network.simulation_graph import SimulationGraph
+
+# węzły tych typów należą zawsze do szkieletu, niezależnie od atrybutu country
+HUB_TYPES = ("airport", "seaport")
+# przybliżony koszt jednego węzła lub krawędzi SimulationGraph (atrybuty + snapshot)
+ELEMENT_BYTES = 1200
+DEFAULT_MEMORY_BUDGET_MB = 512
+INDEX_FILE = "index.json"
+# część sieci: szkielet albo numer regionu
+BACKBONE = -1
+
+
+def node_region(data: dict) -> str | None:
+    """Region of a node for partitioning: its `country`, None for hubs and nodes without one."""
+    if data.get("type") in HUB_TYPES:
+        return None
+    return data.get("country")
+
+
+def region_arrays(graph: nx.Graph, nodes: list, edges: list) -> RegionArrays:
+    part = nx.MultiGraph()
+    part.graph.update(graph.graph)
+    part.add_nodes_from((node, graph.nodes[node]) for node in nodes)
+    part.add_edges_from(edges)
+    arrays = RegionArrays.from_graph(part)
+    arrays.graph_attributes.update(default_capacity=getattr(graph, "default_capacity", 1000),
+                                   default_price=getattr(graph, "default_price", 0.5))
+    return arrays
+
+
+class LazyRegion:
+    """
+    A resident region of `LazyNetwork`: its own `SimulationGraph` (portals included),
+    whose routing snapshot is built once on page-in and kept until eviction.
+
+    Attributes
+    ----------
+    graph : SimulationGraph
+        Nodes and internal edges of the region.
+    portals : list
+        Region nodes that are also in the backbone.
+    size_mb : float
+        Estimated memory of the region (`ELEMENT_BYTES` per node and edge).
+    to_backbone : np.ndarray[int32]
+        Backbone dense index of every region dense index, -1 for non-portals.
+    from_backbone : dict[int, int]
+        Mapping: backbone dense index of a portal -> region dense index.
+    """
+    def __init__(self, graph: SimulationGraph, portals: list, size_mb: float):
+        self.graph = graph
+        self.portals = portals
+        self.size_mb = size_mb
+        self.to_backbone = None
+        self.from_backbone = None
+        self._linked = (None, None)
+
+    def link(self, backbone: RoutingSnapshot) -> None:
+        """Indexes the portals by their positions in both snapshots (again only if either was rebuilt)."""
+        snapshot = self.graph.get_routing_snapshot()
+        if self._linked[0] is snapshot and self._linked[1] is backbone:
+            return
+        self.to_backbone = np.full(len(snapshot.node_ids), -1, dtype=np.int32)
+        self.from_backbone = {}
+        for node in self.portals:
+            i, b = snapshot.index_of(node), backbone.index_of(node)
+            if i is not None and b is not None:
+                self.to_backbone[i] = b
+                self.from_backbone[b] = i
+        self._linked = (snapshot, backbone)
+
+
+class LazyNetwork:
+    """
+    World network with an always-resident backbone and regions paged in on demand.
+
+    `build` partitions a full graph by the `country` attribute of its nodes. The backbone
+    holds the hubs (airports, seaports), every edge whose endpoints lie in different
+    regions and the endpoints of those edges, the portals of their regions. Each region
+    keeps its own nodes (portals included) and internal edges. All parts are stored in
+    the columnar format of `network.columnar_graph`.
+
+    Every part is a separate `SimulationGraph` with its own routing snapshot, built once
+    when the part is loaded; paging a region in or out never touches the other parts.
+    `find_route` runs one Dijkstra over all parts, a node being a (part, dense index)
+    pair: a settled portal continues at zero cost on its other side, and a region is
+    paged in the first time the search settles one of its portals. Any route through a
+    region has to enter it through a portal, so the result equals the route on the full
+    graph. After each query the least recently used regions are evicted until the
+    estimate of resident memory fits the budget; evicting drops changes made to a
+    region's nodes and edges (flows, disruptions), so the lazy mode is meant for route
+    queries.
+
+    Attributes
+    ----------
+    backbone : SimulationGraph
+        Hubs, cross-region edges and portals.
+    regions : list[str]
+        Region names; regions are identified by their position in this list.
+    resident : OrderedDict[int, LazyRegion]
+        Resident regions from least to most recently used.
+    backbone_portals : np.ndarray[int32]
+        Region of every backbone dense index, -1 for hubs.
+    memory_budget_mb : float
+        Upper bound on the estimated size of the resident parts between queries (during
+        a query the regions it reached are never evicted).
+    page_ins, evictions : int
+        Counters since opening.
+    """
+    def __init__(self, directory: str, memory_budget_mb: float = DEFAULT_MEMORY_BUDGET_MB):
+        self.directory = directory
+        self.memory_budget_mb = memory_budget_mb
+        with open(os.path.join(directory, INDEX_FILE), "r") as file:
+            index = json.load(file)
+        self.key = index["key"]
+        self.regions = index["regions"]
+        self.portals = index["portals"]
+        self.portal_region = {node: region for region, nodes in enumerate(self.portals) for node in nodes}
+        self.other_node_regions = index["other_nodes"]
+        # indeks węzeł -> region dla węzłów poza pamięcią (mapowany, nie wczytywany w całości)
+        self.node_ids = np.load(os.path.join(directory, "node_ids.npy"), mmap_mode="r")
+        self.node_regions = np.load(os.path.join(directory, "node_regions.npy"), mmap_mode="r")
+
+        arrays = load_columns(os.path.join(directory, "backbone"))
+        self.backbone_mb = (arrays.number_of_nodes + len(arrays.edge_u)) * ELEMENT_BYTES / 2 ** 20
+        builder = GraphBuilder()
+        builder.add_region(arrays)
+        self.backbone = builder.build()
+        self.backbone_portals = None
+        self._backbone_snapshot = None
+        self.resident = OrderedDict()
+        self.page_ins = 0
+        self.evictions = 0
+
+    @staticmethod
+    def build(graph: SimulationGraph, directory: str, key: str) -> None:
+        """Partitions `graph` into the backbone and regions and writes them to `directory`."""
+        parts = {node: node_region(data) for node, data in graph.nodes(data=True)}
+        regions = sorted({region for region in parts.values() if region is not None})
+        code = {region: i for i, region in enumerate(regions)}
+
+        backbone_edges = []
+        region_edges = [[] for _ in regions]
+        portals = [[] for _ in regions]
+        portal_set = set()
+        for u, v, edge_key, data in graph.edges(keys=True, data=True):
+            if parts[u] is not None and parts[u] == parts[v]:
+                region_edges[code[parts[u]]].append((u, v, edge_key, data))
+                continue
+            backbone_edges.append((u, v, edge_key, data))
+            for node in (u, v):
+                if parts[node] is not None and node not in portal_set:
+                    portal_set.add(node)
+                    portals[code[parts[node]]].append(node)
+
+        region_nodes = [[] for _ in regions]
+        backbone_nodes = []
+        for node, region in parts.items():
+            if region is None or node in portal_set:
+                backbone_nodes.append(node)
+            if region is not None:
+                region_nodes[code[region]].append(node)
+
+        temporary = directory + ".tmp"
+        shutil.rmtree(temporary, ignore_errors=True)
+        os.makedirs(os.path.join(temporary, "regions"))
+        save_columns(os.path.join(temporary, "backbone"), region_arrays(graph, backbone_nodes, backbone_edges))
+        for i in range(len(regions)):
+            save_columns(os.path.join(temporary, "regions", str(i)), region_arrays(graph, region_nodes[i], region_edges[i]))
+
+        integer_nodes = [(node, code[region]) for node, region in parts.items()
+                         if region is not None and isinstance(node, (int, np.integer)) and not isinstance(node, bool)]
+        integer_nodes.sort()
+        np.save(os.path.join(temporary, "node_ids.npy"), np.array([node for node, _ in integer_nodes], dtype=np.int64))
+        np.save(os.path.join(temporary, "node_regions.npy"), np.array([i for _, i in integer_nodes], dtype=np.int32))
+        index = {
+            "key": key,
+            "regions": regions,
+            "portals": portals,
+            "other_nodes": {str(node): code[region] for node, region in parts.items()
+                            if region is not None and not isinstance(node, (int, np.integer))},
+        }
+        with open(os.path.join(temporary, INDEX_FILE), "w") as file:
+            json.dump(index, file, default=lambda value: value.item())
+
+        shutil.rmtree(directory, ignore_errors=True)
+        os.replace(temporary, directory)
+
+    @staticmethod
+    def stored_key(directory: str) -> str | None:
+        path = os.path.join(directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r") as file:
+            return json.load(file).get("key")
+
+    def region_of(self, node: int | str) -> int | None:
+        """Region holding `node`; None for backbone-only nodes (hubs) and unknown nodes."""
+        if node in self.portal_region:
+            return self.portal_region[node]
+        if isinstance(node, (int, np.integer)) and not isinstance(node, bool):
+            i = int(np.searchsorted(self.node_ids, node))
+            if i < len(self.node_ids) and self.node_ids[i] == node:
+                return int(self.node_regions[i])
+            return None
+        return self.other_node_regions.get(str(node))
+
+    def resident_mb(self) -> float:
+        return self.backbone_mb + sum(region.size_mb for region in self.resident.values())
+
+    def page_in(self, region: int, pinned: set[int] = frozenset()) -> LazyRegion:
+        """Loads `region` if needed, first evicting regions outside `pinned` to make room for it."""
+        if region in self.resident:
+            self.resident.move_to_end(region)
+            return self.resident[region]
+        arrays = load_columns(os.path.join(self.directory, "regions", str(region)))
+        size_mb = (arrays.number_of_nodes + len(arrays.edge_u)) * ELEMENT_BYTES / 2 ** 20
+        self.evict_to_budget(pinned, size_mb)
+        builder = GraphBuilder()
+        builder.add_region(arrays)
+        part = LazyRegion(builder.build(), self.portals[region], size_mb)
+        self.resident[region] = part
+        self.page_ins += 1
+        return part
+
+    def evict(self, region: int) -> None:
+        del self.resident[region]
+        self.evictions += 1
+
+    def evict_to_budget(self, pinned: set[int] = frozenset(), reserve_mb: float = 0.0) -> None:
+        """Evicts least recently used regions outside `pinned` until `reserve_mb` more fits the budget."""
+        for region in list(self.resident):
+            if self.resident_mb() + reserve_mb <= self.memory_budget_mb:
+                break
+            if region not in pinned:
+                self.evict(region)
+
+    def link_backbone(self) -> RoutingSnapshot:
+        """Backbone snapshot, with `backbone_portals` indexed by its positions."""
+        snapshot = self.backbone.get_routing_snapshot()
+        if snapshot is not self._backbone_snapshot:
+            self.backbone_portals = np.full(len(snapshot.node_ids), -1, dtype=np.int32)
+            for region, nodes in enumerate(self.portals):
+                for node in nodes:
+                    i = snapshot.index_of(node)
+                    if i is not None:
+                        self.backbone_portals[i] = region
+            self._backbone_snapshot = snapshot
+        return snapshot
+
+    def locate(self, node: int | str, pinned: set[int]) -> list[tuple[int, int]]:
+        """All (part, dense index) positions of `node`, paging in its region."""
+        positions = []
+        backbone_index = self.link_backbone().index_of(node)
+        if backbone_index is not None:
+            positions.append((BACKBONE, backbone_index))
+        region = self.region_of(node)
+        if region is not None:
+            pinned.add(region)
+            index = self.page_in(region, pinned).graph.get_routing_snapshot().index_of(node)
+            if index is not None:
+                positions.append((region, index))
+        return positions
+
+    def find_route(self, source_node: int | str, target_node: int | str,
+                   params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Cheapest route as in `network.router.find_route`, paging in the regions the search
+        reaches. The route spans several snapshots, so it carries no `edges`; its totals
+        are summed from `route_metrics` of every part.
+
+        Raises
+        ------
+        nx.NetworkXNoPath
+            If either node is missing or the target is unreachable.
+        """
+        pinned = set()
+        try:
+            sources = self.locate(source_node, pinned)
+            targets = set(self.locate(target_node, pinned))
+            if not sources or not targets:
+                raise nx.NetworkXNoPath(f"node {source_node if not sources else target_node} not in the network")
+            found = self.search(sources[0], targets, profile_prices(params), pinned)
+            if found is None:
+                raise nx.NetworkXNoPath(f"no path between {source_node} and {target_node}")
+            return self.route_result(found, params)
+        finally:
+            self.evict_to_budget()
+
+    def part_state(self, part: int, backbone: RoutingSnapshot, prices: tuple | None) -> tuple:
+        if part == BACKBONE:
+            graph = self.backbone
+        else:
+            region = self.resident[part]
+            region.link(backbone)
+            graph = region.graph
+        snapshot, view = get_routing_state(graph)
+        offsets, neighbors, half_edges, cost = snapshot.adjacency_lists()
+        if prices is not None:
+            cost = snapshot.profile_list(prices)
+        blocked_nodes = view.inactive_nodes if view is not None else ()
+        blocked_edges = view.inactive_edges if view is not None else ()
+        return offsets, neighbors, half_edges, cost, blocked_nodes, blocked_edges
+
+    def search(self, source: tuple[int, int], targets: set[tuple[int, int]], prices: tuple | None,
+               pinned: set[int]) -> list[tuple[int, int, int | None]] | None:
+        """
+        Dijkstra over (part, dense index) positions. Returns the path as (part, node, edge
+        reaching it) steps, the edge being None at the source and on portal crossings.
+        """
+        backbone = self.link_backbone()
+        states = {}
+        dist = {}
+        tentative = {source: 0.0}
+        pred = {}
+        heap = [(0.0, source[0], source[1])]
+        while heap:
+            d, part, u = heapq.heappop(heap)
+            key = (part, u)
+            if key in dist:
+                continue
+            dist[key] = d
+            if key in targets:
+                return self.unwind(key, pred)
+            if part not in states:
+                states[part] = self.part_state(part, backbone, prices)
+            offsets, neighbors, half_edges, cost, blocked_nodes, blocked_edges = states[part]
+            if u in blocked_nodes:
+                continue
+            for i in range(offsets[u], offsets[u + 1]):
+                v = neighbors[i]
+                e = half_edges[i]
+                if (part, v) in dist or v in blocked_nodes or e in blocked_edges:
+                    continue
+                nd = d + cost[e]
+                if nd < tentative.get((part, v), float("inf")):
+                    tentative[(part, v)] = nd
+                    pred[(part, v)] = (key, e)
+                    heapq.heappush(heap, (nd, part, v))
+
+            # przejście przez portal na drugą stronę (region wczytywany przy pierwszym portalu)
+            if part == BACKBONE:
+                region = int(self.backbone_portals[u])
+                if region < 0:
+                    continue
+                pinned.add(region)
+                side = self.page_in(region, pinned)
+                side.link(backbone)
+                twin = (region, side.from_backbone[u])
+            else:
+                b = int(self.resident[part].to_backbone[u])
+                if b < 0:
+                    continue
+                twin = (BACKBONE, b)
+            if twin not in dist and d < tentative.get(twin, float("inf")):
+                tentative[twin] = d
+                pred[twin] = (key, None)
+                heapq.heappush(heap, (d, twin[0], twin[1]))
+        return None
+
+    @staticmethod
+    def unwind(target: tuple[int, int], pred: dict) -> list[tuple[int, int, int | None]]:
+        steps = []
+        current = target
+        while current in pred:
+            parent, e = pred[current]
+            steps.append((current[0], current[1], e))
+            current = parent
+        steps.append((current[0], current[1], None))
+        return steps[::-1]
+
+    def part_snapshot(self, part: int) -> RoutingSnapshot:
+        graph = self.backbone if part == BACKBONE else self.resident[part].graph
+        return graph.get_routing_snapshot()
+
+    def route_result(self, steps: list[tuple[int, int, int | None]],
+                     params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Route description of `network.router.route_result` (without `edges`) for a multi-part path."""
+        path = []
+        part_edges = {}
+        for part, u, e in steps:
+            if e is None and path:
+                # przejście przez portal: ten sam węzeł po drugiej stronie
+                continue
+            path.append(self.part_snapshot(part).node_ids[u])
+            if e is not None:
+                part_edges.setdefault(part, []).append(e)
+
+        totals = {"cost": 0.0, "distance_km": 0.0, "lead_time_days": 0.0, "min_capacity": np.inf}
+        for part, edges in part_edges.items():
+            metrics = route_metrics(self.part_snapshot(part), np.asarray(edges, dtype=np.int32), params)
+            for name in ("cost", "distance_km", "lead_time_days"):
+                totals[name] += metrics[name]
+            totals["min_capacity"] = min(totals["min_capacity"], metrics["min_capacity"])
+
+        return {
+            "method": "multimodal_cost_min",
+            "path": path,
+            "total_weight": totals["cost"],
+            "estimated_cost": totals["cost"],
+            "total_distance_km": totals["distance_km"],
+            "estimated_lead_time_days": totals["lead_time_days"],
+            "min_capacity": totals["min_capacity"],
+        }
+
+    def find_routes(self, pairs: list[tuple[int | str, int | str]],
+                    params: Optional[Dict[str, Any]] = None) -> list[Dict[str, Any]]:
+        """Routes for many pairs in order, {} for unreachable ones (as `network.router.find_routes`)."""
+        routes = []
+        for source_node, target_node in pairs:
+            try:
+                routes.append(self.find_route(source_node, target_node, params))
+            except nx.NetworkXNoPath:
+                routes.append({})
+        return routes
@@ -1,3 +1,4 @@
+import multiprocessing
 import networkx as nx
 import sys
 import os
@@ -13,6 +14,15 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from network.simulation_graph import SimulationGraph
 from network.graph_reader import GraphManager
+from network.contraction_hierarchy import ContractionHierarchy
+from network.landmarks import LandmarkTable
+from network.overlay_graph import OverlayGraph
+from network.hub_table import HubTable
+from network.parallel_router import DEFAULT_WORKERS
+from network.router import profile_prices
+from network.region_arrays import RegionArrays
+from network.graph_builder import GraphBuilder
+from network.lazy_network import DEFAULT_MEMORY_BUDGET_MB, LazyNetwork
 from network.europe import europe_countries
 from network.europe import top_europe_airports_iata
 from network.europe import europe_seaports_un_locode
@@ -22,6 +32,36 @@ from network.world import country_codes
 from network.world import world_top_cities
 from utils.graph_helper import haversine_coordinates
 from utils.graph_helper import normalize_country
+from data.input_data.delivery_data.courier_companies import courier_companies
+
+# graf regionu w pamięci zajmuje mniej więcej tyle razy więcej niż jego marynata
+PICKLE_EXPANSION = 10
+
+# profile cenowe tablic hubów: koszt krawędzi (None) i ceny każdego kuriera
+HUB_TABLE_PROFILES = [None] + sorted({profile_prices(prices) for prices in courier_companies.values()})
+
+
+def _load_region(task : tuple[str, str, str]) -> RegionArrays:
+    """Pool worker of `NetworkManager.load_regions`: one region graph as compact arrays."""
+    folder, country, road_type = task
+    return RegionArrays.from_graph(NetworkManager(folder=folder).get_graph_from_file(country, road_type=road_type))
+
+
+def memory_capped_workers(workers : int, region_bytes : list[int]) -> int:
+    """
+    Caps `workers` so that every worker can hold the largest region at once
+    (`PICKLE_EXPANSION` times its pickle size) in the currently available memory.
+    Without a memory reading (non-POSIX systems) `workers` is returned unchanged.
+    """
+    try:
+        available = os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, ValueError, OSError):
+        return workers
+    per_worker = max(region_bytes, default=0) * PICKLE_EXPANSION
+    if per_worker <= 0:
+        return workers
+    return max(1, min(workers, int(available // per_worker)))
+
 
 class NetworkManager:
 
@@ -30,37 +70,199 @@ class NetworkManager:
         self.default_crs = default_crs
 
 
-    def create_graph(self, region : str = "Europe", road_type : str = "motorway") -> SimulationGraph:
-        full_graph = None
+    def create_graph(self, region : str = "Europe", road_type : str = "motorway", overlay : bool = False,
+                     workers : int = DEFAULT_WORKERS) -> SimulationGraph:
+        regions = []
         if region.lower() == "europe":
-            full_graph = self.get_graph_from_file(europe_countries[0], road_type=road_type)
-            for country in europe_countries[1:]:
-                graph = self.get_graph_from_file(country, road_type=road_type)
-                full_graph = full_graph.compose(graph)
+            regions = europe_countries
         if region.lower() == "world":
-            cities = europe_countries.copy()
+            regions = europe_countries.copy()
             for world_country in world_top_cities.keys():
-                cities.extend(world_top_cities[world_country])
+                regions.extend(world_top_cities[world_country])
+
+        full_graph = None
+        if regions:
+            full_graph = self.load_regions(regions, road_type, workers, verbose=region.lower() == "world")
+        if overlay and full_graph is not None:
+            self.prepare_overlay(full_graph)
+        return full_graph
+
 
-            full_graph = self.get_graph_from_file(cities[0], road_type=road_type)
-            for country in cities[1:]:
-                graph = self.get_graph_from_file(country, road_type=road_type)
-                full_graph = full_graph.compose(graph)
-                print(country)
+    def load_regions(self, regions : list[str], road_type : str = "motorway", workers : int = DEFAULT_WORKERS,
+                     verbose : bool = False, trace_memory : bool = False) -> SimulationGraph:
+        """
+        Loads the graphs of `regions` (`get_graph_from_file`: pickle, default attributes and
+        component merge) and joins them into one graph with a `GraphBuilder`, which yields
+        the same graph as composing the regions one after another.
+
+        With more than one worker every region is loaded in a process pool and comes back
+        as compact `RegionArrays`. `workers` is an upper bound: the pool never gets more
+        workers than regions or than fit in the available memory (`memory_capped_workers`).
+        With `trace_memory` the builder's memory high-water marks are printed after the build.
+        """
+        builder = GraphBuilder(trace_memory=trace_memory)
+        if workers > 1 and len(regions) > 1:
+            paths = [self.graph_manager.pickle_path(f"{normalize_country(country)}_{road_type}.pkl") for country in regions]
+            workers = memory_capped_workers(min(workers, len(regions)),
+                                            [os.path.getsize(path) for path in paths if os.path.exists(path)])
+        if workers <= 1 or len(regions) < 2:
+            for country in regions:
+                builder.add_graph(self.get_graph_from_file(country, road_type=road_type))
+                if verbose:
+                    print(country)
+        else:
+            # jak w ParallelRouter: app.py buduje symulację przy imporcie, więc bez spawn
+            start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+            context = multiprocessing.get_context(start_method)
+            tasks = [(self.graph_manager.folder, country, road_type) for country in regions]
+            with context.Pool(workers) as pool:
+                for country, arrays in zip(regions, pool.imap(_load_region, tasks)):
+                    builder.add_region(arrays)
+                    if verbose:
+                        print(country)
+
+        full_graph = builder.build()
+        if trace_memory:
+            print(builder.memory_report())
         return full_graph
 
 
-    def get_graph_from_file(self, country : str, road_type : str = "motorway") -> SimulationGraph:
+    def get_graph_from_file(self, country : str, road_type : str = "motorway", contraction_hierarchy : bool = False,
+                            landmarks : int = 0, landmark_metrics : tuple = ("length", "cost"), overlay : bool = False,
+                            hub_table : bool = False, prebuilt : bool = False) -> SimulationGraph:
+        """
+        Loads a region graph with default attributes and merged components. With `prebuilt`
+        the graph comes from a ready-to-route artifact (see `load_prebuilt_graph`).
+
+        The contraction hierarchy, landmarks and overlay hold the edge `cost` (landmarks
+        also `length`) and speed up unpriced queries only.
+        """
+        file_path = f"{normalize_country(country)}_{road_type}.pkl"
+        if prebuilt:
+            sim_graph = self.load_prebuilt_graph(country, road_type)
+        else:
+            sim_graph = self.build_graph(country, road_type)
+        if contraction_hierarchy and sim_graph is not None:
+            self.prepare_contraction_hierarchy(sim_graph, file_path)
+        if landmarks > 0 and sim_graph is not None:
+            for metric in landmark_metrics:
+                self.prepare_landmarks(sim_graph, file_path, landmarks, metric)
+        if overlay and sim_graph is not None:
+            self.prepare_overlay(sim_graph)
+        if hub_table and sim_graph is not None:
+            self.prepare_hub_tables(sim_graph, file_path)
+        return sim_graph
+
+
+    def build_graph(self, country : str, road_type : str = "motorway") -> SimulationGraph:
         file_path = f"{normalize_country(country)}_{road_type}.pkl"
         sim_graph = self.graph_manager.load_pickle_graph(file_path)
         if sim_graph is not None:
             for node, data in sim_graph.nodes(data=True):
                 if "country" not in data:
                     data["country"] = normalize_country(country)
-        sim_graph = self.merge_graph_components(sim_graph, max_dist_km=200)
+        return self.merge_graph_components(sim_graph, max_dist_km=200)
+
+
+    def load_prebuilt_graph(self, country : str, road_type : str = "motorway") -> SimulationGraph:
+        """
+        Loads the prebuilt artifact of a region: normalized attributes, merged components,
+        the routing snapshot and the hub tables of `HUB_TABLE_PROFILES`. The artifact is
+        keyed by a content hash of the input pickle, its JSON attributes and the code
+        building it; a missing or stale artifact is rebuilt with `build_graph` and saved.
+        """
+        file_path = f"{normalize_country(country)}_{road_type}.pkl"
+        key = self.graph_manager.graph_artifact_key(file_path)
+        sim_graph = self.graph_manager.load_graph_artifact(file_path, key)
+        if sim_graph is None:
+            sim_graph = self.build_graph(country, road_type)
+            if sim_graph is not None:
+                snapshot = sim_graph.get_routing_snapshot()
+                for prices in HUB_TABLE_PROFILES:
+                    sim_graph.hub_tables[prices] = HubTable.build(snapshot, sim_graph, prices)
+                self.graph_manager.save_graph_artifact(file_path, sim_graph, key)
         return sim_graph
 
 
+    def get_lazy_network(self, country : str = "world_ports", road_type : str = "motorway",
+                         memory_budget_mb : float = DEFAULT_MEMORY_BUDGET_MB) -> LazyNetwork | None:
+        """
+        Opens a region in lazy mode (see `LazyNetwork`): only the backbone of hubs and
+        cross-border links is loaded, country and city subgraphs follow on demand. The
+        partition is keyed like the prebuilt artifact; a missing or stale one is rebuilt
+        once from the full graph.
+        """
+        file_path = f"{normalize_country(country)}_{road_type}.pkl"
+        directory = self.graph_manager.lazy_network_path(file_path)
+        key = self.graph_manager.graph_artifact_key(file_path)
+        if LazyNetwork.stored_key(directory) != key:
+            sim_graph = self.build_graph(country, road_type)
+            if sim_graph is None:
+                return None
+            LazyNetwork.build(sim_graph, directory, key)
+        return LazyNetwork(directory, memory_budget_mb)
+
+
+    def prepare_contraction_hierarchy(self, sim_graph : SimulationGraph, file_path : str) -> ContractionHierarchy:
+        """
+        Attaches a contraction hierarchy to `sim_graph`. The hierarchy stored next to the
+        graph pickle is reused if it was built for the same snapshot, otherwise it is
+        rebuilt and saved again.
+        """
+        snapshot = sim_graph.get_routing_snapshot()
+        hierarchy = self.graph_manager.load_contraction_hierarchy(file_path)
+        if hierarchy is None or not hierarchy.matches(snapshot):
+            hierarchy = ContractionHierarchy.build(snapshot)
+            self.graph_manager.save_contraction_hierarchy(file_path, hierarchy)
+        sim_graph.contraction_hierarchy = hierarchy
+        return hierarchy
+
+
+    def prepare_landmarks(self, sim_graph : SimulationGraph, file_path : str, count : int, metric : str = "length") -> LandmarkTable:
+        """
+        Attaches ALT landmark distances for `metric` to `sim_graph`, used by `SimulationGraph.astar`.
+        The table stored next to the graph pickle is reused if it still matches the snapshot.
+        """
+        snapshot = sim_graph.get_routing_snapshot()
+        table = self.graph_manager.load_landmarks(file_path, metric)
+        if table is None or not table.matches(snapshot, count):
+            table = LandmarkTable.build(snapshot, count=count, metric=metric)
+            self.graph_manager.save_landmarks(file_path, table)
+        sim_graph.landmark_tables[metric] = table
+        return table
+
+
+    def prepare_overlay(self, sim_graph : SimulationGraph) -> OverlayGraph:
+        """
+        Attaches a country-partitioned `OverlayGraph` to `sim_graph`, partitioned by the
+        `country` attribute of its nodes and following its active view.
+        """
+        view = sim_graph.get_active_view()
+        overlay = OverlayGraph.build(view.snapshot, sim_graph, view)
+        sim_graph.overlay_graph = overlay
+        return overlay
+
+
+    def prepare_hub_tables(self, sim_graph : SimulationGraph, file_path : str,
+                           profiles : list = HUB_TABLE_PROFILES) -> dict:
+        """
+        Attaches an airport/seaport `HubTable` per price profile to `sim_graph` (None for
+        the edge `cost`). Tables already attached (e.g. from the prebuilt artifact) or
+        stored next to the graph pickle are reused if they were built for the same snapshot.
+        """
+        view = sim_graph.get_active_view()
+        for prices in profiles:
+            table = sim_graph.hub_tables.get(prices)
+            if table is None or not table.matches(view.snapshot, prices):
+                table = self.graph_manager.load_hub_table(file_path, prices)
+            if table is None or not table.matches(view.snapshot, prices):
+                table = HubTable.build(view.snapshot, sim_graph, prices)
+                self.graph_manager.save_hub_table(file_path, table)
+            table.attach(view.snapshot, view)
+            sim_graph.hub_tables[prices] = table
+        return sim_graph.hub_tables
+
+
     def load_airports_graph(self, default_capacity : int, default_price : float, airports_filename : str = "airports.dat", routes_filename : str = "routes.dat"):
         path = Path(__file__).parent.parent
         folder_path = os.path.join(path, "data", "input_data", "simulation_data", "airports")
@@ -0,0 +1,94 @@
+import math
+import random
+
+import networkx as nx
+import pytest
+
+from network.simulation_graph import SimulationGraph
+
+COUNTRIES = ("polska", "niemcy", "czechy")
+COURIER = {"price_per_km_land": 1.0, "price_per_km_air": 3.0, "price_per_km_sea": 0.4}
+
+
+def build_network(seed: int = 0, nodes_per_country: int = 40, hubs: int = 6) -> SimulationGraph:
+    """
+    Small random multimodal network: road nodes in three countries (road edges inside a
+    country, a few border crossings), airports linked by air routes and seaports by sea
+    routes, hubs connected to nearby road nodes. Parallel edges are avoided, so the
+    reference graph of `reference_cost` has the same edges as the routing snapshot.
+    """
+    rng = random.Random(seed)
+    graph = nx.MultiGraph()
+    by_country = {}
+    node = 0
+    for c, country in enumerate(COUNTRIES):
+        by_country[country] = []
+        for _ in range(nodes_per_country):
+            graph.add_node(node, x=14.0 + 4 * c + rng.random() * 4, y=49.0 + rng.random() * 4, country=country)
+            by_country[country].append(node)
+            node += 1
+
+    def link(u, v, **attr):
+        if u != v and not graph.has_edge(u, v):
+            graph.add_edge(u, v, length=rng.uniform(2e3, 9e4), cost=rng.uniform(1.0, 60.0), **attr)
+
+    for members in by_country.values():
+        for i, u in enumerate(members[1:], start=1):
+            link(u, members[rng.randrange(i)], maxspeed=str(rng.choice([50, 90, 130])))
+        for _ in range(2 * len(members)):
+            link(*rng.sample(members, 2), maxspeed=str(rng.choice([50, 90, 130])))
+    for first, second in zip(COUNTRIES, COUNTRIES[1:]):
+        for _ in range(3):
+            link(rng.choice(by_country[first]), rng.choice(by_country[second]))
+
+    airports, seaports = [], []
+    for h in range(hubs):
+        kind = "airport" if h % 2 == 0 else "seaport"
+        graph.add_node(node, x=14.0 + rng.random() * 12, y=49.0 + rng.random() * 4, type=kind)
+        (airports if kind == "airport" else seaports).append(node)
+        country = COUNTRIES[h % len(COUNTRIES)]
+        for u in rng.sample(by_country[country], 2):
+            link(node, u)
+        node += 1
+    for hubs_of_kind, route in ((airports, "airline_route"), (seaports, "sea_route")):
+        for i, u in enumerate(hubs_of_kind):
+            for v in hubs_of_kind[i + 1:]:
+                link(u, v, type=route)
+    return SimulationGraph(incoming_graph_data=graph)
+
+
+def disrupt(graph: SimulationGraph, seed: int, nodes: int = 6, edges: int = 10) -> None:
+    rng = random.Random(seed)
+    graph.deactivate_nodes(rng.sample(sorted(graph.nodes), nodes))
+    graph.deactivate_edges(rng.sample(sorted((u, v) for u, v in graph.edges()), edges))
+
+
+def reference_cost(graph: nx.MultiGraph, source, target, prices: tuple = None, weight: str = "cost") -> float:
+    """`nx.dijkstra_path_length` over the active nodes and edges; inf if there is no path."""
+    reference = nx.Graph()
+    for u, v, data in graph.edges(data=True):
+        if data.get("active", True) is False or graph.nodes[u].get("active", True) is False \
+                or graph.nodes[v].get("active", True) is False:
+            continue
+        w = data[weight] if prices is None else prices[data["transport_mode"]] * data["length"] / 1000.0
+        if not reference.has_edge(u, v) or w < reference[u][v]["weight"]:
+            reference.add_edge(u, v, weight=w)
+    try:
+        return nx.dijkstra_path_length(reference, source, target)
+    except (nx.NetworkXNoPath, nx.NodeNotFound):
+        return math.inf
+
+
+def route_cost(route: dict) -> float:
+    return route["estimated_cost"] if route else math.inf
+
+
+def sample_pairs(graph: nx.Graph, count: int, seed: int = 0) -> list[tuple]:
+    rng = random.Random(seed)
+    nodes = sorted(graph.nodes)
+    return [tuple(rng.sample(nodes, 2)) for _ in range(count)]
+
+
+@pytest.fixture
+def network() -> SimulationGraph:
+    return build_network()
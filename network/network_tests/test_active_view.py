@@ -0,0 +1,53 @@
+import random
+
+from conftest import build_network, disrupt
+from network.active_view import ActiveView
+
+
+def test_fingerprint_is_reversible():
+    graph = build_network(seed=161)
+    view = graph.get_active_view()
+    assert view.fingerprint == 0
+    nodes = sorted(graph.nodes)[:8]
+    edges = sorted((u, v) for u, v in graph.edges())[:6]
+
+    graph.deactivate_nodes(nodes)
+    graph.deactivate_edges(edges)
+    disrupted = view.fingerprint
+    assert disrupted != 0
+    # częściowe przywrócenie w innej kolejności i ponowne wyłączenie daje ten sam odcisk
+    graph.activate_nodes(nodes[::-1][:5])
+    graph.activate_edges(edges[3:])
+    graph.deactivate_edges(edges[3:])
+    graph.deactivate_nodes(nodes[::-1][:5])
+    assert view.fingerprint == disrupted
+
+    graph.activate_nodes(nodes)
+    graph.activate_edges(edges)
+    assert view.fingerprint == 0 and view.is_unrestricted()
+
+
+def test_masks_follow_the_graph_attributes():
+    graph = build_network(seed=162)
+    view = graph.get_active_view()
+    disrupt(graph, seed=163)
+    # widok odbudowany z atrybutów `active` ma te same maski i odcisk co aktualizowany na bieżąco
+    rebuilt = ActiveView.from_graph(view.snapshot, graph)
+    assert rebuilt.inactive_nodes == view.inactive_nodes
+    assert rebuilt.inactive_edges == view.inactive_edges
+    assert rebuilt.fingerprint == view.fingerprint
+    assert (rebuilt.node_mask == view.node_mask).all() and (rebuilt.edge_mask == view.edge_mask).all()
+
+
+def test_active_graph_filters_without_copying():
+    graph = build_network(seed=164)
+    disrupt(graph, seed=165)
+    active = graph.get_active_graph()
+    inactive = {node for node, data in graph.nodes(data=True) if data.get("active", True) is False}
+    assert set(active.nodes) == set(graph.nodes) - inactive
+    for u, v, data in active.edges(data=True):
+        assert data.get("active", True) is not False
+    # zmiana aktywności jest od razu widoczna w widoku
+    node = random.Random(166).choice(sorted(active.nodes))
+    graph.deactivate_nodes([node])
+    assert node not in active
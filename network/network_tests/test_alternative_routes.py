@@ -0,0 +1,65 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from conftest import COURIER, build_network, disrupt, reference_cost, sample_pairs
+from network.alternative_routes import AlternativeRoutes
+from network.router import profile_prices
+
+
+def deliveries_of(pairs: list[tuple]) -> list[SimpleNamespace]:
+    return [SimpleNamespace(delivery_id=i, start_node_id=source, end_node_id=target)
+            for i, (source, target) in enumerate(pairs)]
+
+
+@pytest.mark.parametrize("params", [None, COURIER])
+def test_first_alternative_is_the_cheapest_route(params):
+    graph = build_network(seed=61)
+    snapshot = graph.get_routing_snapshot()
+    pairs = sample_pairs(graph, 20)
+    alternatives = AlternativeRoutes(snapshot, k=3)
+    alternatives.compute(deliveries_of(pairs), params=[params] * len(pairs))
+    prices = profile_prices(params)
+    cost = snapshot.cost if prices is None else snapshot.profile_cost(prices)
+    for i, (source, target) in enumerate(pairs):
+        routes = alternatives.routes[i]
+        assert float(cost[routes[0]].sum()) == pytest.approx(reference_cost(graph, source, target, prices))
+        totals = [float(cost[route].sum()) for route in routes]
+        assert totals == sorted(totals)
+
+
+def test_lookup_skips_blocked_alternatives():
+    graph = build_network(seed=62)
+    snapshot = graph.get_routing_snapshot()
+    pairs = sample_pairs(graph, 20)
+    alternatives = AlternativeRoutes(snapshot, k=3)
+    alternatives.compute(deliveries_of(pairs))
+    disrupt(graph, seed=63, nodes=10, edges=30)
+    view = graph.get_active_view()
+    for i in range(len(pairs)):
+        found = alternatives.lookup(i, view)
+        if found is None:
+            continue
+        nodes, edges = found
+        assert view.edge_mask[edges].all() and view.node_mask[nodes].all()
+
+
+def test_current_route_is_kept_among_alternatives():
+    graph = build_network(seed=64)
+    snapshot = graph.get_routing_snapshot()
+    pairs = sample_pairs(graph, 15)
+    # drugi wariant jako trasa wybrana wcześniej, np. przez przypisanie przepływów
+    plain = AlternativeRoutes(snapshot, k=2)
+    plain.compute(deliveries_of(pairs))
+    deliveries = deliveries_of(pairs)
+    for delivery in deliveries:
+        current = plain.routes[delivery.delivery_id][-1]
+        delivery.edges_on = lambda _, edges=current: edges
+    alternatives = AlternativeRoutes(snapshot, k=3)
+    alternatives.compute(deliveries)
+    for delivery in deliveries:
+        current = delivery.edges_on(snapshot)
+        routes = alternatives.routes[delivery.delivery_id]
+        assert any(np.array_equal(route, current) for route in routes)
+        assert len({route.tobytes() for route in routes}) == len(routes)
@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import COURIER, build_network, disrupt, sample_pairs
+from network.router import compute_route, get_routing_state, profile_prices, select_strategy
+from network.transport_types import SearchStrategy
+
+
+def path_cost(found, weights) -> float:
+    return sum(weights[e] for e in found[1])
+
+
+@pytest.mark.parametrize("params", [None, COURIER])
+def test_bidirectional_matches_dijkstra_under_disruptions(params):
+    graph = build_network(seed=201)
+    disrupt(graph, seed=202, nodes=10, edges=20)
+    snapshot, view = get_routing_state(graph)
+    prices = profile_prices(params)
+    weights = snapshot.profile_list(prices) if prices is not None else snapshot.adjacency_lists()[3]
+    for source_node, target_node in sample_pairs(graph, 60):
+        source, target = snapshot.index_of(source_node), snapshot.index_of(target_node)
+        one_way = snapshot.dijkstra_path(source, target, view=view, weights=weights)
+        both_ways = snapshot.bidirectional_dijkstra_path(source, target, view=view, weights=weights)
+        assert (one_way is None) == (both_ways is None)
+        if both_ways is None:
+            continue
+        nodes, edges = both_ways
+        assert nodes[0] == source and nodes[-1] == target and len(nodes) == len(edges) + 1
+        assert not view.inactive_nodes.intersection(nodes) and not view.inactive_edges.intersection(edges)
+        assert snapshot.edge_path_nodes(source, edges) == nodes
+        assert path_cost(both_ways, weights) == pytest.approx(path_cost(one_way, weights))
+
+
+def test_source_equal_to_target():
+    graph = build_network(seed=203)
+    snapshot, view = get_routing_state(graph)
+    assert snapshot.bidirectional_dijkstra_path(5, 5, view=view) == ([5], [])
+
+
+def test_default_and_explicit_strategies():
+    graph = build_network(seed=204)
+    assert select_strategy(graph, None, None) == SearchStrategy.BIDIRECTIONAL
+    assert select_strategy(graph, "dijkstra", None) == SearchStrategy.DIJKSTRA
+    for strategy in ("contraction_hierarchy", "overlay", "hub_table"):
+        with pytest.raises(ValueError):
+            select_strategy(graph, strategy, None)
+    with pytest.raises(ValueError):
+        select_strategy(graph, "astar", None)
+
+    source, target = sample_pairs(graph, 1)[0]
+    routes = [compute_route(graph, source, target, strategy=strategy) for strategy in ("dijkstra", "bidirectional")]
+    assert routes[0]["estimated_cost"] == pytest.approx(routes[1]["estimated_cost"])
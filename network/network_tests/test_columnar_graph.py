@@ -0,0 +1,77 @@
+import os
+
+import pytest
+from shapely.geometry import LineString
+
+from conftest import build_network, reference_cost, route_cost, sample_pairs
+from network.columnar_graph import load_columns, save_columns
+from network.graph_builder import GraphBuilder
+from network.graph_reader import GraphManager
+from network.region_arrays import RegionArrays
+from test_graph_builder import assert_same_graph
+from test_router import single_route
+
+FILE = "test_motorway.pkl"
+
+
+@pytest.fixture
+def manager(tmp_path) -> GraphManager:
+    graph = build_network(seed=111)
+    for i, (u, v, data) in enumerate(graph.edges(data=True)):
+        if i % 5 == 0:
+            data["geometry"] = LineString([(graph.nodes[u]["x"], graph.nodes[u]["y"]),
+                                           (graph.nodes[v]["x"], graph.nodes[v]["y"])])
+    graph_manager = GraphManager(folder=str(tmp_path))
+    graph_manager.save_pickle_file(FILE, graph)
+    return graph_manager
+
+
+def assert_same_geometries(expected, got) -> None:
+    for u, v, key, data in expected.edges(keys=True, data=True):
+        geometry = data.get("geometry")
+        assert (geometry is None) == ("geometry" not in got[u][v][key])
+        if geometry is not None:
+            assert geometry.equals(got[u][v][key]["geometry"])
+
+
+def without_geometry(graph):
+    graph = graph.copy()
+    for _, _, data in graph.edges(data=True):
+        data.pop("geometry", None)
+    return graph
+
+
+def test_columns_round_trip(tmp_path):
+    graph = build_network(seed=112)
+    directory = str(tmp_path / "columns")
+    save_columns(directory, RegionArrays.from_graph(graph), key="abc")
+    assert load_columns(directory, key="other") is None
+    builder = GraphBuilder()
+    builder.add_region(load_columns(directory, key="abc"))
+    assert_same_graph(graph, builder.build())
+
+
+def test_pickle_columns_graph_round_trip(manager):
+    pickled = manager.load_pickle_graph(FILE)
+    assert not os.path.exists(manager.columnar_path(FILE))
+
+    manager.build_columnar_graph(FILE)
+    columnar = manager.load_columnar_graph(FILE, key=manager.graph_artifact_key(FILE))
+    assert columnar is not None
+    assert_same_graph(without_geometry(pickled), without_geometry(columnar))
+    assert_same_geometries(pickled, columnar)
+
+    loaded = manager.load_pickle_graph(FILE)
+    for source, target in sample_pairs(pickled, 20):
+        expected = reference_cost(pickled, source, target)
+        assert route_cost(single_route(loaded, source, target)) == pytest.approx(expected)
+
+
+def test_columns_are_ignored_after_the_input_changes(manager):
+    manager.build_columnar_graph(FILE)
+    changed = build_network(seed=113)
+    manager.save_pickle_file(FILE, changed)
+    assert manager.load_columnar_graph(FILE, key=manager.graph_artifact_key(FILE)) is None
+    loaded = manager.load_pickle_graph(FILE)
+    assert loaded.number_of_edges() == changed.number_of_edges()
+    assert set(loaded.edges()) == set(changed.edges())
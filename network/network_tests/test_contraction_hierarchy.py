@@ -0,0 +1,37 @@
+import pytest
+
+from conftest import build_network, disrupt, reference_cost, route_cost, sample_pairs
+from network.contraction_hierarchy import ContractionHierarchy
+from test_router import single_route
+
+
+def attach_hierarchy(graph) -> ContractionHierarchy:
+    graph.contraction_hierarchy = ContractionHierarchy.build(graph.get_routing_snapshot())
+    return graph.contraction_hierarchy
+
+
+@pytest.mark.parametrize("disrupted", [False, True])
+def test_hierarchy_matches_networkx(disrupted):
+    graph = build_network(seed=21)
+    attach_hierarchy(graph)
+    if disrupted:
+        disrupt(graph, seed=22)
+    for source, target in sample_pairs(graph, 40):
+        route = single_route(graph, source, target, strategy="contraction_hierarchy")
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target))
+        if route:
+            # rozpakowane skróty tworzą ciągłą ścieżkę po krawędziach grafu
+            assert all(graph.has_edge(u, v) for u, v in zip(route["path"], route["path"][1:]))
+
+
+def test_hierarchy_round_trip(tmp_path):
+    graph = build_network(seed=23)
+    hierarchy = attach_hierarchy(graph)
+    path = str(tmp_path / "hierarchy.npz")
+    hierarchy.save(path)
+    loaded = ContractionHierarchy.load(path)
+    assert loaded.matches(graph.get_routing_snapshot())
+    graph.contraction_hierarchy = loaded
+    for source, target in sample_pairs(graph, 20):
+        route = single_route(graph, source, target, strategy="contraction_hierarchy")
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target))
@@ -0,0 +1,58 @@
+import json
+
+import numpy as np
+
+from conftest import build_network, disrupt, sample_pairs
+from models.delivery.delivery import Delivery
+from network.router import find_routes
+
+
+def routed_deliveries(graph, count: int) -> list[Delivery]:
+    snapshot = graph.get_routing_snapshot()
+    pairs = sample_pairs(graph, count)
+    deliveries = []
+    for i, ((source, target), route) in enumerate(zip(pairs, find_routes(graph, pairs))):
+        deliveries.append(Delivery(i, source, target, route["edges"], route["total_distance_km"],
+                                   route["estimated_cost"], route["estimated_lead_time_days"], [], snapshot=snapshot))
+    return deliveries
+
+
+def test_route_is_materialized_from_edges():
+    graph = build_network(seed=141)
+    routes = find_routes(graph, sample_pairs(graph, 20))
+    for delivery, route in zip(routed_deliveries(graph, 20), routes):
+        assert delivery.edges.dtype == np.int32
+        assert delivery.route == route["path"]
+
+
+def test_to_dict_round_trip_checks_the_snapshot():
+    graph = build_network(seed=142)
+    deliveries = routed_deliveries(graph, 20)
+    saved = json.loads(json.dumps([delivery.to_dict() for delivery in deliveries]))
+    snapshot = graph.get_routing_snapshot()
+    for delivery, o in zip(deliveries, saved):
+        assert o["route"] == delivery.route
+        assert o["snapshot_checksum"] == snapshot.checksum()
+        assert np.array_equal(o["edges"], delivery.edges)
+
+    # po przebudowie migawki indeksy krawędzi są nieważne, trasa wraca z identyfikatorów węzłów
+    graph.add_edge(*sample_pairs(graph, 1, seed=5)[0], length=1e7, cost=1e6)
+    rebuilt = graph.get_routing_snapshot()
+    assert rebuilt.checksum() != saved[0]["snapshot_checksum"]
+    for delivery, o in zip(deliveries, saved):
+        restored = Delivery(o["delivery_id"], o["start_node_id"], o["end_node_id"], rebuilt.path_edges(o["route"]),
+                            o["length"], o["cost"], o["lead_time"], [], snapshot=rebuilt)
+        assert restored.route == o["route"]
+        assert np.array_equal(delivery.edges_on(rebuilt), restored.edges)
+
+
+def test_touches_inactive_follows_the_view():
+    graph = build_network(seed=143)
+    deliveries = routed_deliveries(graph, 30)
+    disrupt(graph, seed=144, nodes=8, edges=20)
+    view = graph.get_active_view()
+    snapshot = view.snapshot
+    for delivery in deliveries:
+        nodes = [snapshot.index_of(node) for node in delivery.route]
+        blocked = not view.node_mask[nodes].all() or not view.edge_mask[delivery.edges].all()
+        assert delivery.touches_inactive(view) == blocked
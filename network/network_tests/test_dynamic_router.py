@@ -0,0 +1,46 @@
+import random
+
+import pytest
+
+from conftest import COURIER, build_network, reference_cost, route_cost, sample_pairs
+from network.dynamic_router import DynamicRouter
+from network.router import profile_prices
+
+
+def test_kept_trees_follow_disruptions():
+    graph = build_network(seed=11)
+    router = DynamicRouter(graph)
+    pairs = sample_pairs(graph, 30)
+    rng = random.Random(12)
+    nodes = sorted(graph.nodes)
+    edges = sorted((u, v) for u, v in graph.edges())
+
+    for step in range(6):
+        routes = router.find_routes(pairs)
+        for (source, target), route in zip(pairs, routes):
+            assert route_cost(route) == pytest.approx(reference_cost(graph, source, target)), step
+        # na zmianę wyłączenia i przywrócenia, drzewa są naprawiane a nie budowane od nowa
+        if step % 2 == 0:
+            removed_nodes = rng.sample(nodes, 4)
+            removed_edges = rng.sample(edges, 8)
+            graph.deactivate_nodes(removed_nodes)
+            graph.deactivate_edges(removed_edges)
+        else:
+            graph.activate_nodes(removed_nodes)
+            graph.activate_edges(removed_edges[:4])
+    assert router.trees
+
+
+def test_profile_trees_follow_disruptions():
+    graph = build_network(seed=13)
+    router = DynamicRouter(graph)
+    pairs = sample_pairs(graph, 20)
+    params = [COURIER if i % 2 else {} for i in range(len(pairs))]
+    prices = profile_prices(COURIER)
+    router.find_profile_routes(pairs, params)
+
+    graph.deactivate_nodes(sorted(graph.nodes)[5:15])
+    routes = router.find_profile_routes(pairs, params)
+    for (source, target), pair_params, route in zip(pairs, params, routes):
+        expected = reference_cost(graph, source, target, prices if pair_params else None)
+        assert route_cost(route) == pytest.approx(expected)
@@ -0,0 +1,48 @@
+import math
+
+import pytest
+
+import network.router as router
+from conftest import build_network, disrupt, reference_cost, route_cost, sample_pairs
+from network.router import find_route, find_routes
+
+
+def test_one_tree_per_distinct_source(monkeypatch):
+    graph = build_network(seed=171)
+    disrupt(graph, seed=172)
+    sources = [source for source, _ in sample_pairs(graph, 4)]
+    pairs = [(source, target) for source in sources for _, target in sample_pairs(graph, 6, seed=source)]
+    grown = []
+    search = router.shortest_path_tree
+
+    def counting_tree(snapshot, source, *args, **kwargs):
+        grown.append(source)
+        return search(snapshot, source, *args, **kwargs)
+
+    monkeypatch.setattr(router, "shortest_path_tree", counting_tree)
+    routes = find_routes(graph, pairs)
+    assert len(grown) == len(set(sources)) == len(set(grown))
+    for (source, target), route in zip(pairs, routes):
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target))
+
+    # drugie wywołanie obsługuje pamięć podręczna tras, bez nowych drzew
+    grown.clear()
+    assert [route_cost(route) for route in find_routes(graph, pairs)] == pytest.approx([route_cost(route) for route in routes])
+    assert not grown
+
+
+def test_results_keep_pair_order_and_mark_unreachable_pairs():
+    graph = build_network(seed=173)
+    isolated = max(graph.nodes) + 1
+    graph.add_node(isolated, x=20.0, y=50.0)
+    pairs = sample_pairs(graph, 10)
+    pairs = pairs[:5] + [(pairs[0][0], isolated), ("missing", pairs[0][1])] + pairs[5:]
+    routes = find_routes(graph, pairs)
+    assert len(routes) == len(pairs)
+    assert routes[5] == {} and routes[6] == {}
+    for (source, target), route in zip(pairs, routes):
+        if route:
+            assert route["path"][0] == source and route["path"][-1] == target
+            assert route["estimated_cost"] == pytest.approx(find_route(graph, source, target)["estimated_cost"])
+        else:
+            assert route_cost(route) == math.inf
@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+
+from conftest import COURIER, build_network, disrupt, reference_cost, route_cost, sample_pairs
+from network.flow_assignment import assign_flows, reassign_flows
+from network.router import profile_prices
+
+
+def test_uncongested_flows_take_cheapest_routes():
+    graph = build_network(seed=51)
+    disrupt(graph, seed=52)
+    pairs = sample_pairs(graph, 30)
+    params = [COURIER if i % 2 else {} for i in range(len(pairs))]
+    assignment = assign_flows(graph, [(source, target, 1.0) for source, target in pairs], params=params)
+    prices = profile_prices(COURIER)
+    for c, ((source, target), pair_params) in enumerate(zip(pairs, params)):
+        expected = reference_cost(graph, source, target, prices if pair_params else None)
+        assert route_cost(assignment.primary_route(c, pair_params)) == pytest.approx(expected)
+    assert not assignment.overflow.any()
+
+
+def test_capacities_are_respected():
+    graph = build_network(seed=53)
+    for _, _, data in graph.edges(data=True):
+        data["capacity"] = 4
+    graph.invalidate_routing_snapshot()
+    disrupt(graph, seed=54)
+    pairs = sample_pairs(graph, 25)
+    commodities = [(source, target, 6.0) for source, target in pairs]
+    assignment = assign_flows(graph, commodities, allow_overflow=False)
+    snapshot = assignment.snapshot
+    view = graph.get_active_view()
+
+    assert np.all(assignment.edge_flow <= snapshot.capacity + 1e-9)
+    for c, (source, target, demand) in enumerate(commodities):
+        routed = sum(amount for _, amount in assignment.paths[c])
+        assert routed + assignment.unassigned[c] == pytest.approx(demand)
+        for edges, _ in assignment.paths[c]:
+            nodes = snapshot.edge_path_nodes(assignment.sources[c], edges)
+            assert snapshot.node_ids[nodes[-1]] == target
+            assert view.edge_mask[edges].all() and view.node_mask[nodes].all()
+
+
+def test_write_back_stores_edge_flows():
+    graph = build_network(seed=55)
+    pairs = sample_pairs(graph, 10)
+    assignment = assign_flows(graph, [(source, target, 2.0) for source, target in pairs])
+    assignment.write_back(graph)
+    snapshot = assignment.snapshot
+    for e in np.flatnonzero(assignment.edge_flow).tolist():
+        u = snapshot.node_ids[snapshot.edge_u[e]]
+        v = snapshot.node_ids[snapshot.edge_v[e]]
+        assert graph[u][v][snapshot.edge_keys[e]]["flow"] == pytest.approx(assignment.edge_flow[e])
+
+
+
+def test_rerouted_commodities_are_reassigned_on_residual_capacity():
+    graph = build_network(seed=57)
+    for _, _, data in graph.edges(data=True):
+        data["capacity"] = 10
+    graph.invalidate_routing_snapshot()
+    source, target = sample_pairs(graph, 1)[0]
+    commodities = [(source, target, 4.0)] * 5
+    assignment = assign_flows(graph, commodities, allow_overflow=False)
+    kept = [list(assignment.paths[c]) for c in range(3)]
+
+    # dwa towary przeniesione na trasę pierwszego, jak po przekierowaniu poza rozwiązaniem
+    cheapest = assignment.primary_edges(0)
+    for c in (3, 4):
+        assignment.reroute(c, cheapest)
+    congested = assignment.congested([3, 4])
+    assert congested
+    reassign_flows(graph, assignment, congested, allow_overflow=False)
+
+    assert not assignment.congested(list(range(5)))
+    assert np.all(assignment.edge_flow <= assignment.snapshot.capacity + 1e-9)
+    for c in range(3):
+        assert [amount for _, amount in assignment.paths[c]] == [amount for _, amount in kept[c]]
+    for c, (_, _, demand) in enumerate(commodities):
+        routed = sum(amount for _, amount in assignment.paths[c])
+        assert routed + assignment.unassigned[c] == pytest.approx(demand)
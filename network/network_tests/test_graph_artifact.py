@@ -0,0 +1,41 @@
+import pytest
+
+from conftest import COURIER, build_network, reference_cost, route_cost, sample_pairs
+from network.graph_artifact import artifact_key, load_artifact, save_artifact
+from network.hub_table import HubTable
+from network.router import profile_prices
+from test_hub_table import hub_pairs
+from test_router import single_route
+
+
+def test_artifact_round_trip(tmp_path):
+    graph = build_network(seed=131)
+    path = str(tmp_path / "graph_prebuilt.pkl")
+    save_artifact(path, graph, key="key")
+    assert load_artifact(path, key="other") is None
+    loaded = load_artifact(path, key="key")
+    assert loaded.routing_snapshot is not None
+    for source, target in sample_pairs(graph, 20):
+        assert route_cost(single_route(loaded, source, target)) == pytest.approx(reference_cost(graph, source, target))
+
+
+def test_artifact_carries_courier_hub_tables(tmp_path):
+    graph = build_network(seed=132)
+    prices = profile_prices(COURIER)
+    graph.hub_tables[prices] = HubTable.build(graph.get_routing_snapshot(), graph, prices)
+    path = str(tmp_path / "graph_prebuilt.pkl")
+    save_artifact(path, graph, key="key")
+    loaded = load_artifact(path, key="key")
+    assert loaded.hub_tables[prices].snapshot is loaded.routing_snapshot
+    for source, target in hub_pairs(loaded):
+        route = single_route(loaded, source, target, COURIER)
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target, prices))
+
+
+def test_key_follows_input_content(tmp_path):
+    path = tmp_path / "input.pkl"
+    path.write_bytes(b"first")
+    key = artifact_key([str(path)])
+    assert artifact_key([str(path)]) == key
+    path.write_bytes(b"second")
+    assert artifact_key([str(path)]) != key
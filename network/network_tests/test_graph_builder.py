@@ -0,0 +1,51 @@
+import networkx as nx
+
+from conftest import build_network
+from network.graph_builder import GraphBuilder
+from network.region_arrays import RegionArrays
+
+
+def split_regions(graph: nx.MultiGraph) -> list[nx.MultiGraph]:
+    """Per-country subgraphs; every cross-border edge and hub appears in two regions."""
+    regions = []
+    for country in ("polska", "niemcy", "czechy"):
+        nodes = {node for node, data in graph.nodes(data=True) if data.get("country") in (country, None)}
+        nodes |= {v for u in list(nodes) for v in graph[u]}
+        regions.append(nx.MultiGraph(graph.subgraph(nodes)))
+    return regions
+
+
+def assert_same_graph(expected: nx.MultiGraph, got: nx.MultiGraph) -> None:
+    assert dict(expected.nodes(data=True)) == dict(got.nodes(data=True))
+    assert expected.number_of_edges() == got.number_of_edges()
+    for u, v, key, data in expected.edges(keys=True, data=True):
+        stored = got[u][v][key]
+        assert stored == data
+        assert {name: type(value) for name, value in stored.items() if isinstance(value, int)} == \
+               {name: type(value) for name, value in data.items() if isinstance(value, int)}
+
+
+def test_builder_matches_compose():
+    graph = build_network(seed=101)
+    regions = split_regions(graph)
+    composed = nx.MultiGraph()
+    builder = GraphBuilder()
+    for region in regions:
+        composed = nx.compose(composed, region)
+        builder.add_region(RegionArrays.from_graph(region))
+    built = builder.build()
+    assert_same_graph(composed, built)
+    assert built.number_of_edges() == graph.number_of_edges()
+
+
+def test_builder_adds_to_an_existing_graph():
+    graph = build_network(seed=102)
+    first, *rest = split_regions(graph)
+    target = build_network(seed=102)
+    target.remove_nodes_from([node for node in list(target) if node not in first])
+    builder = GraphBuilder()
+    for region in rest:
+        builder.add_graph(region)
+    built = builder.build(target)
+    assert built is target
+    assert_same_graph(graph, built)
@@ -0,0 +1,85 @@
+import pytest
+
+import numpy as np
+
+from conftest import COURIER, build_network, disrupt, reference_cost, route_cost
+from network.hub_table import HubTable
+from network.router import profile_prices
+from test_router import single_route
+
+
+def attach_hub_table(graph, prices=None) -> HubTable:
+    view = graph.get_active_view()
+    table = HubTable.build(view.snapshot, graph, prices)
+    table.attach(view.snapshot, view)
+    graph.hub_tables[prices] = table
+    return table
+
+
+def hub_pairs(graph) -> list[tuple]:
+    hubs = sorted(node for node, data in graph.nodes(data=True) if data.get("type") in ("airport", "seaport"))
+    return [(u, v) for u in hubs for v in hubs if u != v]
+
+
+@pytest.mark.parametrize("disrupted", [False, True])
+def test_hub_table_matches_networkx(disrupted):
+    graph = build_network(seed=41)
+    attach_hub_table(graph)
+    if disrupted:
+        disrupt(graph, seed=42, nodes=4, edges=12)
+    for source, target in hub_pairs(graph):
+        route = single_route(graph, source, target, strategy="hub_table")
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target))
+
+
+def test_hub_table_round_trip(tmp_path):
+    graph = build_network(seed=43)
+    table = attach_hub_table(graph)
+    path = str(tmp_path / "hubs.npz")
+    table.save(path)
+    loaded = HubTable.load(path)
+    snapshot = graph.get_routing_snapshot()
+    assert loaded.matches(snapshot)
+    loaded.attach(snapshot, graph.get_active_view())
+    graph.hub_tables[None] = loaded
+    for source, target in hub_pairs(graph):
+        route = single_route(graph, source, target, strategy="hub_table")
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target))
+
+
+@pytest.mark.parametrize("disrupted", [False, True])
+def test_courier_hub_table_matches_networkx(disrupted, tmp_path):
+    graph = build_network(seed=44)
+    prices = profile_prices(COURIER)
+    table = attach_hub_table(graph, prices)
+    if disrupted:
+        disrupt(graph, seed=45, nodes=4, edges=12)
+    # trasy z cenami kuriera idą domyślnie przez jego tablicę
+    for source, target in hub_pairs(graph):
+        route = single_route(graph, source, target, COURIER)
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target, prices))
+    table.save(str(tmp_path / "hubs.npz"))
+    loaded = HubTable.load(str(tmp_path / "hubs.npz"))
+    assert loaded.prices == prices and loaded.matches(graph.get_routing_snapshot(), prices)
+    assert not loaded.matches(graph.get_routing_snapshot())
+
+
+def test_port_closure_recomputes_covering_rows():
+    graph = build_network(seed=46, hubs=10)
+    table = attach_hub_table(graph)
+    computed = []
+    compute_rows = table.compute_rows
+    table.compute_rows = lambda rows: (computed.extend(rows), compute_rows(rows))
+    snapshot = graph.get_routing_snapshot()
+    h = table.number_of_hubs
+    # zamknięty port i krawędź trasy między dwoma innymi hubami
+    used = next(table.paths[i * h + j] for i in range(1, h) for j in range(i + 1, h) if len(table.paths[i * h + j]))
+    edge = int(used[len(used) // 2])
+    graph.deactivate_nodes([snapshot.node_ids[int(table.hubs[0])]])
+    graph.deactivate_edges([(snapshot.node_ids[snapshot.edge_u[edge]], snapshot.node_ids[snapshot.edge_v[edge]])])
+    for source, target in hub_pairs(graph):
+        route = single_route(graph, source, target, strategy="hub_table")
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target))
+    # zamknięty port: jego wiersz i kolumna bez wyszukiwania, reszta tylko tam, gdzie trasy przez niego szły
+    assert computed and 0 not in computed and len(computed) < h - 1
+    assert np.isinf(table.cost[0]).all() and np.isinf(table.cost[:, 0]).all()
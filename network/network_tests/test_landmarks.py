@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from conftest import build_network, disrupt, reference_cost, sample_pairs
+from network.landmarks import LandmarkTable, metric_distances
+
+
+def path_weight(graph, path: list, metric: str) -> float:
+    return sum(min(data[metric] for data in graph[u][v].values()) for u, v in zip(path, path[1:]))
+
+
+@pytest.mark.parametrize("metric", ["length", "cost"])
+def test_lower_bounds_are_admissible(metric):
+    graph = build_network(seed=191)
+    snapshot = graph.get_routing_snapshot()
+    table = LandmarkTable.build(snapshot, count=6, metric=metric)
+    assert len(set(table.landmarks.tolist())) == len(table.landmarks) == 6
+    for target in range(0, snapshot.number_of_nodes, 17):
+        exact = metric_distances(snapshot, target, metric)
+        bounds = table.lower_bounds(target)
+        reachable = ~np.isnan(exact)
+        assert np.all(bounds[reachable] <= exact[reachable] + 1e-6)
+        assert bounds[target] == 0.0
+
+
+@pytest.mark.parametrize("disrupted", [False, True])
+@pytest.mark.parametrize("metric", ["length", "cost"])
+def test_alt_astar_equals_dijkstra(metric, disrupted):
+    graph = build_network(seed=192)
+    graph.landmark_tables[metric] = LandmarkTable.build(graph.get_routing_snapshot(), count=8, metric=metric)
+    if disrupted:
+        disrupt(graph, seed=193)
+    for source, target in sample_pairs(graph, 30):
+        expected = reference_cost(graph, source, target, weight=metric)
+        path = graph.astar(source, target, metric)
+        if expected == np.inf:
+            assert path is None
+        else:
+            assert path[0] == source and path[-1] == target
+            assert path_weight(graph, path, metric) == pytest.approx(expected)
+
+
+def test_table_round_trip(tmp_path):
+    graph = build_network(seed=194)
+    snapshot = graph.get_routing_snapshot()
+    table = LandmarkTable.build(snapshot, count=4)
+    path = str(tmp_path / "landmarks.npz")
+    table.save(path)
+    loaded = LandmarkTable.load(path)
+    assert loaded.matches(snapshot, 4) and not loaded.matches(snapshot, 8)
+    assert np.array_equal(loaded.distances, table.distances, equal_nan=True)
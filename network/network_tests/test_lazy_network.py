@@ -0,0 +1,51 @@
+import networkx as nx
+import pytest
+
+from conftest import COURIER, build_network, reference_cost, route_cost, sample_pairs
+from network.lazy_network import LazyNetwork
+from network.router import profile_prices
+
+
+def lazy_route(lazy: LazyNetwork, source, target, params=None) -> dict:
+    try:
+        return lazy.find_route(source, target, params)
+    except nx.NetworkXNoPath:
+        return {}
+
+
+@pytest.mark.parametrize("memory_budget_mb", [512, 0])
+@pytest.mark.parametrize("params", [None, COURIER])
+def test_lazy_routes_match_full_graph(tmp_path, memory_budget_mb, params):
+    graph = build_network(seed=121)
+    directory = str(tmp_path / "lazy")
+    LazyNetwork.build(graph, directory, key="key")
+    assert LazyNetwork.stored_key(directory) == "key"
+
+    lazy = LazyNetwork(directory, memory_budget_mb)
+    assert lazy.backbone.number_of_nodes() < graph.number_of_nodes()
+    prices = profile_prices(params)
+    for source, target in sample_pairs(graph, 25):
+        expected = reference_cost(graph, source, target, prices)
+        assert route_cost(lazy_route(lazy, source, target, params)) == pytest.approx(expected)
+    assert lazy.page_ins > 0
+    if memory_budget_mb == 0:
+        assert lazy.evictions > 0
+
+
+def test_eviction_keeps_resident_memory_under_budget(tmp_path):
+    graph = build_network(seed=122)
+    directory = str(tmp_path / "lazy")
+    LazyNetwork.build(graph, directory, key="key")
+    lazy = LazyNetwork(directory)
+    # miejsce na szkielet i mniej więcej jeden region
+    region_mb = max(lazy.page_in(region).size_mb for region in range(len(lazy.regions)))
+    lazy.memory_budget_mb = lazy.backbone_mb + 1.5 * region_mb
+    lazy.evict_to_budget()
+    evictions = lazy.evictions
+
+    for source, target in sample_pairs(graph, 30, seed=3):
+        expected = reference_cost(graph, source, target)
+        assert route_cost(lazy_route(lazy, source, target)) == pytest.approx(expected)
+        assert lazy.resident_mb() <= lazy.memory_budget_mb
+        assert len(lazy.resident) <= 1
+    assert lazy.evictions > evictions
@@ -0,0 +1,43 @@
+import json
+import pickle
+
+import networkx as nx
+import pytest
+
+from conftest import COUNTRIES, build_network
+from network.network import NetworkManager, memory_capped_workers
+
+
+def write_regions(folder, seed: int = 141) -> list[str]:
+    """Fixture region pickles (one country each) with their JSON attributes, as in network_data."""
+    graph = build_network(seed=seed)
+    for country in COUNTRIES:
+        nodes = [node for node, data in graph.nodes(data=True) if data.get("country") == country]
+        with open(folder / f"{country}_motorway.pkl", "wb") as file:
+            pickle.dump(nx.MultiGraph(graph.subgraph(nodes)), file)
+        with open(folder / f"{country}_motorway.json", "w") as file:
+            json.dump({"default_capacity": 1000, "default_price": 0.5}, file)
+    return list(COUNTRIES)
+
+
+def graph_content(graph: nx.MultiGraph) -> tuple[dict, dict]:
+    nodes = {node: dict(data) for node, data in graph.nodes(data=True)}
+    edges = {(min(u, v), max(u, v), key): dict(data) for u, v, key, data in graph.edges(keys=True, data=True)}
+    return nodes, edges
+
+
+def test_pool_and_serial_loading_give_the_same_graph(tmp_path):
+    regions = write_regions(tmp_path)
+    manager = NetworkManager(folder=str(tmp_path))
+    serial = manager.load_regions(regions, workers=1)
+    pooled = manager.load_regions(regions, workers=3)
+    assert serial.number_of_nodes() > 0
+    assert graph_content(pooled) == graph_content(serial)
+    assert pooled.get_routing_snapshot().checksum() == serial.get_routing_snapshot().checksum()
+
+
+def test_workers_are_capped_by_memory():
+    assert memory_capped_workers(4, []) == 4
+    assert memory_capped_workers(4, [1]) == 4
+    # region, który nie zmieści się w pamięci nawet raz: ładowanie bez puli
+    assert memory_capped_workers(4, [2 ** 60]) == 1
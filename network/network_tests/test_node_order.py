@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from conftest import build_network, reference_cost, sample_pairs
+from network.node_order import hilbert_keys, node_permutation, ordered_nodes, reorder_graph
+from network.router import shortest_path_tree
+from network.routing_snapshot import RoutingSnapshot
+from network.transport_types import NodeOrder
+
+
+def snapshot_cost(snapshot: RoutingSnapshot, source, target) -> float:
+    tree = shortest_path_tree(snapshot, snapshot.index_of(source), targets={snapshot.index_of(target)})
+    return tree.dist.get(snapshot.index_of(target), np.inf)
+
+
+@pytest.mark.parametrize("order", [NodeOrder.HILBERT, NodeOrder.REVERSE_CUTHILL_MCKEE])
+def test_permutation_is_a_bijection(order):
+    rng = np.random.default_rng(0)
+    x, y = rng.random(200), rng.random(200)
+    # część węzłów bez współrzędnych
+    x[::7] = np.nan
+    edge_u = rng.integers(0, 200, 600)
+    edge_v = rng.integers(0, 200, 600)
+    permutation = node_permutation(order, x, y, edge_u, edge_v)
+    assert sorted(permutation.tolist()) == list(range(200))
+
+
+def test_nodes_without_coordinates_go_last():
+    x = np.array([0.0, np.nan, 1.0, 0.5])
+    y = np.array([0.0, 1.0, np.nan, 0.5])
+    keys = hilbert_keys(x, y)
+    assert keys[[1, 2]].min() > keys[[0, 3]].max()
+
+
+@pytest.mark.parametrize("order", list(NodeOrder))
+def test_routes_and_index_of_do_not_depend_on_order(order):
+    graph = build_network(seed=31)
+    for node in sorted(graph.nodes)[::9]:
+        graph.nodes[node]["x"] = np.nan
+    snapshot = RoutingSnapshot.from_graph(graph, order)
+
+    assert sorted(snapshot.node_ids) == sorted(graph.nodes)
+    for node in graph.nodes:
+        assert snapshot.node_ids[snapshot.index_of(node)] == node
+    if order != NodeOrder.INPUT:
+        assert snapshot.node_ids == ordered_nodes(graph, order)
+    for source, target in sample_pairs(graph, 30):
+        assert snapshot_cost(snapshot, source, target) == pytest.approx(reference_cost(graph, source, target))
+
+
+def test_reordered_graph_keeps_nodes_and_edges():
+    graph = build_network(seed=32)
+    reordered = reorder_graph(graph, NodeOrder.HILBERT)
+    assert list(reordered.nodes) == ordered_nodes(graph, NodeOrder.HILBERT)
+    assert reordered.graph["node_order"] == NodeOrder.HILBERT.value
+    assert sorted((min(u, v), max(u, v), k) for u, v, k in reordered.edges(keys=True)) \
+        == sorted((min(u, v), max(u, v), k) for u, v, k in graph.edges(keys=True))
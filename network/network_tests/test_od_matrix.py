@@ -0,0 +1,36 @@
+import math
+
+import numpy as np
+import pytest
+
+from conftest import COURIER, build_network, disrupt, reference_cost
+from network.router import profile_prices
+
+
+@pytest.mark.parametrize("params", [None, COURIER])
+def test_od_matrix_matches_networkx(params):
+    graph = build_network(seed=91)
+    disrupt(graph, seed=92)
+    nodes = sorted(graph.nodes)
+    sources, targets = nodes[::9], nodes[4::11]
+    matrix = graph.od_matrix(sources, targets, params)
+    prices = profile_prices(params)
+    for i, source in enumerate(sources):
+        for j, target in enumerate(targets):
+            assert matrix.cost[i, j] == pytest.approx(reference_cost(graph, source, target, prices))
+
+
+def test_extra_masks_and_cache():
+    graph = build_network(seed=93)
+    nodes = sorted(graph.nodes)
+    sources, targets = nodes[:5], nodes[-5:]
+    matrix = graph.od_matrix(sources, targets)
+    assert graph.od_matrix(sources, targets) is matrix
+
+    snapshot = graph.get_routing_snapshot()
+    node_mask = np.ones(snapshot.number_of_nodes, dtype=bool)
+    node_mask[snapshot.index_of(sources[0])] = False
+    masked = graph.od_matrix(sources, targets, node_mask=node_mask)
+    assert all(math.isinf(cost) for cost in masked.cost[0])
+    # trasy pozostałych par mogą tylko zdrożeć
+    assert np.all(masked.cost[1:] >= matrix.cost[1:] - 1e-9)
@@ -0,0 +1,32 @@
+import pytest
+
+from conftest import build_network, disrupt, reference_cost, route_cost, sample_pairs
+from network.overlay_graph import OverlayGraph
+from test_router import single_route
+
+
+def attach_overlay(graph) -> OverlayGraph:
+    view = graph.get_active_view()
+    graph.overlay_graph = OverlayGraph.build(view.snapshot, graph, view)
+    return graph.overlay_graph
+
+
+def test_overlay_matches_networkx_on_intact_network():
+    graph = build_network(seed=31)
+    attach_overlay(graph)
+    for source, target in sample_pairs(graph, 40):
+        route = single_route(graph, source, target, strategy="overlay")
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target))
+
+
+def test_overlay_follows_disruptions():
+    graph = build_network(seed=32)
+    overlay = attach_overlay(graph)
+    pairs = sample_pairs(graph, 30)
+    for seed in (33, 34):
+        disrupt(graph, seed=seed)
+        # tylko komórki z wyłączonymi elementami są przeliczane
+        assert overlay.stale
+        for source, target in pairs:
+            route = single_route(graph, source, target, strategy="overlay")
+            assert route_cost(route) == pytest.approx(reference_cost(graph, source, target))
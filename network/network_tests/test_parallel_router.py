@@ -0,0 +1,103 @@
+import pytest
+
+from conftest import COURIER, build_network, disrupt, reference_cost, route_cost, sample_pairs
+from network.parallel_router import ParallelRouter
+from network.profile_router import find_profile_routes
+from network.router import profile_prices
+
+SECOND_COURIER = {"price_per_km_land": 2.0, "price_per_km_air": 0.5, "price_per_km_sea": 2.5}
+
+
+def mixed_params(count: int) -> list[dict]:
+    return [(({}, COURIER, SECOND_COURIER))[i % 3] for i in range(count)]
+
+
+def check_routes(graph, pairs, params, routes):
+    for (source, target), pair_params, route in zip(pairs, params, routes):
+        expected = reference_cost(graph, source, target, profile_prices(pair_params))
+        assert route_cost(route) == pytest.approx(expected)
+
+
+def test_multi_profile_search_matches_networkx():
+    graph = build_network(seed=71)
+    disrupt(graph, seed=72)
+    pairs = sample_pairs(graph, 45)
+    params = mixed_params(len(pairs))
+    check_routes(graph, pairs, params, find_profile_routes(graph, pairs, params))
+
+
+def test_workers_price_courier_profiles():
+    graph = build_network(seed=73)
+    disrupt(graph, seed=74)
+    pairs = sample_pairs(graph, 45)
+    params = mixed_params(len(pairs))
+    router = ParallelRouter(graph, workers=2, min_batch=2)
+    try:
+        check_routes(graph, pairs, params, router.find_profile_routes(pairs, params))
+        graph.route_cache.clear()
+        check_routes(graph, pairs, [{}] * len(pairs), router.find_routes(pairs))
+        assert router.pool is not None
+    finally:
+        router.close()
+
+
+def test_small_batches_repair_dynamic_trees():
+    graph = build_network(seed=75)
+    pairs = sample_pairs(graph, 10)
+    params = mixed_params(len(pairs))
+    router = ParallelRouter(graph, workers=2, min_batch=64)
+    try:
+        router.find_profile_routes(pairs, params)
+        assert router.dynamic.trees and router.shared is None
+        # trzymane drzewa są naprawiane po zakłóceniu, pula nie dostaje zadań
+        disrupt(graph, seed=76)
+        graph.route_cache.clear()
+        check_routes(graph, pairs, params, router.find_profile_routes(pairs, params))
+        assert router.shared is None
+    finally:
+        router.close()
+
+
+def test_pool_outlives_snapshot_rebuild():
+    graph = build_network(seed=77)
+    pairs = sample_pairs(graph, 30)
+    params = mixed_params(len(pairs))
+    router = ParallelRouter(graph, workers=2, min_batch=2)
+    try:
+        pool = router.pool
+        check_routes(graph, pairs, params, router.find_profile_routes(pairs, params))
+        first = router.shared.spec
+        graph.invalidate_routing_snapshot()
+        disrupt(graph, seed=78)
+        check_routes(graph, pairs, params, router.find_profile_routes(pairs, params))
+        assert router.pool is pool and router.shared.spec != first
+    finally:
+        router.close()
+
+
+def test_pool_results_keep_order_and_equal_serial_routes():
+    graph = build_network(seed=79)
+    isolated = max(graph.nodes) + 1
+    graph.add_node(isolated, x=20.0, y=50.0)
+    pairs = sample_pairs(graph, 40) + [(0, isolated), ("missing", 1)]
+    params = mixed_params(len(pairs))
+    serial = ParallelRouter(graph, workers=1)
+    router = ParallelRouter(graph, workers=2, min_batch=2)
+    try:
+        expected = serial.find_profile_routes(pairs, params)
+        graph.route_cache.clear()
+        routes = router.find_profile_routes(pairs, params)
+        assert serial.pool is None and router.shared is not None
+        assert routes[-2:] == [{}, {}]
+        assert [route.get("path") for route in routes] == [route.get("path") for route in expected]
+        assert [route_cost(route) for route in routes] == pytest.approx([route_cost(route) for route in expected])
+
+        # nowa cena krawędzi trafia do bloku współdzielonego bez zmiany specyfikacji
+        spec = router.shared.spec
+        path = routes[0]["path"]
+        graph.set_price(1e4, path=path)
+        check_routes(graph, pairs, params, router.find_profile_routes(pairs, params))
+        assert router.shared.spec is spec
+    finally:
+        router.close()
+        serial.close()
@@ -0,0 +1,39 @@
+import pytest
+
+from conftest import COURIER, build_network, disrupt, reference_cost, sample_pairs
+from network.pareto_router import choose_by_time_budget, edge_lead_times, pareto_frontier, pareto_routes
+from network.router import profile_prices
+
+
+@pytest.mark.parametrize("max_labels", [1, 2, 1000])
+def test_frontier_ends_are_exact(max_labels):
+    graph = build_network(seed=81)
+    disrupt(graph, seed=82)
+    snapshot = graph.get_routing_snapshot()
+    view = graph.get_active_view()
+    time = edge_lead_times(snapshot).tolist()
+    for source_node, target_node in sample_pairs(graph, 30):
+        source = snapshot.index_of(source_node)
+        target = snapshot.index_of(target_node)
+        frontier = pareto_frontier(snapshot, source, target, view, max_labels=max_labels)
+        fastest = snapshot.dijkstra_path(source, target, view=view, weights=time)
+        if fastest is None:
+            assert frontier == []
+            continue
+        assert frontier[0][0] == pytest.approx(reference_cost(graph, source_node, target_node))
+        assert frontier[-1][1] == pytest.approx(sum(time[e] for e in fastest[1]))
+        # ściśle rosnący koszt i malejący czas: żadna trasa nie dominuje innej
+        assert all(a[0] < b[0] and a[1] > b[1] for a, b in zip(frontier, frontier[1:]))
+
+
+def test_time_budget_picks_cheapest_feasible_route():
+    graph = build_network(seed=83)
+    prices = profile_prices(COURIER)
+    for source, target in sample_pairs(graph, 20):
+        routes = pareto_routes(graph, source, target, COURIER, max_labels=2)
+        if not routes:
+            continue
+        assert routes[0]["estimated_cost"] == pytest.approx(reference_cost(graph, source, target, prices))
+        fastest = min(route["estimated_lead_time_days"] for route in routes)
+        assert choose_by_time_budget(routes, 0.0)["estimated_lead_time_days"] == fastest
+        assert choose_by_time_budget(routes, float("inf")) is routes[0]
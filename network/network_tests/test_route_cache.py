@@ -0,0 +1,53 @@
+import pytest
+
+from conftest import COURIER, build_network, sample_pairs
+from network.route_cache import RouteCache
+from network.router import find_route
+
+
+def route(path: list) -> dict:
+    return {"path": path, "estimated_cost": float(len(path))}
+
+
+def test_lru_eviction_by_entries_and_path_nodes():
+    cache = RouteCache(max_entries=3, max_path_nodes=10)
+    for i in range(3):
+        cache.put(("s", i, None, 0), route([0, 1, 2]))
+    assert cache.get(("s", 0, None, 0)) is not None
+    # wpis 1 był używany najdawniej
+    cache.put(("s", 3, None, 0), route([0, 1]))
+    assert cache.get(("s", 1, None, 0)) is None
+    assert len(cache) == 3 and cache.evictions == 1
+    cache.put(("s", 4, None, 0), route(list(range(8))))
+    assert cache.path_nodes <= 10
+    assert cache.get(("s", 4, None, 0)) is not None
+    assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 1
+
+
+def test_cached_paths_cannot_be_modified():
+    cache = RouteCache()
+    cache.put(("s", "t", None, 0), route([1, 2, 3]))
+    cache.get(("s", "t", None, 0))["path"].append(4)
+    assert cache.get(("s", "t", None, 0))["path"] == [1, 2, 3]
+
+
+def test_routes_are_keyed_by_disruption_state():
+    graph = build_network(seed=181)
+    source, target = sample_pairs(graph, 1)[0]
+    first = find_route(graph, source, target)
+    cache = graph.route_cache
+    find_route(graph, source, target)
+    assert cache.hits == 1
+    # ten sam węzeł z innym profilem cenowym to osobny wpis
+    find_route(graph, source, target, COURIER)
+    assert cache.hits == 1
+
+    inner = first["path"][1:-1]
+    graph.deactivate_nodes(inner)
+    find_route(graph, source, target)
+    assert cache.hits == 1
+    # powrót do poprzedniego stanu sieci trafia w trasę policzoną wcześniej
+    graph.activate_nodes(inner)
+    again = find_route(graph, source, target)
+    assert cache.hits == 2
+    assert again["estimated_cost"] == pytest.approx(first["estimated_cost"])
@@ -0,0 +1,48 @@
+import math
+
+import numpy as np
+import pytest
+
+from conftest import COURIER, build_network, sample_pairs
+from models.delivery.delivery import Delivery
+from network.router import find_routes, profile_prices, route_metrics
+from network.transport_types import TransportMode
+
+
+def edge_data(graph, path: list) -> list[dict]:
+    # build_network nie tworzy krawędzi równoległych, więc każdy krok ma jedną krawędź
+    return [next(iter(graph[u][v].values())) for u, v in zip(path, path[1:])]
+
+
+@pytest.mark.parametrize("params", [None, COURIER, {"driving_hours_per_day": 8.0}])
+def test_metrics_match_a_per_edge_loop(params):
+    graph = build_network(seed=211)
+    prices = profile_prices(params)
+    driving_hours = (params or {}).get("driving_hours_per_day", 24.0)
+    for route in find_routes(graph, sample_pairs(graph, 30), params):
+        if not route:
+            continue
+        data = edge_data(graph, route["path"])
+        cost = sum(d["cost"] if prices is None else prices[d["transport_mode"]] * d["length"] / 1000.0 for d in data)
+        lead_time = sum(d["travel_hours"] / 24.0 * (24.0 / driving_hours if d["transport_mode"] == TransportMode.LAND else 1.0)
+                        for d in data)
+        assert route["estimated_cost"] == pytest.approx(cost)
+        assert route["total_distance_km"] == pytest.approx(sum(d["length"] for d in data) / 1000.0)
+        assert route["estimated_lead_time_days"] == pytest.approx(lead_time)
+        assert route["min_capacity"] == min(d["capacity"] for d in data)
+        assert not route["edges"].flags.writeable
+
+
+def test_empty_path_and_delivery_bottleneck():
+    graph = build_network(seed=212)
+    snapshot = graph.get_routing_snapshot()
+    empty = route_metrics(snapshot, np.empty(0, dtype=np.int32))
+    assert empty["cost"] == 0.0 and math.isinf(empty["min_capacity"])
+
+    (source, target), = sample_pairs(graph, 1)
+    route = find_routes(graph, [(source, target)])[0]
+    u, v = route["path"][1:3]
+    graph.set_capacity(3, path=[u, v])
+    delivery = Delivery(0, source, target, route["edges"], route["total_distance_km"], route["estimated_cost"],
+                        route["estimated_lead_time_days"], [], snapshot=snapshot)
+    assert delivery.find_minimum_capacity(graph) == 3.0
@@ -0,0 +1,58 @@
+import math
+
+import networkx as nx
+import pytest
+
+from conftest import COURIER, build_network, disrupt, reference_cost, route_cost, sample_pairs
+from network.router import find_route, find_routes, profile_prices
+
+
+def single_route(graph, source, target, params=None, strategy=None):
+    try:
+        return find_route(graph, source, target, params, strategy)
+    except nx.NetworkXNoPath:
+        return {}
+
+
+@pytest.mark.parametrize("strategy", ["dijkstra", "bidirectional"])
+@pytest.mark.parametrize("disrupted", [False, True])
+def test_find_route_matches_networkx(strategy, disrupted):
+    graph = build_network(seed=1)
+    if disrupted:
+        disrupt(graph, seed=2)
+    for source, target in sample_pairs(graph, 40):
+        expected = reference_cost(graph, source, target)
+        assert route_cost(single_route(graph, source, target, strategy=strategy)) == pytest.approx(expected)
+
+
+def test_find_route_with_courier_prices():
+    graph = build_network(seed=3)
+    disrupt(graph, seed=4)
+    prices = profile_prices(COURIER)
+    for source, target in sample_pairs(graph, 30):
+        expected = reference_cost(graph, source, target, prices)
+        assert route_cost(single_route(graph, source, target, COURIER)) == pytest.approx(expected)
+
+
+def test_find_routes_matches_single_queries():
+    graph = build_network(seed=5)
+    disrupt(graph, seed=6)
+    # kilka celów z każdego źródła, żeby drzewa były współdzielone
+    pairs = [(source, target) for source, _ in sample_pairs(graph, 8) for _, target in sample_pairs(graph, 5, seed=source)]
+    routes = find_routes(graph, pairs)
+    for (source, target), route in zip(pairs, routes):
+        assert route_cost(route) == pytest.approx(reference_cost(graph, source, target))
+        if route:
+            assert route["path"][0] == source and route["path"][-1] == target
+
+
+def test_reactivation_restores_routes():
+    graph = build_network(seed=7)
+    pairs = sample_pairs(graph, 20)
+    before = [route_cost(single_route(graph, source, target)) for source, target in pairs]
+    nodes = sorted(graph.nodes)[:10]
+    graph.deactivate_nodes(nodes)
+    graph.activate_nodes(nodes)
+    after = [route_cost(single_route(graph, source, target)) for source, target in pairs]
+    assert after == pytest.approx(before)
+    assert all(cost < math.inf for cost in after)
@@ -0,0 +1,118 @@
+import pytest
+
+from conftest import COURIER, build_network, reference_cost, route_cost, sample_pairs
+from network.dynamic_router import DynamicRouter
+from network.hub_table import HubTable
+from network.router import find_route, profile_prices
+from network.routing_snapshot import DEFAULT_SPEED_KMH, DEFAULT_UNIT_COST, EDGE_COLUMNS_VERSION, MAX_TRUCK_SPEED_KMH, SEA_SPEED_KMH
+from network.simulation_graph import SimulationGraph
+from network.transport_types import TransportMode
+from test_router import single_route
+
+
+def two_node_graph(**edge) -> tuple[SimulationGraph, int]:
+    graph = SimulationGraph()
+    graph.add_node(1, x=0.0, y=0.0)
+    graph.add_node(2, x=1.0, y=0.0)
+    return graph, graph.add_edge(1, 2, **edge)
+
+
+def lead_time_hours(graph: SimulationGraph) -> float:
+    return float(graph.get_routing_snapshot().lead_time[0] * 24.0)
+
+
+def test_land_speed_is_capped_for_trucks():
+    graph, _ = two_node_graph(length=90000, maxspeed="130")
+    assert lead_time_hours(graph) == pytest.approx(90.0 / MAX_TRUCK_SPEED_KMH)
+    graph, _ = two_node_graph(length=60000)
+    assert lead_time_hours(graph) == pytest.approx(60.0 / DEFAULT_SPEED_KMH)
+
+
+def test_sea_edges_use_duration_hours():
+    graph, _ = two_node_graph(length=350000, type="sea_route", duration_hours=7.0)
+    assert graph.get_routing_snapshot().mode[0] == TransportMode.SEA
+    assert lead_time_hours(graph) == pytest.approx(7.0)
+    graph, _ = two_node_graph(length=350000, type="sea_route")
+    assert lead_time_hours(graph) == pytest.approx(350.0 / SEA_SPEED_KMH)
+
+
+def test_add_edge_renormalizes_changed_tags():
+    graph, key = two_node_graph(length=100000, maxspeed="50")
+    assert lead_time_hours(graph) == pytest.approx(2.0)
+    graph.add_edge(1, 2, key=key, maxspeed="80")
+    assert lead_time_hours(graph) == pytest.approx(1.25)
+
+
+def test_renormalize_edges_after_in_place_edits():
+    graph, key = two_node_graph(length=100000, maxspeed="50")
+    graph.get_routing_snapshot()
+    graph[1][2][key]["length"] = 200000
+    # zmiana w słowniku atrybutów nie jest widoczna bez ponownej normalizacji
+    graph.invalidate_routing_snapshot()
+    assert lead_time_hours(graph) == pytest.approx(2.0)
+    graph.renormalize_edges([(1, 2, key)])
+    assert lead_time_hours(graph) == pytest.approx(4.0)
+
+
+def test_stale_column_version_is_normalized_again():
+    graph, key = two_node_graph(length=100000, maxspeed="50")
+    graph[1][2][key]["travel_hours"] = 99.0
+    graph.graph["edge_columns_version"] = EDGE_COLUMNS_VERSION - 1
+    graph.invalidate_routing_snapshot()
+    assert lead_time_hours(graph) == pytest.approx(2.0)
+    assert graph.graph["edge_columns_version"] == EDGE_COLUMNS_VERSION
+
+
+def test_missing_cost_is_not_written_to_the_edge():
+    graph = SimulationGraph()
+    graph.add_node(1, x=0.0, y=0.0)
+    graph.add_node(2, x=1.0, y=0.0)
+    graph.add_edge(1, 2, length=1000, type="airline_route")
+    key = next(iter(graph[1][2]))
+    graph[1][2][key].pop("cost", None)
+    graph.renormalize_edges([(1, 2, key)])
+    assert "cost" not in graph[1][2][key]
+    assert graph.get_routing_snapshot().cost[0] == pytest.approx(DEFAULT_UNIT_COST[TransportMode.AIR])
+
+
+def test_capacity_edits_keep_the_routing_state():
+    graph = build_network(seed=151)
+    router = DynamicRouter(graph)
+    pairs = sample_pairs(graph, 10)
+    routes = router.find_routes(pairs)
+    snapshot, view = graph.get_routing_snapshot(), graph.get_active_view()
+    source, target = next(pair for pair, route in zip(pairs, routes) if len(route["path"]) > 2)
+    path = find_route(graph, source, target)["path"]
+
+    graph.set_capacity(7, path=path)
+    assert graph.get_routing_snapshot() is snapshot and graph.get_active_view() is view
+    assert router.trees
+    assert snapshot.capacity[snapshot.path_edges(path)].tolist() == [7.0] * (len(path) - 1)
+    # trasa z pamięci podręcznej ma już nowe wąskie gardło
+    assert find_route(graph, source, target)["min_capacity"] == 7.0
+    assert graph.route_cache.hits > 0
+
+
+def test_price_edits_drop_only_cost_structures():
+    graph = build_network(seed=152)
+    prices = profile_prices(COURIER)
+    snapshot = graph.get_routing_snapshot()
+    for table_prices in (None, prices):
+        graph.hub_tables[table_prices] = HubTable.build(snapshot, graph, table_prices)
+    profile_table = graph.hub_tables[prices]
+    checksum = snapshot.checksum()
+    router = DynamicRouter(graph)
+    pairs = sample_pairs(graph, 20, seed=1)
+    router.find_routes(pairs)
+    source, target = sample_pairs(graph, 1)[0]
+    path = find_route(graph, source, target, strategy="dijkstra")["path"]
+
+    graph.set_price(1e4, path=path)
+    assert graph.get_routing_snapshot() is snapshot and snapshot.checksum() != checksum
+    assert None not in graph.hub_tables and graph.hub_tables[prices] is profile_table
+    assert len(graph.route_cache) == 0
+    pairs.append((source, target))
+    for (source, target), route in zip(pairs, router.find_routes(pairs)):
+        expected = reference_cost(graph, source, target)
+        assert route_cost(route) == pytest.approx(expected)
+        assert route_cost(single_route(graph, source, target)) == pytest.approx(expected)
@@ -0,0 +1,102 @@
+import os
+import sys
+
+import networkx as nx
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.transport_types import NodeOrder
+
+DEFAULT_NODE_ORDER = NodeOrder.HILBERT
+# rozdzielczość siatki krzywej Hilberta: 2^16 x 2^16 komórek (ok. 600 m na całym globie)
+HILBERT_BITS = 16
+
+
+def hilbert_keys(x: np.ndarray, y: np.ndarray, bits: int = HILBERT_BITS) -> np.ndarray:
+    """
+    Position of every point on a Hilbert curve over the bounding box of the points,
+    computed for all points at once (one NumPy pass per bit). Points without
+    coordinates (NaN) get keys after all others.
+    """
+    side = 1 << bits
+    valid = ~(np.isnan(x) | np.isnan(y))
+    keys = np.full(len(x), side * side, dtype=np.int64)
+    if not valid.any():
+        return keys
+
+    def grid(values: np.ndarray) -> np.ndarray:
+        low = values.min()
+        span = values.max() - low
+        if span <= 0:
+            return np.zeros(len(values), dtype=np.int64)
+        return np.minimum(((values - low) / span * side).astype(np.int64), side - 1)
+
+    gx = grid(x[valid])
+    gy = grid(y[valid])
+    d = np.zeros(len(gx), dtype=np.int64)
+    s = side // 2
+    while s > 0:
+        rx = (gx & s) > 0
+        ry = (gy & s) > 0
+        d += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # obrót ćwiartki, aby kolejne poziomy krzywej były ciągłe
+        flip = ~ry & rx
+        gx = np.where(flip, side - 1 - gx, gx)
+        gy = np.where(flip, side - 1 - gy, gy)
+        gx, gy = np.where(ry, gx, gy), np.where(ry, gy, gx)
+        s //= 2
+    keys[valid] = d
+    return keys
+
+
+def node_permutation(order: NodeOrder | str, x: np.ndarray, y: np.ndarray, edge_u: np.ndarray,
+                     edge_v: np.ndarray) -> np.ndarray | None:
+    """
+    Dense renumbering for memory locality, as the old index of every new position;
+    None for `NodeOrder.INPUT`.
+
+    `HILBERT` sorts nodes along a Hilbert curve over their coordinates, so nodes close on
+    the map get close indices. `REVERSE_CUTHILL_MCKEE` orders them by graph structure
+    only (small adjacency bandwidth), which also suits graphs without coordinates.
+    """
+    order = NodeOrder(order)
+    n = len(x)
+    if order == NodeOrder.INPUT or n == 0:
+        return None
+    if order == NodeOrder.HILBERT:
+        return np.argsort(hilbert_keys(x, y), kind="stable")
+    adjacency = sp.csr_matrix((np.ones(len(edge_u), dtype=np.int8), (edge_u, edge_v)), shape=(n, n))
+    return reverse_cuthill_mckee(adjacency, symmetric_mode=False).astype(np.int64)
+
+
+def ordered_nodes(graph: nx.Graph, order: NodeOrder | str = DEFAULT_NODE_ORDER) -> list:
+    """Nodes of `graph` in the order `RoutingSnapshot.from_graph` numbers them with `order`."""
+    nodes = list(graph.nodes())
+    index = {node: i for i, node in enumerate(nodes)}
+    x = np.array([data.get("x", np.nan) for _, data in graph.nodes(data=True)], dtype=np.float64)
+    y = np.array([data.get("y", np.nan) for _, data in graph.nodes(data=True)], dtype=np.float64)
+    edge_u = np.array([index[u] for u, v in graph.edges() if u != v], dtype=np.int64)
+    edge_v = np.array([index[v] for u, v in graph.edges() if u != v], dtype=np.int64)
+    permutation = node_permutation(order, x, y, edge_u, edge_v)
+    if permutation is None:
+        return nodes
+    return [nodes[i] for i in permutation]
+
+
+def reorder_graph(graph: nx.Graph, order: NodeOrder | str = DEFAULT_NODE_ORDER) -> nx.MultiGraph:
+    """
+    Copy of `graph` as a MultiGraph whose nodes and edges are inserted in locality order,
+    so networkx traversals and the pickles written from it follow the same numbering.
+    """
+    nodes = ordered_nodes(graph, order)
+    reordered = nx.MultiGraph()
+    reordered.graph.update(graph.graph)
+    reordered.graph["node_order"] = NodeOrder(order).value
+    reordered.add_nodes_from((node, graph.nodes[node]) for node in nodes)
+    if graph.is_multigraph():
+        reordered.add_edges_from(graph.edges(nodes, keys=True, data=True))
+    else:
+        reordered.add_edges_from(graph.edges(nodes, data=True))
+    return reordered
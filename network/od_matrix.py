@@ -0,0 +1,276 @@
+import hashlib
+import os
+import sys
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import dijkstra
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.router import cost_profile, get_routing_state, profile_prices
+from network.routing_snapshot import RoutingSnapshot
+from network.transport_types import TransportMode
+
+# liczba źródeł na jedno wywołanie csgraph (macierze poprzedników mają rozmiar OD_CHUNK x węzły)
+OD_CHUNK = 8
+METRICS = ("cost", "distance_km", "lead_time_days")
+
+
+def od_arrays(snapshot: RoutingSnapshot) -> dict[str, np.ndarray]:
+    """Snapshot columns an `ODSearchGraph` is built from (the same names as in `SharedRoutingArrays`)."""
+    return {
+        "offsets": snapshot.offsets,
+        "neighbors": snapshot.neighbors,
+        "half_edges": snapshot.half_edges,
+        "cost": snapshot.cost,
+        "length": snapshot.length,
+        "lead_time": snapshot.lead_time,
+        "mode": snapshot.mode,
+    }
+
+
+class ODSearchGraph:
+    """
+    Active part of a routing snapshot as a scipy CSR matrix, for multi-source
+    `scipy.sparse.csgraph.dijkstra` runs.
+
+    Half-edges of inactive edges or touching inactive nodes are dropped. Besides the
+    cheapest-path costs, `rows` sums length and lead time along the cheapest paths: the
+    collapsed edge entering every node of the predecessor tree is found with one
+    `searchsorted`, and the sums up to the root are accumulated by pointer jumping, so
+    all nodes are handled in O(log depth) NumPy passes instead of one path trace per pair.
+    """
+    def __init__(self, arrays: dict[str, np.ndarray], node_mask: np.ndarray, edge_mask: np.ndarray,
+                 prices: tuple[float, float, float] | None = None, driving_hours: float = 24.0):
+        offsets = arrays["offsets"]
+        neighbors = arrays["neighbors"]
+        half_edges = arrays["half_edges"]
+        n = len(offsets) - 1
+        self.number_of_nodes = n
+
+        tails = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+        keep = edge_mask[half_edges] & node_mask[neighbors] & node_mask[tails]
+        tails = tails[keep]
+        heads = neighbors[keep]
+        edges = half_edges[keep]
+        indptr = np.concatenate([[0], np.cumsum(np.bincount(tails, minlength=n))])
+
+        mode = arrays["mode"]
+        if prices is None:
+            cost = arrays["cost"]
+        else:
+            cost = np.asarray(prices, dtype=np.float64)[mode] * (arrays["length"] / 1000.0)
+        # czas jak w `route_metrics`: odcinki lądowe przeliczone na dozwolone godziny jazdy
+        lead_time = arrays["lead_time"]
+        if driving_hours > 0:
+            lead_time = np.where(mode == TransportMode.LAND, lead_time * (24.0 / driving_hours), lead_time)
+
+        self.matrix = sp.csr_matrix((cost[edges], heads, indptr), shape=(n, n))
+        keys = tails * n + heads
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.length = arrays["length"][edges[order]] / 1000.0
+        self.lead_time = lead_time[edges[order]]
+
+    def rows(self, sources: np.ndarray, targets: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Cost, distance in km and lead time in days of the cheapest paths from every source
+        to every target (shape: sources x targets), inf where unreachable.
+        """
+        n = self.number_of_nodes
+        dist, pred = dijkstra(self.matrix, directed=True, indices=sources, return_predecessors=True)
+        nodes = np.broadcast_to(np.arange(n), pred.shape)
+        reached = pred >= 0
+        entry = np.searchsorted(self.keys, pred[reached].astype(np.int64) * n + nodes[reached])
+
+        length = np.zeros(pred.shape)
+        lead_time = np.zeros(pred.shape)
+        length[reached] = self.length[entry]
+        lead_time[reached] = self.lead_time[entry]
+        parent = np.where(reached, pred, nodes)
+        row = np.arange(len(sources))[:, None]
+        while True:
+            grandparent = parent[row, parent]
+            if np.array_equal(grandparent, parent):
+                break
+            length += length[row, parent]
+            lead_time += lead_time[row, parent]
+            parent = grandparent
+
+        cost = dist[:, targets]
+        unreachable = np.isinf(cost)
+        length = length[:, targets]
+        lead_time = lead_time[:, targets]
+        length[unreachable] = np.inf
+        lead_time[unreachable] = np.inf
+        return cost, length, lead_time
+
+
+class ODMatrix:
+    """
+    Cost, distance and lead-time matrices between two lists of nodes, with the same
+    semantics as `network.router.route_metrics` applied to the cheapest route of every
+    pair. Rows follow `sources`, columns follow `targets`; unreachable pairs and nodes
+    missing from the network are inf. The arrays are read-only, since matrices are
+    shared through the graph's `od_matrix_cache`.
+
+    Attributes
+    ----------
+    sources, targets : list[int | str]
+        Node IDs of the rows and columns.
+    cost : np.ndarray
+        Money cost of the cheapest route.
+    distance_km : np.ndarray
+        Length of that route in km.
+    lead_time_days : np.ndarray
+        Lead time of that route in days.
+    """
+    def __init__(self, sources: list[int | str], targets: list[int | str], cost: np.ndarray,
+                 distance_km: np.ndarray, lead_time_days: np.ndarray):
+        self.sources = sources
+        self.targets = targets
+        self.cost = cost
+        self.distance_km = distance_km
+        self.lead_time_days = lead_time_days
+        for matrix in (cost, distance_km, lead_time_days):
+            matrix.setflags(write=False)
+
+    def lookup(self, source_node: int | str, target_node: int | str) -> Dict[str, float]:
+        i = self.sources.index(source_node)
+        j = self.targets.index(target_node)
+        return {metric: float(getattr(self, metric)[i, j]) for metric in METRICS}
+
+    def to_frame(self, metric: str = "cost") -> pd.DataFrame:
+        """One metric as a DataFrame indexed by source, with a column per target."""
+        if metric not in METRICS:
+            raise ValueError(f"Unknown OD metric: {metric}")
+        return pd.DataFrame(getattr(self, metric), index=self.sources, columns=self.targets)
+
+
+class ODMatrixCache:
+    """
+    Bounded LRU cache of OD matrices, keyed like `RouteCache` by the node lists, the cost
+    profile and the disruption fingerprint, so a network returning to an earlier state
+    reuses the matrices computed back then.
+    """
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: tuple) -> ODMatrix | None:
+        matrix = self.entries.get(key)
+        if matrix is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return matrix
+
+    def put(self, key: tuple, matrix: ODMatrix) -> None:
+        self.entries[key] = matrix
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def mask_digest(node_mask: np.ndarray = None, edge_mask: np.ndarray = None) -> str | None:
+    """Identifies the extra masks of an OD query in its cache key."""
+    if node_mask is None and edge_mask is None:
+        return None
+    digest = hashlib.sha1()
+    for mask in (node_mask, edge_mask):
+        digest.update(b"-" if mask is None else np.packbits(np.asarray(mask, dtype=bool)).tobytes())
+    return digest.hexdigest()
+
+
+def compute_od_matrix(graph: nx.Graph, sources: list[int | str], targets: list[int | str],
+                      params: Optional[Dict[str, Any]] = None, node_mask: np.ndarray = None,
+                      edge_mask: np.ndarray = None, router=None) -> ODMatrix:
+    """
+    Many-to-many cheapest-route metrics on the active network.
+
+    Parameters
+    ----------
+    graph : nx.Graph
+        Network; a `SimulationGraph` contributes its active view and `od_matrix_cache`.
+    sources, targets : list[int | str]
+        Node IDs of the rows and columns.
+    params : dict, optional
+        Route parameters as in `network.router.find_routes` (courier prices, driving hours).
+    node_mask, edge_mask : np.ndarray[bool], optional
+        Extra masks over the snapshot's nodes / collapsed edges, combined with the
+        active view, e.g. to evaluate a disruption scenario without applying it.
+    router : ParallelRouter, optional
+        If given, chunks of sources are searched in its process pool.
+    """
+    snapshot, view = get_routing_state(graph)
+    cache = getattr(graph, "od_matrix_cache", None)
+    key = None
+    if cache is not None:
+        fingerprint = graph.get_active_view().fingerprint
+        key = (tuple(sources), tuple(targets), cost_profile(params), fingerprint, mask_digest(node_mask, edge_mask))
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    active_nodes = np.ones(snapshot.number_of_nodes, dtype=bool) if view is None else view.node_mask.copy()
+    active_edges = np.ones(snapshot.number_of_edges, dtype=bool) if view is None else view.edge_mask.copy()
+    if node_mask is not None:
+        active_nodes &= node_mask
+    if edge_mask is not None:
+        active_edges &= edge_mask
+
+    source_indices = [snapshot.index_of(node) for node in sources]
+    target_indices = [snapshot.index_of(node) for node in targets]
+    rows = np.unique([i for i in source_indices if i is not None]).astype(np.int64)
+    columns = np.unique([i for i in target_indices if i is not None]).astype(np.int64)
+
+    shape = (len(rows), len(columns))
+    found = [np.full(shape, np.inf) for _ in METRICS]
+    if len(rows) and len(columns):
+        if params is None:
+            params = {}
+        prices = profile_prices(params)
+        driving_hours = float(params.get("driving_hours_per_day", 24.0))
+        chunks = [rows[start:start + OD_CHUNK] for start in range(0, len(rows), OD_CHUNK)]
+        if router is not None and len(chunks) > 1:
+            results = router.od_rows(snapshot, active_nodes, active_edges, prices, driving_hours, chunks, columns)
+        else:
+            search = ODSearchGraph(od_arrays(snapshot), active_nodes, active_edges, prices, driving_hours)
+            results = [search.rows(chunk, columns) for chunk in chunks]
+        for start, result in zip(range(0, len(rows), OD_CHUNK), results):
+            for matrix, part in zip(found, result):
+                matrix[start:start + len(part)] = part
+
+    # wiersze i kolumny w kolejności zapytania, brakujące węzły jako inf
+    row_of = np.searchsorted(rows, [i if i is not None else 0 for i in source_indices])
+    column_of = np.searchsorted(columns, [i if i is not None else 0 for i in target_indices])
+    missing_rows = np.array([i is None for i in source_indices], dtype=bool)
+    missing_columns = np.array([i is None for i in target_indices], dtype=bool)
+    matrices = []
+    for matrix in found:
+        full = np.full((len(sources), len(targets)), np.inf)
+        if shape[0] and shape[1]:
+            full[:] = matrix[np.minimum(row_of, shape[0] - 1)][:, np.minimum(column_of, shape[1] - 1)]
+        full[missing_rows] = np.inf
+        full[:, missing_columns] = np.inf
+        matrices.append(full)
+
+    result = ODMatrix(list(sources), list(targets), *matrices)
+    if key is not None:
+        cache.put(key, result)
+    return result
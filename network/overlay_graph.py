@@ -0,0 +1,256 @@
+import heapq
+import os
+import sys
+from collections import defaultdict
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.routing_snapshot import RoutingSnapshot
+
+# węzły bez kraju oraz lotniska i porty należą bezpośrednio do nakładki
+HUB_CELL = -1
+HUB_TYPES = ("airport", "seaport")
+
+
+class OverlayGraph:
+    """
+    Country-partitioned overlay for long-haul routing on a `RoutingSnapshot`.
+
+    Every node belongs to the cell of its `country` attribute; airports, seaports and
+    nodes without a country form no cell and are always part of the overlay. Boundary
+    nodes are the endpoints of edges leaving their cell (cross-border roads, links to
+    hubs). The overlay keeps, per cell, the cheapest in-cell distance between every pair
+    of its boundary nodes (a clique), plus all edges between cells and hub edges.
+
+    A query between two cells searches the full graph of the two endpoint cells and only
+    the overlay elsewhere, which is exact: every part of a path inside another country
+    runs between two of its boundary nodes. Cliques are computed on the active network;
+    the overlay listens to the `ActiveView`, and a change marks only the cells of the
+    affected nodes and edges as stale, to be rebuilt by the next query.
+
+    Cliques hold the edge `cost`, so the overlay answers unpriced queries only; courier
+    priced queries run bidirectional Dijkstra, and the simulation does not build it.
+
+    Attributes
+    ----------
+    snapshot : RoutingSnapshot
+        Snapshot the partition is built on.
+    cells : list[str]
+        Country of every cell.
+    cell_of : np.ndarray[int32]
+        Cell of every node, `HUB_CELL` for overlay-only nodes.
+    boundary : dict[int, list[int]]
+        Mapping: cell -> its boundary nodes.
+    cut_edges : dict[int, list[tuple[int, int]]]
+        Mapping: boundary node -> (neighbor, edge) for every edge to another cell or hub.
+    cliques : dict[int, dict[int, list[tuple[int, float, np.ndarray]]]]
+        Mapping: cell -> boundary node -> (other boundary node, cost, edge indices).
+    stale : set[int]
+        Cells whose cliques have to be recomputed before the next query.
+    """
+    def __init__(self, snapshot: RoutingSnapshot, cells: list[str], cell_of: np.ndarray):
+        self.snapshot = snapshot
+        self.cells = cells
+        self.cell_of = cell_of
+        self.cell_list = cell_of.tolist()
+        self.view = None
+
+        offsets, neighbors, half_edges, _ = snapshot.adjacency_lists()
+        boundary = defaultdict(set)
+        self.cut_edges = defaultdict(list)
+        for u in range(snapshot.number_of_nodes):
+            cell = self.cell_list[u]
+            for i in range(offsets[u], offsets[u + 1]):
+                v = neighbors[i]
+                if cell == HUB_CELL or self.cell_list[v] != cell:
+                    self.cut_edges[u].append((v, half_edges[i]))
+                    if cell != HUB_CELL:
+                        boundary[cell].add(u)
+        self.boundary = {cell: sorted(nodes) for cell, nodes in boundary.items()}
+        self.cliques = {}
+        self.stale = set(range(len(cells)))
+
+    @classmethod
+    def build(cls, snapshot: RoutingSnapshot, graph: nx.Graph, view=None) -> "OverlayGraph":
+        """Partitions `snapshot` by the nodes' `country` attribute in `graph` and computes all cliques."""
+        cells = []
+        cell_index = {}
+        cell_of = np.full(snapshot.number_of_nodes, HUB_CELL, dtype=np.int32)
+        for i, node in enumerate(snapshot.node_ids):
+            data = graph.nodes[node]
+            country = data.get("country")
+            if country is None or data.get("type") in HUB_TYPES:
+                continue
+            if country not in cell_index:
+                cell_index[country] = len(cells)
+                cells.append(country)
+            cell_of[i] = cell_index[country]
+
+        overlay = cls(snapshot, cells, cell_of)
+        if view is not None:
+            overlay.attach(view)
+        overlay.refresh()
+        return overlay
+
+    def attach(self, view) -> None:
+        """Follows the changes of `view` (an `ActiveView` of the same snapshot)."""
+        if view is self.view:
+            return
+        if view.snapshot is not self.snapshot:
+            raise ValueError("Active view belongs to a different routing snapshot")
+        if self.view is not None and self in self.view.listeners:
+            self.view.listeners.remove(self)
+        self.view = view
+        view.listeners.append(self)
+        self.stale = set(range(len(self.cells)))
+
+    def nodes_changed(self, indices: list[int], active: bool) -> None:
+        self.stale.update(self.cell_list[i] for i in indices)
+        self.stale.discard(HUB_CELL)
+
+    def edges_changed(self, indices: list[int], active: bool) -> None:
+        edge_u = self.snapshot.edge_u
+        edge_v = self.snapshot.edge_v
+        for e in indices:
+            cell = self.cell_list[edge_u[e]]
+            # krawędzie między komórkami są sprawdzane przy zapytaniu, nie w klikach
+            if cell != HUB_CELL and cell == self.cell_list[edge_v[e]]:
+                self.stale.add(cell)
+
+    def refresh(self) -> None:
+        """Recomputes the cliques of all stale cells."""
+        for cell in sorted(self.stale):
+            self.cliques[cell] = self.compute_clique(cell)
+        self.stale = set()
+
+    def compute_clique(self, cell: int) -> dict[int, list[tuple[int, float, np.ndarray]]]:
+        """One Dijkstra per active boundary node, restricted to the active part of the cell."""
+        offsets, neighbors, half_edges, cost = self.snapshot.adjacency_lists()
+        view = self.view
+        blocked_nodes = view.inactive_nodes if view is not None else ()
+        blocked_edges = view.inactive_edges if view is not None else ()
+        cell_list = self.cell_list
+        boundary = [b for b in self.boundary.get(cell, ()) if b not in blocked_nodes]
+
+        clique = {}
+        for source in boundary:
+            targets = set(boundary)
+            targets.discard(source)
+            dist = {source: 0.0}
+            pred = {}
+            settled = set()
+            heap = [(0.0, source)]
+            while heap and targets:
+                d, u = heapq.heappop(heap)
+                if u in settled:
+                    continue
+                settled.add(u)
+                targets.discard(u)
+                for i in range(offsets[u], offsets[u + 1]):
+                    v = neighbors[i]
+                    if v in settled or v in blocked_nodes or cell_list[v] != cell:
+                        continue
+                    e = half_edges[i]
+                    if e in blocked_edges:
+                        continue
+                    nd = d + cost[e]
+                    if nd < dist.get(v, np.inf):
+                        dist[v] = nd
+                        pred[v] = (u, e)
+                        heapq.heappush(heap, (nd, v))
+
+            arcs = []
+            for target in boundary:
+                if target == source or target not in settled:
+                    continue
+                edges = []
+                current = target
+                while current != source:
+                    current, e = pred[current]
+                    edges.append(e)
+                arcs.append((target, dist[target], np.asarray(edges[::-1], dtype=np.int32)))
+            clique[source] = arcs
+        return clique
+
+    def number_of_arcs(self) -> int:
+        cut = sum(len(arcs) for arcs in self.cut_edges.values())
+        return cut + sum(len(arcs) for clique in self.cliques.values() for arcs in clique.values())
+
+    def shortest_path(self, source: int, target: int) -> tuple[list[int], list[int]] | None:
+        """
+        Same contract as `RoutingSnapshot.dijkstra_path` on the attached view. Queries
+        inside one country fall back to bidirectional Dijkstra on the snapshot.
+        """
+        snapshot = self.snapshot
+        view = self.view
+        blocked_nodes = view.inactive_nodes if view is not None else ()
+        blocked_edges = view.inactive_edges if view is not None else ()
+        if source in blocked_nodes or target in blocked_nodes:
+            return None
+        cell_list = self.cell_list
+        source_cell = cell_list[source]
+        target_cell = cell_list[target]
+        if source_cell == target_cell and source_cell != HUB_CELL:
+            return snapshot.bidirectional_dijkstra_path(source, target, view=view)
+        if self.stale:
+            self.refresh()
+
+        offsets, neighbors, half_edges, cost = snapshot.adjacency_lists()
+        searched = {source_cell, target_cell}
+        dist = {source: 0.0}
+        pred = {}
+        settled = set()
+        heap = [(0.0, source)]
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+            if u == target:
+                break
+            cell = cell_list[u]
+            if cell in searched:
+                # węzły komórek końcowych (i huby): pełne sąsiedztwo z grafu
+                for i in range(offsets[u], offsets[u + 1]):
+                    v = neighbors[i]
+                    if v in settled or v in blocked_nodes:
+                        continue
+                    e = half_edges[i]
+                    if e in blocked_edges:
+                        continue
+                    nd = d + cost[e]
+                    if nd < dist.get(v, np.inf):
+                        dist[v] = nd
+                        pred[v] = (u, e, None)
+                        heapq.heappush(heap, (nd, v))
+                continue
+
+            for v, e in self.cut_edges.get(u, ()):
+                if v in settled or v in blocked_nodes or e in blocked_edges:
+                    continue
+                nd = d + cost[e]
+                if nd < dist.get(v, np.inf):
+                    dist[v] = nd
+                    pred[v] = (u, e, None)
+                    heapq.heappush(heap, (nd, v))
+            for v, arc_cost, edges in self.cliques.get(cell, {}).get(u, ()):
+                if v in settled:
+                    continue
+                nd = d + arc_cost
+                if nd < dist.get(v, np.inf):
+                    dist[v] = nd
+                    pred[v] = (u, None, edges)
+                    heapq.heappush(heap, (nd, v))
+
+        if target not in settled:
+            return None
+
+        parts = []
+        current = target
+        while current != source:
+            current, e, edges = pred[current]
+            parts.append(edges if edges is not None else (e,))
+        edge_path = [int(e) for part in reversed(parts) for e in part]
+        return snapshot.edge_path_nodes(source, edge_path), edge_path
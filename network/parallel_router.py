@@ -0,0 +1,316 @@
+import atexit
+import heapq
+import math
+import multiprocessing.pool
+import os
+import sys
+from collections import defaultdict
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.dynamic_router import DynamicRouter
+from network.od_matrix import ODSearchGraph, od_arrays
+from network.router import profile_prices, route_cache_key, route_result
+from network.routing_snapshot import RoutingSnapshot
+
+DEFAULT_WORKERS = os.cpu_count() or 1
+
+# bufory pamięci współdzielonej podpięte w procesie roboczym (nazwa tablicy -> memoryview)
+_worker_arrays = {}
+_worker_blocks = []
+# spec, z którego pochodzą podpięte bufory
+_worker_spec = []
+# ostatnio zbudowany graf macierzy OD w procesie roboczym: (stan, ODSearchGraph)
+_worker_od_search = []
+
+
+class SharedRoutingArrays:
+    """
+    CSR arrays, edge columns and active masks of a `RoutingSnapshot` placed in
+    `multiprocessing.shared_memory`, so worker processes read them without copying.
+
+    Workers attach through `spec`, a picklable mapping: array name -> (block name,
+    memoryview format, length). The masks are stored as uint8 and refreshed from an
+    `ActiveView` with `update_masks` before every batch.
+    """
+    FORMATS = {np.dtype(np.int32): "i", np.dtype(np.float64): "d", np.dtype(np.uint8): "B", np.dtype(np.int8): "b"}
+
+    def __init__(self, snapshot: RoutingSnapshot):
+        self.snapshot = snapshot
+        self.cost_version = snapshot.cost_version
+        self.blocks = {}
+        self.arrays = {}
+        self.spec = {}
+        self.add("offsets", snapshot.offsets)
+        self.add("neighbors", snapshot.neighbors)
+        self.add("half_edges", snapshot.half_edges)
+        self.add("cost", snapshot.cost)
+        self.add("length", snapshot.length)
+        self.add("lead_time", snapshot.lead_time)
+        self.add("mode", snapshot.mode)
+        self.add("node_mask", np.ones(snapshot.number_of_nodes, dtype=np.uint8))
+        self.add("edge_mask", np.ones(snapshot.number_of_edges, dtype=np.uint8))
+
+    def add(self, name: str, array: np.ndarray) -> None:
+        block = SharedMemory(create=True, size=max(array.nbytes, 8))
+        shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+        shared[:] = array
+        self.blocks[name] = block
+        self.arrays[name] = shared
+        self.spec[name] = (block.name, self.FORMATS[array.dtype], len(array))
+
+    def refresh_costs(self) -> None:
+        """Copies a replaced cost column of the snapshot into its block (the spec stays the same)."""
+        np.copyto(self.arrays["cost"], self.snapshot.cost)
+        self.cost_version = self.snapshot.cost_version
+
+    def update_masks(self, view=None) -> None:
+        if view is None:
+            self.arrays["node_mask"][:] = 1
+            self.arrays["edge_mask"][:] = 1
+        else:
+            self.set_masks(view.node_mask, view.edge_mask)
+
+    def set_masks(self, node_mask: np.ndarray, edge_mask: np.ndarray) -> None:
+        np.copyto(self.arrays["node_mask"], node_mask)
+        np.copyto(self.arrays["edge_mask"], edge_mask)
+
+    def close(self) -> None:
+        self.arrays = {}
+        for block in self.blocks.values():
+            block.close()
+            block.unlink()
+        self.blocks = {}
+
+
+def _attach(spec: dict) -> None:
+    """
+    Maps the shared blocks of `spec` into the worker as memoryviews. Every task carries
+    the spec of the snapshot it was issued for, so a pool outlives snapshot rebuilds and
+    workers re-attach only when the spec changes.
+    """
+    if _worker_spec and _worker_spec[0] == spec:
+        return
+    _worker_arrays.clear()
+    _worker_od_search.clear()
+    for block in _worker_blocks:
+        block.close()
+    _worker_blocks.clear()
+    for name, (block_name, fmt, length) in spec.items():
+        block = SharedMemory(name=block_name)
+        _worker_blocks.append(block)
+        _worker_arrays[name] = block.buf.cast(fmt)[:length]
+    _worker_spec[:] = [spec]
+
+
+def create_pool(workers: int) -> multiprocessing.pool.Pool:
+    """
+    Forks the routing worker pool. Call it before the process starts any threads (forking
+    a threaded process can deadlock the children on locks held by other threads); the
+    pool does not depend on the graph and can be handed to `ParallelRouter` later.
+
+    spawn/forkserver re-import the main script in every worker, and app.py builds the
+    simulation at import time, so they are used only where fork is unavailable.
+    """
+    start_method = "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+    # bloki pamięci współdzielonej powstają po forku; bez wspólnego resource_trackera każdy
+    # proces roboczy uruchomiłby własny i usunął bloki przy swoim zamknięciu
+    resource_tracker.ensure_running()
+    return multiprocessing.get_context(start_method).Pool(workers)
+
+
+def _route_from_source(task: tuple[dict, int, tuple[int, ...], tuple | None]) -> list[tuple[list[int], list[int]] | None]:
+    """
+    Worker: Dijkstra from one source until all its targets are settled, on the edge `cost`
+    or, with a courier price profile, on `prices[mode] * length` in km (as
+    `RoutingSnapshot.profile_cost`).
+    """
+    spec, source, targets, prices = task
+    _attach(spec)
+    offsets = _worker_arrays["offsets"]
+    neighbors = _worker_arrays["neighbors"]
+    half_edges = _worker_arrays["half_edges"]
+    cost = _worker_arrays["cost"]
+    length = _worker_arrays["length"]
+    mode = _worker_arrays["mode"]
+    node_mask = _worker_arrays["node_mask"]
+    edge_mask = _worker_arrays["edge_mask"]
+
+    dist = {}
+    tentative = {source: 0.0}
+    pred = {}
+    remaining = {t for t in targets if node_mask[t]}
+    heap = [(0.0, source)] if node_mask[source] else []
+    while heap and remaining:
+        d, u = heapq.heappop(heap)
+        if u in dist:
+            continue
+        dist[u] = d
+        remaining.discard(u)
+        for i in range(offsets[u], offsets[u + 1]):
+            v = neighbors[i]
+            e = half_edges[i]
+            if v in dist or not node_mask[v] or not edge_mask[e]:
+                continue
+            nd = d + (cost[e] if prices is None else prices[mode[e]] * (length[e] / 1000.0))
+            if nd < tentative.get(v, math.inf):
+                tentative[v] = nd
+                pred[v] = (u, e)
+                heapq.heappush(heap, (nd, v))
+
+    paths = []
+    for target in targets:
+        if target not in dist:
+            paths.append(None)
+            continue
+        nodes = [target]
+        edges = []
+        current = target
+        while current != source:
+            current, e = pred[current]
+            nodes.append(current)
+            edges.append(e)
+        paths.append((nodes[::-1], edges[::-1]))
+    return paths
+
+
+def _od_rows(task: tuple) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Worker: OD matrix rows of a chunk of sources (see `ODSearchGraph.rows`)."""
+    spec, state, prices, driving_hours, sources, targets = task
+    _attach(spec)
+    if not _worker_od_search or _worker_od_search[0] != (state, prices, driving_hours):
+        arrays = {name: np.asarray(buffer) for name, buffer in _worker_arrays.items()}
+        search = ODSearchGraph(arrays, arrays["node_mask"].view(bool), arrays["edge_mask"].view(bool),
+                               prices, driving_hours)
+        _worker_od_search[:] = [(state, prices, driving_hours), search]
+    return _worker_od_search[1].rows(sources, targets)
+
+
+class ParallelRouter:
+    """
+    Routing executor fanning batched route queries out over a process pool.
+
+    The snapshot's CSR arrays and the active masks live in shared memory (see
+    `SharedRoutingArrays`); every worker grows the trees of a share of the distinct
+    sources. Results keep the order of the queried pairs and go through the graph's
+    `route_cache` like `network.router.find_routes`. Courier price profiles are applied by
+    the workers from the shared length and mode columns, one task per source and profile.
+    Batches with fewer such tasks than `min_batch`, or `workers <= 1`, go to a wrapped
+    `DynamicRouter`, so small reroutes after disruptions still repair kept trees.
+
+    The pool is forked in the constructor (or passed in, see `create_pool`) and is kept
+    across snapshot rebuilds; only the shared arrays are replaced.
+
+    Attributes
+    ----------
+    graph : SimulationGraph
+        Network the routes are computed on.
+    workers : int
+        Number of worker processes.
+    min_batch : int
+        Smallest number of distinct sources worth sending to the pool.
+    dynamic : DynamicRouter
+        Serial router for small batches.
+    """
+    def __init__(self, graph, workers: int = DEFAULT_WORKERS, min_batch: int = 32,
+                 pool: Optional[multiprocessing.pool.Pool] = None):
+        self.graph = graph
+        self.workers = workers
+        self.min_batch = min_batch
+        self.dynamic = DynamicRouter(graph)
+        self.shared = None
+        self.pool = pool if pool is not None or workers <= 1 else create_pool(workers)
+        self.mask_state = 0
+        atexit.register(self.close)
+
+    def share(self, snapshot: RoutingSnapshot) -> None:
+        if self.shared is not None and self.shared.snapshot is snapshot:
+            if self.shared.cost_version != snapshot.cost_version:
+                self.shared.refresh_costs()
+            return
+        if self.shared is not None:
+            self.shared.close()
+        self.shared = SharedRoutingArrays(snapshot)
+
+    def find_routes(self, pairs: list[tuple[int | str, int | str]],
+                    params: Optional[Dict[str, Any]] = None) -> list[Dict[str, Any]]:
+        """Same contract as `network.router.find_routes`."""
+        return self.find_profile_routes(pairs, [params] * len(pairs))
+
+    def find_profile_routes(self, pairs: list[tuple[int | str, int | str]],
+                            params: list[Optional[Dict[str, Any]]]) -> list[Dict[str, Any]]:
+        """
+        Same contract as `network.profile_router.find_profile_routes`: every pair has its
+        own parameters, and each worker task grows the tree of one source under one price
+        profile.
+        """
+        graph = self.graph
+        prices = [profile_prices(pair_params) for pair_params in params]
+        if self.workers <= 1 or len(set(zip((source_node for source_node, _ in pairs), prices))) < self.min_batch:
+            return self.dynamic.find_profile_routes(pairs, params)
+        view = graph.get_active_view()
+        snapshot = view.snapshot
+
+        keys = [route_cache_key(graph, source_node, target_node, pair_params)
+                for (source_node, target_node), pair_params in zip(pairs, params)]
+        cached = [graph.route_cache.get(key) if key is not None else None for key in keys]
+
+        targets_by_task = defaultdict(set)
+        for (source_node, target_node), profile, route in zip(pairs, prices, cached):
+            if route is not None:
+                continue
+            source = snapshot.index_of(source_node)
+            target = snapshot.index_of(target_node)
+            if source is not None and target is not None:
+                targets_by_task[(source, profile)].add(target)
+
+        self.share(snapshot)
+        self.shared.update_masks(view)
+        spec = self.shared.spec
+        tasks = [(spec, source, tuple(targets), profile) for (source, profile), targets in targets_by_task.items()]
+        chunksize = max(1, len(tasks) // (self.workers * 4))
+        found = {}
+        for (_, source, targets, profile), paths in zip(tasks, self.pool.map(_route_from_source, tasks,
+                                                                             chunksize=chunksize)):
+            for target, path in zip(targets, paths):
+                found[(source, target, profile)] = path
+
+        results = []
+        for (source_node, target_node), pair_params, profile, key, route in zip(pairs, params, prices, keys, cached):
+            if route is None:
+                path = found.get((snapshot.index_of(source_node), snapshot.index_of(target_node), profile))
+                route = route_result(snapshot, path[0], path[1], pair_params) if path is not None else {}
+                if key is not None:
+                    graph.route_cache.put(key, route)
+            results.append(route)
+        return results
+
+    def od_rows(self, snapshot: RoutingSnapshot, node_mask: np.ndarray, edge_mask: np.ndarray,
+                prices: tuple[float, float, float] | None, driving_hours: float,
+                chunks: list[np.ndarray], targets: np.ndarray) -> list[tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Multi-source searches of `network.od_matrix.compute_od_matrix`, one chunk of
+        sources per task. Every worker builds the masked CSR matrix once per mask state
+        and reuses it for all its chunks.
+        """
+        if self.workers <= 1:
+            search = ODSearchGraph(od_arrays(snapshot), node_mask, edge_mask, prices, driving_hours)
+            return [search.rows(chunk, targets) for chunk in chunks]
+        self.share(snapshot)
+        self.shared.set_masks(node_mask, edge_mask)
+        self.mask_state += 1
+        tasks = [(self.shared.spec, self.mask_state, prices, driving_hours, chunk, targets) for chunk in chunks]
+        return self.pool.map(_od_rows, tasks, chunksize=max(1, len(tasks) // (self.workers * 2)))
+
+    def close(self) -> None:
+        if self.pool is not None:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
@@ -0,0 +1,166 @@
+import heapq
+import os
+import sys
+from typing import Any, Dict, Optional
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.active_view import ActiveView
+from network.router import get_routing_state, profile_prices, route_result
+from network.routing_snapshot import RoutingSnapshot
+from network.transport_types import TransportMode
+
+DEFAULT_MAX_LABELS = 8
+
+
+class LabelPool:
+    """
+    Growable NumPy storage of the labels created by a bi-criteria search. A label is a
+    partial route: its node, cost, lead time and the label/edge it was extended from.
+    """
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.node = np.empty(capacity, dtype=np.int32)
+        self.cost = np.empty(capacity, dtype=np.float64)
+        self.time = np.empty(capacity, dtype=np.float64)
+        self.parent = np.empty(capacity, dtype=np.int64)
+        self.edge = np.empty(capacity, dtype=np.int32)
+
+    def add(self, node: int, cost: float, time: float, parent: int, edge: int) -> int:
+        if self.size == len(self.node):
+            for name in ("node", "cost", "time", "parent", "edge"):
+                array = getattr(self, name)
+                setattr(self, name, np.concatenate([array, np.empty_like(array)]))
+        label = self.size
+        self.node[label] = node
+        self.cost[label] = cost
+        self.time[label] = time
+        self.parent[label] = parent
+        self.edge[label] = edge
+        self.size += 1
+        return label
+
+    def edges_of(self, label: int) -> np.ndarray:
+        edges = []
+        while self.parent[label] >= 0:
+            edges.append(self.edge[label])
+            label = self.parent[label]
+        return np.asarray(edges[::-1], dtype=np.int32)
+
+
+def edge_lead_times(snapshot: RoutingSnapshot, params: Optional[Dict[str, Any]] = None) -> np.ndarray:
+    """Lead time of every collapsed edge in days, land edges rescaled as in `route_metrics`."""
+    if params is None:
+        params = {}
+    driving_hours = float(params.get("driving_hours_per_day", 24.0))
+    if driving_hours <= 0:
+        return snapshot.lead_time
+    return np.where(snapshot.mode == TransportMode.LAND, snapshot.lead_time * (24.0 / driving_hours),
+                    snapshot.lead_time)
+
+
+def pareto_frontier(snapshot: RoutingSnapshot, source: int, target: int, view: ActiveView = None,
+                    params: Optional[Dict[str, Any]] = None,
+                    max_labels: int = DEFAULT_MAX_LABELS) -> list[tuple[float, float, np.ndarray]]:
+    """
+    Cost / lead-time Pareto frontier between two dense node indices.
+
+    Bi-criteria label-setting search: labels are popped in lexicographic (cost, time)
+    order, so a label is non-dominated exactly when its time beats the fastest permanent
+    label of its node, which makes dominance pruning O(1). Labels not faster than the
+    best route already found to the target are pruned as well, and the search stops once
+    the cost exceeds that of the fastest route (computed first with a lead-time Dijkstra),
+    since no frontier route can be more expensive. At most `max_labels` permanent labels
+    are kept per node; with a small cap the frontier may miss some trade-offs. Its
+    cheapest end stays exact (the cheapest label of every node is popped first), and the
+    fastest route of that first search is added if the capped search lost it, so the
+    fastest end is exact as well.
+
+    Returns
+    -------
+    list[tuple[float, float, np.ndarray]]
+        `(cost, lead time in days, edge indices)` of every frontier route, by increasing
+        cost and decreasing lead time; empty if the target is unreachable.
+    """
+    prices = profile_prices(params)
+    cost = snapshot.adjacency_lists()[3] if prices is None else snapshot.profile_list(prices)
+    time = edge_lead_times(snapshot, params).tolist()
+    offsets, neighbors, half_edges, _ = snapshot.adjacency_lists()
+    blocked_nodes = view.inactive_nodes if view is not None else ()
+    blocked_edges = view.inactive_edges if view is not None else ()
+
+    fastest = snapshot.dijkstra_path(source, target, view=view, weights=time)
+    if fastest is None:
+        return []
+    fastest_cost = sum(cost[e] for e in fastest[1])
+    fastest_time = sum(time[e] for e in fastest[1])
+    cost_bound = fastest_cost + 1e-9 * max(1.0, abs(fastest_cost))
+
+    pool = LabelPool()
+    best_time = {}
+    permanent = {}
+    frontier = []
+    heap = [(0.0, 0.0, pool.add(source, 0.0, 0.0, -1, -1), source)]
+    while heap:
+        c, t, label, u = heapq.heappop(heap)
+        if c > cost_bound:
+            break
+        if t >= best_time.get(u, np.inf) or t >= best_time.get(target, np.inf):
+            continue
+        if permanent.get(u, 0) >= max_labels:
+            continue
+        best_time[u] = t
+        permanent[u] = permanent.get(u, 0) + 1
+        if u == target:
+            frontier.append((c, t, pool.edges_of(label)))
+            continue
+
+        target_time = best_time.get(target, np.inf)
+        for i in range(offsets[u], offsets[u + 1]):
+            v = neighbors[i]
+            e = half_edges[i]
+            if v in blocked_nodes or e in blocked_edges:
+                continue
+            nc = c + cost[e]
+            nt = t + time[e]
+            if nc > cost_bound or nt >= target_time or nt >= best_time.get(v, np.inf):
+                continue
+            heapq.heappush(heap, (nc, nt, pool.add(v, nc, nt, label, e), v))
+
+    # limit etykiet mógł odciąć najszybszą trasę: dodawana na końcu, wypiera zdominowane przez nią
+    if not frontier or frontier[-1][1] > fastest_time:
+        frontier = [route for route in frontier if route[0] < fastest_cost]
+        frontier.append((fastest_cost, fastest_time, np.asarray(fastest[1], dtype=np.int32)))
+    return frontier
+
+
+def pareto_routes(graph: nx.Graph, source_node: int | str, target_node: int | str,
+                  params: Optional[Dict[str, Any]] = None,
+                  max_labels: int = DEFAULT_MAX_LABELS) -> list[Dict[str, Any]]:
+    """
+    Cost / lead-time Pareto frontier between two nodes of the active graph, as route
+    descriptions (see `network.router.route_result`) by increasing `estimated_cost`.
+    Empty if either node is missing or the target is unreachable.
+    """
+    snapshot, view = get_routing_state(graph)
+    source = snapshot.index_of(source_node)
+    target = snapshot.index_of(target_node)
+    if source is None or target is None:
+        return []
+    return [route_result(snapshot, snapshot.edge_path_nodes(source, edges), edges.tolist(), params)
+            for _, _, edges in pareto_frontier(snapshot, source, target, view, params, max_labels)]
+
+
+def choose_by_time_budget(routes: list[Dict[str, Any]], time_budget_days: float) -> Dict[str, Any]:
+    """
+    Cheapest route whose lead time fits `time_budget_days`; the fastest one if none does,
+    {} for an empty frontier.
+    """
+    if not routes:
+        return {}
+    within = [route for route in routes if route["estimated_lead_time_days"] <= time_budget_days]
+    if within:
+        return min(within, key=lambda route: route["estimated_cost"])
+    return min(routes, key=lambda route: route["estimated_lead_time_days"])
@@ -0,0 +1,189 @@
+import heapq
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.active_view import ActiveView
+from network.router import get_routing_state, profile_prices, route_cache_key, route_result, shortest_path_tree
+from network.routing_snapshot import RoutingSnapshot
+
+
+class MultiProfileSearch:
+    """
+    Cheapest-path trees of several cost profiles from one source, sharing one search.
+
+    `weights` has one column per profile (shape: edges x profiles). `grow` runs a single
+    Dijkstra with the first profile, then evaluates that tree under every profile at
+    once: the (reached nodes x profiles) label matrix follows the tree, and every edge
+    leaving a reached node is checked for all profiles in one NumPy pass. An edge that
+    would still shorten a label ("tense" edge) is the only thing that can make a
+    profile's tree differ; for each profile with tense edges a label-correcting search
+    starts from their tails and repairs just the part of the tree that changes. Couriers
+    whose prices keep the same routes (e.g. on a single transport mode) therefore cost
+    one traversal instead of one each, and the result is exact for every profile.
+
+    Attributes
+    ----------
+    source : int | None
+        Root of the last search.
+    dist : list[dict[int, float]]
+        Per profile, cost of every node whose tree path is known.
+    pred : list[dict[int, tuple[int, int]]]
+        Per profile, mapping: node -> (parent node, collapsed edge index).
+    """
+    def __init__(self, snapshot: RoutingSnapshot, weights: np.ndarray):
+        self.snapshot = snapshot
+        self.weights = weights
+        self.weight_lists = [weights[:, profile].tolist() for profile in range(weights.shape[1])]
+        self.source = None
+        self.dist = []
+        self.pred = []
+
+    @property
+    def number_of_profiles(self) -> int:
+        return self.weights.shape[1]
+
+    def grow(self, source: int, view: ActiveView = None, targets: set[int] = None) -> None:
+        """All profile trees from `source`; with `targets` only until their costs are final."""
+        snapshot = self.snapshot
+        self.source = source
+        base = shortest_path_tree(snapshot, source, view, targets, weights=self.weight_lists[0])
+        self.dist = [base.dist]
+        self.pred = [base.pred]
+        if not base.dist:
+            self.dist = [{} for _ in range(self.number_of_profiles)]
+            self.pred = [{} for _ in range(self.number_of_profiles)]
+            return
+        if self.number_of_profiles == 1:
+            return
+
+        # etykiety drzewa bazowego we wszystkich profilach (kolejność ustalania: rodzic przed dzieckiem)
+        reached = np.fromiter(base.dist.keys(), dtype=np.int64, count=len(base.dist))
+        position = {node: row for row, node in enumerate(reached.tolist())}
+        rows = [[0.0] * self.number_of_profiles]
+        for node in reached[1:].tolist():
+            parent, e = base.pred[node]
+            rows.append([a + b for a, b in zip(rows[position[parent]], self.weights[e].tolist())])
+        labels = np.vstack([np.array(rows), np.full(self.number_of_profiles, np.inf)])
+
+        # wszystkie krawędzie wychodzące z osiągniętych węzłów naraz
+        starts = snapshot.offsets[reached]
+        counts = snapshot.offsets[reached + 1] - starts
+        tails = np.repeat(np.arange(len(reached)), counts)
+        flat = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(int(counts.sum()))
+        heads = snapshot.neighbors[flat]
+        edges = snapshot.half_edges[flat]
+        head_rows = np.full(len(heads), len(reached))
+        known = np.isin(heads, reached)
+        head_rows[known] = [position[v] for v in heads[known].tolist()]
+        tense = labels[tails] + self.weights[edges] < labels[head_rows]
+        if view is not None:
+            tense &= (view.node_mask[heads] & view.edge_mask[edges])[:, None]
+
+        for profile in range(1, self.number_of_profiles):
+            dist = dict(zip(base.dist.keys(), labels[:-1, profile].tolist()))
+            pred = dict(base.pred)
+            tails_to_repair = np.unique(tails[tense[:, profile]])
+            if len(tails_to_repair):
+                heap = [(dist[node], node) for node in reached[tails_to_repair].tolist()]
+                heapq.heapify(heap)
+                self._repair(heap, dist, pred, self.weight_lists[profile], view, targets)
+            self.dist.append(dist)
+            self.pred.append(pred)
+
+    def _repair(self, heap: list, dist: dict, pred: dict, cost: list[float], view: ActiveView = None,
+                targets: set[int] = None) -> None:
+        """Label-correcting search from upper-bound labels until no queued key can improve them."""
+        offsets, neighbors, half_edges, _ = self.snapshot.adjacency_lists()
+        blocked_nodes = view.inactive_nodes if view is not None else ()
+        blocked_edges = view.inactive_edges if view is not None else ()
+        targets = [t for t in targets if t not in blocked_nodes] if targets is not None else None
+
+        while heap:
+            d, u = heapq.heappop(heap)
+            if d > dist[u]:
+                continue
+            if targets and all(t in dist for t in targets) and d >= max(dist[t] for t in targets):
+                break
+            for i in range(offsets[u], offsets[u + 1]):
+                v = neighbors[i]
+                if v in blocked_nodes:
+                    continue
+                e = half_edges[i]
+                if e in blocked_edges:
+                    continue
+                nd = d + cost[e]
+                if nd < dist.get(v, np.inf):
+                    dist[v] = nd
+                    pred[v] = (u, e)
+                    heapq.heappush(heap, (nd, v))
+
+    def path_to(self, target: int, profile: int) -> tuple[list[int], list[int]] | None:
+        if target not in self.dist[profile]:
+            return None
+        pred = self.pred[profile]
+        nodes = [target]
+        edges = []
+        current = target
+        while current != self.source:
+            current, e = pred[current]
+            nodes.append(current)
+            edges.append(e)
+        return nodes[::-1], edges[::-1]
+
+
+def find_profile_routes(graph: nx.Graph, pairs: list[tuple[int | str, int | str]],
+                        params: list[Optional[Dict[str, Any]]]) -> list[Dict[str, Any]]:
+    """
+    Batched cheapest routes where every pair has its own parameters, e.g. the courier
+    company prices of its exporter (see `network.router.profile_prices`).
+
+    Every distinct price profile becomes one column of a weight matrix and a single
+    `MultiProfileSearch` per distinct source serves all profiles requested from it, so
+    six couriers do not cost six searches. Same contract as `network.router.find_routes`:
+    results keep the order of `pairs`, unreachable pairs get an empty dict, and the
+    graph's `route_cache` is consulted and filled.
+    """
+    snapshot, view = get_routing_state(graph)
+
+    keys = [route_cache_key(graph, source_node, target_node, pair_params)
+            for (source_node, target_node), pair_params in zip(pairs, params)]
+    cached = [graph.route_cache.get(key) if key is not None else None for key in keys]
+
+    columns = {}
+    targets_by_source = defaultdict(set)
+    for (source_node, target_node), pair_params, route in zip(pairs, params, cached):
+        if route is not None:
+            continue
+        columns.setdefault(profile_prices(pair_params), len(columns))
+        source = snapshot.index_of(source_node)
+        target = snapshot.index_of(target_node)
+        if source is not None and target is not None:
+            targets_by_source[source].add(target)
+
+    found = {}
+    if targets_by_source:
+        weights = np.column_stack([snapshot.cost if prices is None else snapshot.profile_cost(prices)
+                                   for prices in columns])
+        search = MultiProfileSearch(snapshot, weights)
+        for source, targets in targets_by_source.items():
+            search.grow(source, view, targets)
+            for target in targets:
+                for profile in range(len(columns)):
+                    found[(source, target, profile)] = search.path_to(target, profile)
+
+    results = []
+    for (source_node, target_node), pair_params, key, route in zip(pairs, params, keys, cached):
+        if route is None:
+            path = found.get((snapshot.index_of(source_node), snapshot.index_of(target_node),
+                              columns.get(profile_prices(pair_params))))
+            route = route_result(snapshot, path[0], path[1], pair_params) if path is not None else {}
+            if key is not None:
+                graph.route_cache.put(key, route)
+        results.append(route)
+    return results
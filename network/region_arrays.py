@@ -0,0 +1,129 @@
+import os
+import sys
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# atrybuty liczbowe trzymane w kolumnach; NaN oznacza brak atrybutu na krawędzi
+EDGE_COLUMNS = ("length", "cost", "capacity", "max_capacity", "flow", "speed_kmh", "travel_hours")
+NO_MODE = -1
+
+
+def is_integer(value) -> bool:
+    return isinstance(value, (int, np.integer)) and not isinstance(value, bool)
+
+
+def edge_data(data: dict, e: int, columns: list[list[float]], modes: list[int], integers: list[int]) -> dict:
+    """
+    Adds the present column values of edge `e` (columns in `EDGE_COLUMNS` order) to `data`
+    in-place, as int where bit i of `integers[e]` marks column i as originally integer.
+    """
+    for i, (name, column) in enumerate(zip(EDGE_COLUMNS, columns)):
+        if column[e] == column[e]:
+            data[name] = int(column[e]) if integers[e] >> i & 1 else column[e]
+    if modes[e] != NO_MODE:
+        data["transport_mode"] = modes[e]
+    return data
+
+
+class RegionArrays:
+    """
+    Compact columnar copy of one loaded region graph, cheap to send between processes.
+
+    Coordinates, edge endpoints and the numeric routing attributes are NumPy columns;
+    only the remaining, mostly sparse attributes (OSM tags, geometry, node type and
+    country) stay in per-element dicts. `GraphBuilder` stitches regions into one graph.
+
+    Attributes
+    ----------
+    node_ids : list
+        Original node IDs.
+    x, y : np.ndarray[float64]
+        Node coordinates (NaN where missing).
+    node_attributes : list[dict]
+        Other attributes of every node.
+    edge_u, edge_v : np.ndarray[int32]
+        Positions of the edge endpoints in `node_ids`.
+    edge_keys : np.ndarray[int64]
+        MultiGraph keys of the edges.
+    edge_columns : dict[str, np.ndarray]
+        Mapping: attribute from `EDGE_COLUMNS` -> float64 column (NaN where missing).
+    transport_mode : np.ndarray[int8]
+        Normalized `transport_mode` of every edge, `NO_MODE` where missing.
+    integer_columns : np.ndarray[uint8]
+        Per edge, bit i set if its value of `EDGE_COLUMNS[i]` was an int (e.g. `capacity`),
+        so it is restored as int rather than float.
+    edge_attributes : list[dict]
+        Other attributes of every edge.
+    graph_attributes : dict
+        Graph-level attributes, including `default_capacity` and `default_price`.
+    """
+    def __init__(self, node_ids: list, x: np.ndarray, y: np.ndarray, node_attributes: list[dict],
+                 edge_u: np.ndarray, edge_v: np.ndarray, edge_keys: np.ndarray, edge_columns: dict[str, np.ndarray],
+                 transport_mode: np.ndarray, integer_columns: np.ndarray, edge_attributes: list[dict],
+                 graph_attributes: dict):
+        self.node_ids = node_ids
+        self.x = x
+        self.y = y
+        self.node_attributes = node_attributes
+        self.edge_u = edge_u
+        self.edge_v = edge_v
+        self.edge_keys = edge_keys
+        self.edge_columns = edge_columns
+        self.transport_mode = transport_mode
+        self.integer_columns = integer_columns
+        self.edge_attributes = edge_attributes
+        self.graph_attributes = graph_attributes
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self.edge_u)
+
+    @classmethod
+    def from_graph(cls, graph: nx.MultiGraph) -> "RegionArrays":
+        node_ids = list(graph.nodes())
+        position = {node: i for i, node in enumerate(node_ids)}
+        x = np.full(len(node_ids), np.nan)
+        y = np.full(len(node_ids), np.nan)
+        node_attributes = []
+        for i, (_, data) in enumerate(graph.nodes(data=True)):
+            data = dict(data)
+            x[i] = data.pop("x", np.nan)
+            y[i] = data.pop("y", np.nan)
+            node_attributes.append(data)
+
+        m = graph.number_of_edges()
+        edge_u = np.empty(m, dtype=np.int32)
+        edge_v = np.empty(m, dtype=np.int32)
+        edge_keys = np.empty(m, dtype=np.int64)
+        edge_columns = {name: np.full(m, np.nan) for name in EDGE_COLUMNS}
+        transport_mode = np.full(m, NO_MODE, dtype=np.int8)
+        integer_columns = np.zeros(m, dtype=np.uint8)
+        edge_attributes = []
+        for e, (u, v, key, data) in enumerate(graph.edges(keys=True, data=True)):
+            edge_u[e] = position[u]
+            edge_v[e] = position[v]
+            edge_keys[e] = key
+            data = dict(data)
+            for i, name in enumerate(EDGE_COLUMNS):
+                value = data.get(name)
+                if isinstance(value, (int, float, np.number)) and not isinstance(value, bool):
+                    edge_columns[name][e] = data.pop(name)
+                    if is_integer(value):
+                        integer_columns[e] |= 1 << i
+            if "transport_mode" in data:
+                transport_mode[e] = data.pop("transport_mode")
+            edge_attributes.append(data)
+
+        graph_attributes = dict(graph.graph)
+        for name in ("default_capacity", "default_price"):
+            if hasattr(graph, name):
+                graph_attributes[name] = getattr(graph, name)
+        return cls(node_ids, x, y, node_attributes, edge_u, edge_v, edge_keys, edge_columns, transport_mode,
+                   integer_columns, edge_attributes, graph_attributes)
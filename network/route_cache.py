@@ -0,0 +1,93 @@
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+
+class RouteCache:
+    """
+    Bounded LRU cache of computed routes.
+
+    Entries are keyed by `(source, target, cost profile, fingerprint)` where the fingerprint
+    identifies the set of inactive nodes/edges (see `ActiveView.fingerprint`). A network that
+    returns to an earlier disruption state therefore hits the routes computed back then.
+
+    Memory is bounded both by the number of entries and by the total number of stored path
+    nodes; the least recently used entries are evicted first.
+
+    Attributes
+    ----------
+    max_entries : int
+        Maximum number of cached routes.
+    max_path_nodes : int
+        Maximum total length of all cached paths.
+    hits, misses, evictions : int
+        Counters since creation (or the last `clear`).
+    """
+    def __init__(self, max_entries: int = 10_000, max_path_nodes: int = 5_000_000):
+        self.max_entries = max_entries
+        self.max_path_nodes = max_path_nodes
+        self.entries = OrderedDict()
+        self.path_nodes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    @staticmethod
+    def make_key(source: Hashable, target: Hashable, profile: Hashable, fingerprint: int) -> tuple:
+        return source, target, profile, fingerprint
+
+    def get(self, key: tuple) -> Dict[str, Any] | None:
+        route = self.entries.get(key)
+        if route is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return self.copy_route(route)
+
+    def put(self, key: tuple, route: Dict[str, Any]) -> None:
+        if key in self.entries:
+            self.path_nodes -= len(self.entries.pop(key).get("path", ()))
+        route = self.copy_route(route)
+        self.entries[key] = route
+        self.path_nodes += len(route.get("path", ()))
+
+        while self.entries and (len(self.entries) > self.max_entries or self.path_nodes > self.max_path_nodes):
+            _, evicted = self.entries.popitem(last=False)
+            self.path_nodes -= len(evicted.get("path", ()))
+            self.evictions += 1
+
+    def refresh_min_capacity(self, capacity) -> None:
+        """Recomputes `min_capacity` of the cached routes from a new capacity column of the snapshot."""
+        for route in self.entries.values():
+            edges = route.get("edges")
+            if edges is not None:
+                route["min_capacity"] = float(capacity[edges].min()) if len(edges) else float("inf")
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self.path_nodes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.entries),
+            "path_nodes": self.path_nodes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    @staticmethod
+    def copy_route(route: Dict[str, Any]) -> Dict[str, Any]:
+        """Shallow copy with its own path list, so callers cannot modify cached paths."""
+        route = dict(route)
+        if "path" in route:
+            route["path"] = list(route["path"])
+        return route
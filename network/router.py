@@ -0,0 +1,355 @@
+import heapq
+import os
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Optional
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.active_view import ActiveView
+from network.routing_snapshot import RoutingSnapshot
+from network.transport_types import SearchStrategy, TransportMode
+
+
+class ShortestPathTree:
+    """
+    Cheapest-path tree grown from a single source on a `RoutingSnapshot`.
+
+    Attributes
+    ----------
+    source : int
+        Dense index of the root.
+    dist : dict[int, float]
+        Settled cost of every node reached by the search.
+    pred : dict[int, tuple[int, int]]
+        Mapping: node -> (parent node, collapsed edge index).
+    """
+    def __init__(self, source: int, dist: dict, pred: dict):
+        self.source = source
+        self.dist = dist
+        self.pred = pred
+
+    def reaches(self, target: int) -> bool:
+        return target in self.dist
+
+    def path_to(self, target: int) -> tuple[list[int], list[int]] | None:
+        if target not in self.dist:
+            return None
+        nodes = [target]
+        edges = []
+        current = target
+        while current != self.source:
+            current, e = self.pred[current]
+            nodes.append(current)
+            edges.append(e)
+        return nodes[::-1], edges[::-1]
+
+
+def shortest_path_tree(snapshot: RoutingSnapshot, source: int, view: ActiveView = None,
+                       targets: set[int] = None, blocked_edges: set[int] = None,
+                       weights: list[float] = None) -> ShortestPathTree:
+    """
+    Dijkstra from `source` over the snapshot, skipping nodes/edges masked by `view` and
+    any edges in `blocked_edges` (e.g. saturated ones). If `targets` is given the search
+    stops as soon as all of them are settled. `weights` replaces the cost column, e.g.
+    with a courier's `RoutingSnapshot.profile_list`.
+    """
+    offsets, neighbors, half_edges, cost = snapshot.adjacency_lists()
+    if weights is not None:
+        cost = weights
+    blocked_nodes = view.inactive_nodes if view is not None else ()
+    if blocked_edges is None:
+        blocked_edges = view.inactive_edges if view is not None else ()
+    elif view is not None:
+        blocked_edges = blocked_edges | view.inactive_edges
+
+    dist = {}
+    tentative = {source: 0.0}
+    pred = {}
+    remaining = {t for t in targets if t not in blocked_nodes} if targets is not None else None
+    heap = [(0.0, source)]
+    if source in blocked_nodes:
+        heap = []
+
+    while heap:
+        d, u = heapq.heappop(heap)
+        if u in dist:
+            continue
+        dist[u] = d
+        if remaining is not None:
+            remaining.discard(u)
+            if not remaining:
+                break
+        for i in range(offsets[u], offsets[u + 1]):
+            v = neighbors[i]
+            if v in dist or v in blocked_nodes:
+                continue
+            e = half_edges[i]
+            if e in blocked_edges:
+                continue
+            nd = d + cost[e]
+            if nd < tentative.get(v, float("inf")):
+                tentative[v] = nd
+                pred[v] = (u, e)
+                heapq.heappush(heap, (nd, v))
+
+    return ShortestPathTree(source, dist, pred)
+
+
+def route_metrics(snapshot: RoutingSnapshot, edges: np.ndarray,
+                  params: Optional[Dict[str, Any]] = None) -> Dict[str, float]:
+    """
+    Totals along a path given as collapsed edge indices, computed with NumPy gathers:
+    money cost (under the courier prices of `params`, if any), distance in km, lead time
+    in days (land edges rescaled to the allowed driving hours per day) and bottleneck
+    capacity (inf for an empty path).
+    """
+    if params is None:
+        params = {}
+    driving_hours = float(params.get("driving_hours_per_day", 24.0))
+    prices = profile_prices(params)
+    cost = snapshot.cost if prices is None else snapshot.profile_cost(prices)
+
+    lead_time = snapshot.lead_time[edges]
+    if driving_hours > 0:
+        lead_time = np.where(snapshot.mode[edges] == TransportMode.LAND, lead_time * (24.0 / driving_hours), lead_time)
+
+    return {
+        "cost": float(cost[edges].sum()),
+        "distance_km": float(snapshot.length[edges].sum() / 1000.0),
+        "lead_time_days": float(lead_time.sum()),
+        "min_capacity": bottleneck_capacity(snapshot, edges),
+    }
+
+
+def bottleneck_capacity(snapshot: RoutingSnapshot, edges: np.ndarray) -> float:
+    """Smallest capacity along the edges, inf for an empty path."""
+    if len(edges) == 0:
+        return np.inf
+    return float(snapshot.capacity[edges].min())
+
+
+def route_result(snapshot: RoutingSnapshot, node_indices: list[int], edge_indices: list[int],
+                 params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Builds the route description returned by `ExporterAgent.find_cheapest_path`. Besides
+    the node path it carries `edges`, a read-only int32 array of collapsed edge indices
+    into the routing snapshot, and the route's bottleneck `min_capacity`.
+    """
+    edges = np.asarray(edge_indices, dtype=np.int32)
+    edges.setflags(write=False)
+    metrics = route_metrics(snapshot, edges, params)
+
+    return {
+        "method": "multimodal_cost_min",
+        "path": snapshot.to_node_ids(node_indices),
+        "edges": edges,
+        "total_weight": metrics["cost"],
+        "estimated_cost": metrics["cost"],
+        "total_distance_km": metrics["distance_km"],
+        "estimated_lead_time_days": metrics["lead_time_days"],
+        "min_capacity": metrics["min_capacity"],
+    }
+
+
+def get_routing_state(graph: nx.Graph) -> tuple[RoutingSnapshot, ActiveView | None]:
+    """
+    Snapshot and active view of `graph`. `SimulationGraph` keeps both between calls,
+    any other networkx graph gets one-off ones. The view is None when nothing is masked.
+    """
+    if hasattr(graph, "get_active_view"):
+        view = graph.get_active_view()
+        snapshot = view.snapshot
+    else:
+        snapshot = RoutingSnapshot.from_graph(graph)
+        view = ActiveView.from_graph(snapshot, graph)
+    return snapshot, None if view.is_unrestricted() else view
+
+
+def profile_prices(params: Optional[Dict[str, Any]] = None) -> tuple[float, float, float] | None:
+    """
+    Courier price profile of `params` as per-km prices indexed by `TransportMode` (land,
+    air, sea), or None to route on the edges' `cost`. The prices are read from a courier
+    entry of `courier_companies`, given directly or under `default_unit_cost`.
+    """
+    if not params:
+        return None
+    prices = params.get("default_unit_cost", params)
+    if not isinstance(prices, dict) or "price_per_km_land" not in prices:
+        return None
+    return (float(prices["price_per_km_land"]), float(prices.get("price_per_km_air", prices["price_per_km_land"])),
+            float(prices.get("price_per_km_sea", prices["price_per_km_land"])))
+
+
+def cost_profile(params: Optional[Dict[str, Any]] = None) -> tuple:
+    """Part of the route cache key describing how costs and lead times were evaluated."""
+    if params is None:
+        params = {}
+    prices = profile_prices(params)
+    return ("cost" if prices is None else prices), float(params.get("driving_hours_per_day", 24.0))
+
+
+def route_cache_key(graph: nx.Graph, source_node: int | str, target_node: int | str,
+                    params: Optional[Dict[str, Any]] = None) -> tuple | None:
+    """Cache key of a route on `graph`, None if the graph keeps no `route_cache`."""
+    if getattr(graph, "route_cache", None) is None:
+        return None
+    fingerprint = graph.get_active_view().fingerprint
+    return graph.route_cache.make_key(source_node, target_node, cost_profile(params), fingerprint)
+
+
+def find_route(graph: nx.Graph, source_node: int | str, target_node: int | str,
+               params: Optional[Dict[str, Any]] = None,
+               strategy: SearchStrategy | str | None = None) -> Dict[str, Any]:
+    """
+    Cheapest route between two nodes of the active graph. The graph's `route_cache`
+    (if any) is consulted first and filled with the computed route. See `compute_route`
+    for `strategy`; all strategies give the same cost, so cached routes are shared.
+
+    Raises
+    ------
+    nx.NetworkXNoPath
+        If either node is missing or the target is unreachable.
+    """
+    key = route_cache_key(graph, source_node, target_node, params)
+    if key is not None:
+        cached = graph.route_cache.get(key)
+        if cached is not None:
+            if not cached:
+                raise nx.NetworkXNoPath(f"no path between {source_node} and {target_node}")
+            return cached
+
+    try:
+        route = compute_route(graph, source_node, target_node, params, strategy)
+    except nx.NetworkXNoPath:
+        if key is not None:
+            graph.route_cache.put(key, {})
+        raise
+
+    if key is not None:
+        graph.route_cache.put(key, route)
+    return route
+
+
+def select_strategy(graph: nx.Graph, strategy: SearchStrategy | str | None = None,
+                    prices: tuple[float, float, float] | None = None) -> SearchStrategy:
+    """
+    Resolves the search strategy of a single-pair query. Without an explicit choice a
+    query priced with courier `prices` uses the graph's hub table of that profile if one
+    is attached, else bidirectional Dijkstra. An unpriced query uses the contraction
+    hierarchy on the intact network, the country overlay while anything is disrupted (the
+    hierarchy falls back to Dijkstra around inactive elements, the overlay only rebuilds
+    the affected countries), and bidirectional Dijkstra when neither is attached.
+    """
+    hierarchy = getattr(graph, "contraction_hierarchy", None)
+    overlay = getattr(graph, "overlay_graph", None)
+    hub_tables = getattr(graph, "hub_tables", {})
+    if strategy is not None:
+        strategy = SearchStrategy(strategy)
+        if strategy == SearchStrategy.CONTRACTION_HIERARCHY and hierarchy is None:
+            raise ValueError("Graph has no contraction hierarchy attached")
+        if strategy == SearchStrategy.OVERLAY and overlay is None:
+            raise ValueError("Graph has no overlay graph attached")
+        if strategy == SearchStrategy.HUB_TABLE and prices not in hub_tables:
+            raise ValueError("Graph has no hub table of this price profile attached")
+        return strategy
+    if prices is not None:
+        return SearchStrategy.HUB_TABLE if prices in hub_tables else SearchStrategy.BIDIRECTIONAL
+    if overlay is not None and (hierarchy is None or not graph.get_active_view().is_unrestricted()):
+        return SearchStrategy.OVERLAY
+    if hierarchy is not None:
+        return SearchStrategy.CONTRACTION_HIERARCHY
+    return SearchStrategy.BIDIRECTIONAL
+
+
+def compute_route(graph: nx.Graph, source_node: int | str, target_node: int | str,
+                  params: Optional[Dict[str, Any]] = None,
+                  strategy: SearchStrategy | str | None = None) -> Dict[str, Any]:
+    """
+    Cheapest route without consulting the cache.
+
+    Parameters
+    ----------
+    strategy : SearchStrategy | str, optional
+        "dijkstra", "bidirectional", "contraction_hierarchy", "overlay" or "hub_table"; see
+        `select_strategy` for the default. The hierarchy and the overlay only hold edge
+        `cost`, so queries with courier prices in `params` run them as bidirectional
+        Dijkstra on the courier's edge costs; hub tables are kept per price profile.
+    """
+    prices = profile_prices(params)
+    strategy = select_strategy(graph, strategy, prices)
+    snapshot, view = get_routing_state(graph)
+    weights = None
+    if prices is not None:
+        weights = snapshot.profile_list(prices)
+        if strategy in (SearchStrategy.CONTRACTION_HIERARCHY, SearchStrategy.OVERLAY):
+            strategy = SearchStrategy.BIDIRECTIONAL
+
+    source = snapshot.index_of(source_node)
+    target = snapshot.index_of(target_node)
+    if source is None:
+        raise nx.NetworkXNoPath(f"source node {source_node} not in routing graph")
+    if target is None:
+        raise nx.NetworkXNoPath(f"target node {target_node} not in routing graph")
+
+    if strategy == SearchStrategy.CONTRACTION_HIERARCHY:
+        found = graph.contraction_hierarchy.shortest_path(snapshot, source, target, view=view)
+    elif strategy == SearchStrategy.OVERLAY:
+        graph.overlay_graph.attach(graph.get_active_view())
+        found = graph.overlay_graph.shortest_path(source, target)
+    elif strategy == SearchStrategy.HUB_TABLE:
+        table = graph.hub_tables[prices]
+        table.attach(snapshot, graph.get_active_view())
+        found = table.shortest_path(source, target)
+    elif strategy == SearchStrategy.BIDIRECTIONAL:
+        found = snapshot.bidirectional_dijkstra_path(source, target, view=view, weights=weights)
+    else:
+        found = snapshot.dijkstra_path(source, target, view=view, weights=weights)
+    if found is None:
+        raise nx.NetworkXNoPath(f"no path between {source_node} and {target_node}")
+    return route_result(snapshot, found[0], found[1], params)
+
+
+def find_routes(graph: nx.Graph, pairs: list[tuple[int | str, int | str]],
+                params: Optional[Dict[str, Any]] = None) -> list[Dict[str, Any]]:
+    """
+    Batched cheapest routes for many (source, target) pairs.
+
+    One shortest-path tree is grown per distinct source, stopping once all of that
+    source's targets are settled, and every pair is answered from its source's tree.
+    Results are returned in the order of `pairs`; unreachable pairs get an empty dict,
+    like `ExporterAgent.find_cheapest_path`. Pairs found in the graph's `route_cache`
+    are not routed again.
+    """
+    snapshot, view = get_routing_state(graph)
+
+    keys = [route_cache_key(graph, source_node, target_node, params) for source_node, target_node in pairs]
+    cached = [graph.route_cache.get(key) if key is not None else None for key in keys]
+
+    targets_by_source = defaultdict(set)
+    for (source_node, target_node), route in zip(pairs, cached):
+        if route is not None:
+            continue
+        source = snapshot.index_of(source_node)
+        target = snapshot.index_of(target_node)
+        if source is not None and target is not None:
+            targets_by_source[source].add(target)
+
+    prices = profile_prices(params)
+    weights = snapshot.profile_list(prices) if prices is not None else None
+    trees = {source: shortest_path_tree(snapshot, source, view, targets, weights=weights)
+             for source, targets in targets_by_source.items()}
+
+    results = []
+    for (source_node, target_node), key, route in zip(pairs, keys, cached):
+        if route is None:
+            tree = trees.get(snapshot.index_of(source_node))
+            target = snapshot.index_of(target_node)
+            found = tree.path_to(target) if tree is not None and target is not None else None
+            route = route_result(snapshot, found[0], found[1], params) if found is not None else {}
+            if key is not None:
+                graph.route_cache.put(key, route)
+        results.append(route)
+    return results
@@ -0,0 +1,545 @@
+import hashlib
+import heapq
+import os
+import sys
+
+import networkx as nx
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from network.node_order import DEFAULT_NODE_ORDER, node_permutation
+from network.transport_types import NodeOrder, TransportMode
+from utils.graph_helper import parse_maxspeed
+
+# wersja kolumn zapisywanych przez normalize_edge (zmiana wymusza ponowną normalizację)
+EDGE_COLUMNS_VERSION = 3
+
+# prędkość na drodze bez (czytelnego) maxspeed; SimulationGraph wpisuje ją też jako domyślne maxspeed
+DEFAULT_SPEED_KMH = 50
+# ciężarówka nie jedzie szybciej niż 90 km/h, niezależnie od ograniczenia na drodze
+MAX_TRUCK_SPEED_KMH = 90.0
+AIR_SPEED_KMH = 700.0
+SEA_SPEED_KMH = 35.0
+
+# atrybuty krawędzi, z których liczone są kolumny routingu
+COLUMN_SOURCE_ATTRIBUTES = frozenset({"type", "route", "aeroway", "maxspeed", "length", "duration_hours", "cost"})
+
+DEFAULT_UNIT_COST = {
+    TransportMode.LAND: 1.0,
+    TransportMode.AIR: 5.0,
+    TransportMode.SEA: 0.5
+}
+
+
+def get_edge_mode(edge_data: dict) -> TransportMode:
+    """Returns AIR, SEA or LAND based on the edge type and OSM tags."""
+    if edge_data.get("type") == "airline_route":
+        return TransportMode.AIR
+    if edge_data.get("type") == "sea_route":
+        return TransportMode.SEA
+
+    if edge_data.get("route") == "ferry":
+        return TransportMode.SEA
+    if "aeroway" in edge_data:
+        return TransportMode.AIR
+
+    return TransportMode.LAND
+
+
+def get_edge_speed(edge_data: dict, mode: TransportMode) -> float:
+    """
+    Travel speed of an edge in km/h: fixed for air and sea, parsed `maxspeed` on land,
+    capped at `MAX_TRUCK_SPEED_KMH`.
+    """
+    if mode == TransportMode.AIR:
+        return AIR_SPEED_KMH
+    if mode == TransportMode.SEA:
+        return SEA_SPEED_KMH
+    ms = parse_maxspeed(edge_data.get("maxspeed"))
+    return min(ms, MAX_TRUCK_SPEED_KMH) if (ms and ms > 0) else float(DEFAULT_SPEED_KMH)
+
+
+def get_edge_travel_hours(edge_data: dict, speed: float) -> float:
+    """Travel time of an edge: its `duration_hours` (set on sea routes) if present, else length / speed."""
+    duration = edge_data.get("duration_hours")
+    if duration is not None and duration == duration:
+        return float(duration)
+    return float(edge_data.get("length", 0.0)) / 1000.0 / speed
+
+
+def parse_edge_columns(edge_data: dict) -> tuple[int, float, float, float]:
+    """Routing columns `(transport_mode, speed_kmh, travel_hours, cost)` parsed from the edge's tags."""
+    mode = get_edge_mode(edge_data)
+    speed = get_edge_speed(edge_data, mode)
+    travel_hours = get_edge_travel_hours(edge_data, speed)
+    cost = float(edge_data.get("cost", DEFAULT_UNIT_COST[mode]))
+    return int(mode), speed, travel_hours, cost
+
+
+def edge_columns(edge_data: dict) -> tuple[int, float, float, float]:
+    """
+    Normalized routing columns of an edge: `(transport_mode, speed_kmh, travel_hours, cost)`.
+    Already normalized edges are read as they are, raw OSM tags are parsed otherwise. Edges
+    without a `cost` attribute are routed with the default unit cost of their mode.
+    """
+    if "transport_mode" in edge_data:
+        mode = edge_data["transport_mode"]
+        cost = float(edge_data.get("cost", DEFAULT_UNIT_COST[TransportMode(mode)]))
+        return mode, edge_data["speed_kmh"], edge_data["travel_hours"], cost
+    return parse_edge_columns(edge_data)
+
+
+def normalize_edge(edge_data: dict) -> None:
+    """
+    Parses the edge's tags again and stores the columns of `edge_columns` on it, so routing
+    never parses OSM tags on its own. A missing `cost` is not filled in: the default unit
+    cost stays a routing column only and never becomes an edge attribute.
+    """
+    mode, speed, travel_hours, cost = parse_edge_columns(edge_data)
+    edge_data["transport_mode"] = mode
+    edge_data["speed_kmh"] = speed
+    edge_data["travel_hours"] = travel_hours
+    if "cost" in edge_data:
+        edge_data["cost"] = cost
+
+
+class RoutingSnapshot:
+    """
+    Immutable, array-backed view of a graph's topology used for routing.
+
+    Nodes are renumbered to dense int32 indices in a locality order (see
+    `network.node_order`: by default along a Hilbert curve over the coordinates, so map
+    neighbours sit close in every array) and adjacency is stored in CSR form
+    (`offsets`, `neighbors`, `half_edges`). Parallel MultiGraph edges between the same
+    pair of nodes are collapsed to the cheapest one, so every edge attribute array is
+    indexed by a collapsed edge index. Edge attributes come from the normalized columns
+    written by `normalize_edge` (raw OSM tags are parsed only for edges without them).
+    Arrays are never written to; price and capacity edits replace the `cost` and
+    `capacity` columns as a whole (`refresh_edges`).
+
+    Attributes
+    ----------
+    node_ids : list
+        Original node ID for every dense index.
+    node_index : dict
+        Mapping: original node ID -> dense index.
+    offsets : np.ndarray[int32]
+        CSR row offsets, `neighbors[offsets[i]:offsets[i + 1]]` are neighbours of node `i`.
+    neighbors : np.ndarray[int32]
+        CSR column indices.
+    half_edges : np.ndarray[int32]
+        Collapsed edge index for every CSR entry.
+    edge_u, edge_v : np.ndarray[int32]
+        Endpoints of every collapsed edge.
+    edge_keys : list
+        MultiGraph key of the edge chosen for every collapsed edge.
+    cost, length, capacity, lead_time : np.ndarray[float64]
+        Attributes of the chosen edges (length in meters, lead time in days).
+    mode : np.ndarray[int8]
+        `TransportMode` of the chosen edges.
+    x, y : np.ndarray[float64]
+        Node coordinates (NaN where missing).
+    signature : tuple[int, int]
+        Number of nodes and edges of the source graph at build time.
+    node_order : NodeOrder
+        Numbering of the dense indices; collapsed edges are sorted by their endpoints.
+    cost_version : int
+        Incremented every time `refresh_edges` replaces the cost column.
+    """
+    def __init__(self, node_ids: list, offsets: np.ndarray, neighbors: np.ndarray, half_edges: np.ndarray,
+                 edge_u: np.ndarray, edge_v: np.ndarray, edge_keys: list, cost: np.ndarray, length: np.ndarray,
+                 capacity: np.ndarray, lead_time: np.ndarray, mode: np.ndarray, x: np.ndarray, y: np.ndarray,
+                 directed: bool = False, signature: tuple[int, int] = (0, 0),
+                 node_order: NodeOrder = NodeOrder.INPUT):
+        self.node_ids = node_ids
+        self.node_index = {node: i for i, node in enumerate(node_ids)}
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.half_edges = half_edges
+        self.edge_u = edge_u
+        self.edge_v = edge_v
+        self.edge_keys = edge_keys
+        self.cost = cost
+        self.length = length
+        self.capacity = capacity
+        self.lead_time = lead_time
+        self.mode = mode
+        self.x = x
+        self.y = y
+        self.directed = directed
+        self.signature = signature
+        self.node_order = NodeOrder(node_order)
+        self._lists = None
+        self._metric_lists = {}
+        self._profile_costs = {}
+        self._checksum = None
+        self.cost_version = 0
+
+        for array in (offsets, neighbors, half_edges, edge_u, edge_v, cost, length, capacity, lead_time, mode, x, y):
+            array.setflags(write=False)
+
+    def __getstate__(self) -> dict:
+        # listy pomocnicze odtwarzane leniwie, nie trafiają do pickla
+        state = self.__dict__.copy()
+        state.update(_lists=None, _metric_lists={}, _profile_costs={})
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self.__dict__.setdefault("_checksum", None)
+        self.__dict__.setdefault("cost_version", 0)
+        for array in (self.offsets, self.neighbors, self.half_edges, self.edge_u, self.edge_v, self.cost,
+                      self.length, self.capacity, self.lead_time, self.mode, self.x, self.y):
+            array.setflags(write=False)
+
+    @property
+    def number_of_nodes(self) -> int:
+        return len(self.node_ids)
+
+    @property
+    def number_of_edges(self) -> int:
+        return len(self.edge_u)
+
+    @classmethod
+    def from_graph(cls, graph: nx.Graph, node_order: NodeOrder | str = None) -> "RoutingSnapshot":
+        """`node_order` defaults to the graph's `node_order` attribute, else `DEFAULT_NODE_ORDER`."""
+        if node_order is None:
+            node_order = graph.graph.get("node_order", DEFAULT_NODE_ORDER)
+        node_ids = list(graph.nodes())
+        node_index = {node: i for i, node in enumerate(node_ids)}
+        directed = graph.is_directed()
+
+        x = np.array([data.get("x", np.nan) for _, data in graph.nodes(data=True)], dtype=np.float64)
+        y = np.array([data.get("y", np.nan) for _, data in graph.nodes(data=True)], dtype=np.float64)
+
+        best = {}
+        if graph.is_multigraph():
+            edges = graph.edges(keys=True, data=True)
+        else:
+            edges = ((u, v, 0, data) for u, v, data in graph.edges(data=True))
+
+        for u, v, key, data in edges:
+            if u == v:
+                continue
+            iu = node_index[u]
+            iv = node_index[v]
+            pair = (iu, iv) if directed or iu < iv else (iv, iu)
+            mode, _, travel_hours, cost = edge_columns(data)
+            current = best.get(pair)
+            if current is None or cost < current[0]:
+                best[pair] = (cost, key, mode, travel_hours, data)
+
+        m = len(best)
+        edge_u = np.empty(m, dtype=np.int32)
+        edge_v = np.empty(m, dtype=np.int32)
+        edge_keys = []
+        cost = np.empty(m, dtype=np.float64)
+        length = np.empty(m, dtype=np.float64)
+        capacity = np.empty(m, dtype=np.float64)
+        lead_time = np.empty(m, dtype=np.float64)
+        mode = np.empty(m, dtype=np.int8)
+
+        for e, ((iu, iv), (edge_cost, key, edge_mode, travel_hours, data)) in enumerate(best.items()):
+            edge_u[e] = iu
+            edge_v[e] = iv
+            edge_keys.append(key)
+            cost[e] = edge_cost
+            length[e] = float(data.get("length", 0.0))
+            capacity[e] = float(data.get("capacity", np.inf))
+            lead_time[e] = travel_hours / 24.0
+            mode[e] = edge_mode
+
+        permutation = node_permutation(node_order, x, y, edge_u, edge_v)
+        if permutation is not None:
+            rank = np.empty(len(node_ids), dtype=np.int32)
+            rank[permutation] = np.arange(len(node_ids), dtype=np.int32)
+            node_ids = [node_ids[i] for i in permutation.tolist()]
+            x = x[permutation]
+            y = y[permutation]
+            edge_u = rank[edge_u]
+            edge_v = rank[edge_v]
+            if not directed:
+                edge_u, edge_v = np.minimum(edge_u, edge_v), np.maximum(edge_u, edge_v)
+            # krawędzie w kolejności węzłów, tablice krawędzi też są czytane lokalnie
+            edge_order = np.lexsort((edge_v, edge_u))
+            edge_u = edge_u[edge_order]
+            edge_v = edge_v[edge_order]
+            edge_keys = [edge_keys[e] for e in edge_order.tolist()]
+            cost = cost[edge_order]
+            length = length[edge_order]
+            capacity = capacity[edge_order]
+            lead_time = lead_time[edge_order]
+            mode = mode[edge_order]
+
+        offsets, neighbors, half_edges = cls.build_csr(len(node_ids), edge_u, edge_v, directed)
+
+        return cls(node_ids, offsets, neighbors, half_edges, edge_u, edge_v, edge_keys, cost, length, capacity,
+                   lead_time, mode, x, y, directed=directed,
+                   signature=(graph.number_of_nodes(), graph.number_of_edges()),
+                   node_order=NodeOrder.INPUT if permutation is None else node_order)
+
+    @staticmethod
+    def build_csr(n: int, edge_u: np.ndarray, edge_v: np.ndarray, directed: bool = False):
+        edge_ids = np.arange(len(edge_u), dtype=np.int32)
+        if directed:
+            src, dst, eid = edge_u, edge_v, edge_ids
+        else:
+            src = np.concatenate([edge_u, edge_v])
+            dst = np.concatenate([edge_v, edge_u])
+            eid = np.concatenate([edge_ids, edge_ids])
+
+        order = np.argsort(src, kind="stable")
+        offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=n), out=offsets[1:])
+        neighbors = dst[order].astype(np.int32)
+        half_edges = eid[order].astype(np.int32)
+        return offsets, neighbors, half_edges
+
+    def adjacency_lists(self) -> tuple[list, list, list, list]:
+        """Plain-list copies of the CSR arrays; indexing lists is much faster in pure Python loops."""
+        if self._lists is None:
+            self._lists = (self.offsets.tolist(), self.neighbors.tolist(), self.half_edges.tolist(),
+                           self.cost.tolist())
+        return self._lists
+
+    def metric_list(self, metric: str) -> list[float]:
+        """Plain-list copy of a per-edge weight array (`cost` or `length`)."""
+        if metric not in self._metric_lists:
+            self._metric_lists[metric] = getattr(self, metric).tolist()
+        return self._metric_lists[metric]
+
+    def profile_cost(self, prices: tuple[float, float, float]) -> np.ndarray:
+        """
+        Per-edge cost under a courier price profile: length in km times the price per km of
+        the edge's `TransportMode` (`prices` is indexed by mode: land, air, sea).
+        """
+        if prices not in self._profile_costs:
+            cost = np.asarray(prices, dtype=np.float64)[self.mode] * (self.length / 1000.0)
+            cost.setflags(write=False)
+            self._profile_costs[prices] = cost
+        return self._profile_costs[prices]
+
+    def profile_list(self, prices: tuple[float, float, float]) -> list[float]:
+        """Plain-list copy of `profile_cost` for the pure Python search loops."""
+        key = ("profile", prices)
+        if key not in self._metric_lists:
+            self._metric_lists[key] = self.profile_cost(prices).tolist()
+        return self._metric_lists[key]
+
+    def checksum(self) -> str:
+        """Identifies the node order, topology and weights; used to validate preprocessed data on disk."""
+        if self._checksum is None:
+            digest = hashlib.sha1()
+            digest.update(repr(self.node_ids).encode())
+            digest.update(self.edge_u.tobytes())
+            digest.update(self.edge_v.tobytes())
+            digest.update(self.cost.tobytes())
+            digest.update(self.length.tobytes())
+            self._checksum = digest.hexdigest()
+        return self._checksum
+
+    def refresh_edges(self, graph: nx.Graph, pairs: list[tuple]) -> set[str] | None:
+        """
+        Reads `cost` and `capacity` of the edges between `pairs` of node IDs again, after
+        they were edited on `graph`, and replaces the changed columns (topology and the
+        other columns stay). Returns the names of the replaced columns, or None if another
+        parallel edge became the cheapest one of a pair, so the snapshot must be rebuilt.
+        """
+        cost = self.cost.copy()
+        capacity = self.capacity.copy()
+        for u, v in pairs:
+            iu, iv = self.node_index.get(u), self.node_index.get(v)
+            if iu is None or iv is None or iu == iv:
+                continue
+            e = self.find_edge(iu, iv)
+            if e is None:
+                continue
+            parallel = graph[u][v].items() if graph.is_multigraph() else [(0, graph[u][v])]
+            best = None
+            for key, data in parallel:
+                edge_cost = edge_columns(data)[3]
+                if best is None or edge_cost < best[0]:
+                    best = (edge_cost, key, data)
+            if best[1] != self.edge_keys[e]:
+                return None
+            cost[e] = best[0]
+            capacity[e] = float(best[2].get("capacity", np.inf))
+
+        changed = set()
+        if not np.array_equal(cost, self.cost):
+            cost.setflags(write=False)
+            self.cost = cost
+            if self._lists is not None:
+                self._lists = self._lists[:3] + (cost.tolist(),)
+            self._metric_lists.pop("cost", None)
+            self._checksum = None
+            self.cost_version += 1
+            changed.add("cost")
+        if not np.array_equal(capacity, self.capacity):
+            capacity.setflags(write=False)
+            self.capacity = capacity
+            changed.add("capacity")
+        return changed
+
+    def index_of(self, node: int | str) -> int | None:
+        return self.node_index.get(node)
+
+    def to_node_ids(self, node_indices) -> list:
+        return [self.node_ids[i] for i in node_indices]
+
+    def find_edge(self, iu: int, iv: int) -> int | None:
+        offsets, neighbors, half_edges, _ = self.adjacency_lists()
+        for i in range(offsets[iu], offsets[iu + 1]):
+            if neighbors[i] == iv:
+                return half_edges[i]
+        return None
+
+    def edge_path_nodes(self, source: int, edges) -> list[int]:
+        """Dense node indices visited when following `edges` from `source`."""
+        edge_u = self.edge_u
+        edge_v = self.edge_v
+        nodes = [source]
+        for e in edges:
+            u = int(edge_u[e])
+            nodes.append(int(edge_v[e]) if u == nodes[-1] else u)
+        return nodes
+
+    def path_edges(self, path: list) -> np.ndarray | None:
+        """Collapsed edge indices along a path of original node IDs, None if some hop is not an edge."""
+        edges = np.empty(max(len(path) - 1, 0), dtype=np.int32)
+        for i in range(len(path) - 1):
+            iu = self.node_index.get(path[i])
+            iv = self.node_index.get(path[i + 1])
+            if iu is None or iv is None:
+                return None
+            e = self.find_edge(iu, iv)
+            if e is None:
+                return None
+            edges[i] = e
+        return edges
+
+    def dijkstra_path(self, source: int, target: int, view=None,
+                      weights: list[float] = None) -> tuple[list[int], list[int]] | None:
+        """
+        Point-to-point Dijkstra on dense indices. Returns `(node_indices, edge_indices)`
+        of the cheapest path, or None when the target is unreachable. Nodes and edges
+        masked out by `view` (an `ActiveView`) are skipped. `weights` (one per collapsed
+        edge) replaces the cost column, e.g. for penalized searches.
+        """
+        offsets, neighbors, half_edges, cost = self.adjacency_lists()
+        if weights is not None:
+            cost = weights
+        blocked_nodes = view.inactive_nodes if view is not None else ()
+        blocked_edges = view.inactive_edges if view is not None else ()
+        if source in blocked_nodes or target in blocked_nodes:
+            return None
+
+        dist = {source: 0.0}
+        pred = {}
+        settled = set()
+        heap = [(0.0, source)]
+
+        while heap:
+            d, u = heapq.heappop(heap)
+            if u in settled:
+                continue
+            settled.add(u)
+            if u == target:
+                break
+            for i in range(offsets[u], offsets[u + 1]):
+                v = neighbors[i]
+                if v in settled or v in blocked_nodes:
+                    continue
+                e = half_edges[i]
+                if e in blocked_edges:
+                    continue
+                nd = d + cost[e]
+                if nd < dist.get(v, np.inf):
+                    dist[v] = nd
+                    pred[v] = (u, e)
+                    heapq.heappush(heap, (nd, v))
+
+        if target not in settled:
+            return None
+
+        nodes = [target]
+        edges = []
+        current = target
+        while current != source:
+            current, e = pred[current]
+            nodes.append(current)
+            edges.append(e)
+        return nodes[::-1], edges[::-1]
+
+    def bidirectional_dijkstra_path(self, source: int, target: int, view=None,
+                                    weights: list[float] = None) -> tuple[list[int], list[int]] | None:
+        """
+        Same contract as `dijkstra_path`, but searches from both ends and stops once the
+        two smallest frontier keys add up to the best meeting cost found so far. Gives the
+        same cost as `dijkstra_path` while settling roughly half the nodes on road networks.
+        Directed snapshots fall back to `dijkstra_path` (the CSR holds only outgoing edges).
+        """
+        if self.directed:
+            return self.dijkstra_path(source, target, view=view, weights=weights)
+        offsets, neighbors, half_edges, cost = self.adjacency_lists()
+        if weights is not None:
+            cost = weights
+        blocked_nodes = view.inactive_nodes if view is not None else ()
+        blocked_edges = view.inactive_edges if view is not None else ()
+        if source in blocked_nodes or target in blocked_nodes:
+            return None
+        if source == target:
+            return [source], []
+
+        dist = ({source: 0.0}, {target: 0.0})
+        pred = ({}, {})
+        settled = (set(), set())
+        heaps = ([(0.0, source)], [(0.0, target)])
+        best = np.inf
+        meet = None
+
+        while heaps[0] and heaps[1]:
+            if heaps[0][0][0] + heaps[1][0][0] >= best:
+                break
+            # expanding the smaller frontier keeps the searches balanced and lets an isolated
+            # endpoint exhaust its component quickly when the target is unreachable
+            side = 0 if len(heaps[0]) <= len(heaps[1]) else 1
+            own_dist, other_dist = dist[side], dist[1 - side]
+            d, u = heapq.heappop(heaps[side])
+            if u in settled[side]:
+                continue
+            settled[side].add(u)
+            for i in range(offsets[u], offsets[u + 1]):
+                v = neighbors[i]
+                if v in settled[side] or v in blocked_nodes:
+                    continue
+                e = half_edges[i]
+                if e in blocked_edges:
+                    continue
+                nd = d + cost[e]
+                if nd < own_dist.get(v, np.inf):
+                    own_dist[v] = nd
+                    pred[side][v] = (u, e)
+                    heapq.heappush(heaps[side], (nd, v))
+                if v in other_dist and own_dist[v] + other_dist[v] < best:
+                    best = own_dist[v] + other_dist[v]
+                    meet = v
+
+        if meet is None:
+            return None
+
+        nodes = [meet]
+        edges = []
+        current = meet
+        while current != source:
+            current, e = pred[0][current]
+            nodes.append(current)
+            edges.append(e)
+        nodes.reverse()
+        edges.reverse()
+        current = meet
+        while current != target:
+            current, e = pred[1][current]
+            nodes.append(current)
+            edges.append(e)
+        return nodes, edges
@@ -12,15 +12,24 @@ import warnings
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from utils.graph_helper import haversine_coordinates
 from network.transport_types import MinimalCostType
-from utils.graph_helper import convert_speed
+from network.routing_snapshot import COLUMN_SOURCE_ATTRIBUTES, DEFAULT_SPEED_KMH, EDGE_COLUMNS_VERSION, RoutingSnapshot, normalize_edge
+from network.active_view import ActiveView
+from network.route_cache import RouteCache
+from network.router import route_metrics
+from network.od_matrix import ODMatrix, ODMatrixCache, compute_od_matrix
 
-AVG_FLIGHT_SPEED_KMH = 700
-MAX_TRUCK_SPEED_KMH = 90
-DEFAULT_SPEED_KMH = 50
 AVERAGE_MOTORWAYS_TRUCK_SPEED_KMH = 80
 
 class SimulationGraph(nx.MultiGraph):
-    def __init__(self, default_capacity, default_price, incoming_graph_data=None, multigraph_input = None, type : str = "road", **attr):
+    def __init__(self, default_capacity=1000, default_price=0.5, incoming_graph_data=None, multigraph_input = None, type : str = "road", **attr):
+        self.routing_snapshot = None
+        self.active_view = None
+        self.route_cache = RouteCache()
+        self.od_matrix_cache = ODMatrixCache()
+        self.contraction_hierarchy = None
+        self.landmark_tables = {}
+        self.overlay_graph = None
+        self.hub_tables = {}
         super().__init__(incoming_graph_data, multigraph_input, **attr)
         self.default_capacity = default_capacity
         self.default_price = default_price
@@ -41,7 +50,8 @@ class SimulationGraph(nx.MultiGraph):
                 data["average_speed"] = AVERAGE_MOTORWAYS_TRUCK_SPEED_KMH
             if "length" not in data:
                 data["length"] = self.haversine_nodes(u, v, "length")
-        
+        self.normalize_edge_attributes()
+
         for node, data in self.nodes(data=True):
             if "active" not in data:
                 data["active"] = True
@@ -57,6 +67,149 @@ class SimulationGraph(nx.MultiGraph):
         return cls(default_capacity, default_price, incoming_graph_data=graph)
     
 
+    def normalize_edge_attributes(self) -> int:
+        """
+        Parses OSM tags (`type`, `route`, `aeroway`, `maxspeed`, `duration_hours`) of every
+        edge once and stores the numeric routing columns `transport_mode`, `speed_kmh`,
+        `travel_hours` and `cost`. Edges that already have them are skipped, so the pass is
+        cheap on normalized graphs; a graph normalized by another `EDGE_COLUMNS_VERSION` is
+        normalized again as a whole.
+
+        `add_edge` re-normalizes the edges it creates or updates. Tags changed directly in an
+        edge's attribute dict (or through `add_edges_from`) are not noticed; call
+        `renormalize_edges` for such edges, otherwise their columns stay as they were.
+
+        Returns
+        -------
+        int
+            Number of edges normalized by this call.
+        """
+        stale = self.graph.get("edge_columns_version") != EDGE_COLUMNS_VERSION
+        normalized = 0
+        for u, v, data in self.edges(data=True):
+            if stale or "transport_mode" not in data:
+                normalize_edge(data)
+                normalized += 1
+        self.graph["edge_columns_version"] = EDGE_COLUMNS_VERSION
+        return normalized
+
+
+    def get_routing_snapshot(self) -> RoutingSnapshot:
+        """
+        Returns the array-backed routing snapshot, building it on first use. The snapshot is
+        rebuilt only if it was invalidated (every `add_edge`/`remove_edge` does that) or the
+        number of nodes changed since it was built. Counting edges of a MultiGraph is O(E),
+        so it is not checked on every call.
+        """
+        if self.routing_snapshot is None or self.routing_snapshot.signature[0] != self.number_of_nodes():
+            self.invalidate_routing_snapshot()
+            self.normalize_edge_attributes()
+            self.routing_snapshot = RoutingSnapshot.from_graph(self)
+        return self.routing_snapshot
+
+
+    def renormalize_edges(self, edges : list[tuple] = None) -> None:
+        """
+        Parses the tags of `edges` ((u, v) or (u, v, key); all edges if None) again, after
+        their `maxspeed`, `length`, `type` or `duration_hours` were edited in place.
+        """
+        if edges is None:
+            targets = (data for _, _, data in self.edges(data=True))
+        else:
+            targets = [data for u, v, *rest in edges
+                       for data in ([self[u][v][rest[0]]] if rest else self[u][v].values())]
+        for data in targets:
+            normalize_edge(data)
+        self.invalidate_routing_snapshot()
+
+
+    def add_edge(self, u_for_edge, v_for_edge, key=None, **attr):
+        key = super().add_edge(u_for_edge, v_for_edge, key=key, **attr)
+        # zmienione tagi: kolumny routingu liczone od nowa (krawędzie z gotowymi kolumnami bez zmian)
+        if "transport_mode" not in attr and not COLUMN_SOURCE_ATTRIBUTES.isdisjoint(attr):
+            normalize_edge(self[u_for_edge][v_for_edge][key])
+        if self.routing_snapshot is not None:
+            self.invalidate_routing_snapshot()
+        return key
+
+
+    def remove_edge(self, u, v, key=None):
+        super().remove_edge(u, v, key=key)
+        if self.routing_snapshot is not None:
+            self.invalidate_routing_snapshot()
+
+
+    def invalidate_routing_snapshot(self):
+        self.routing_snapshot = None
+        self.active_view = None
+        self.contraction_hierarchy = None
+        self.landmark_tables = {}
+        self.overlay_graph = None
+        self.hub_tables = {}
+        self.route_cache.clear()
+        self.od_matrix_cache.clear()
+
+
+    def invalidate_costs(self):
+        """
+        Drops only what is built on the edge cost column: the contraction hierarchy, the
+        overlay, cost landmarks, the cost hub table and cached routes. Length landmarks and
+        courier hub tables (length and mode only) stay.
+        """
+        dropped = [self.contraction_hierarchy, self.overlay_graph, self.hub_tables.pop(None, None)]
+        self.contraction_hierarchy = None
+        self.overlay_graph = None
+        self.landmark_tables.pop("cost", None)
+        if self.active_view is not None:
+            self.active_view.listeners[:] = [listener for listener in self.active_view.listeners
+                                             if not any(listener is structure for structure in dropped)]
+        self.route_cache.clear()
+        self.od_matrix_cache.clear()
+
+
+    def refresh_edge_columns(self, pairs : list[tuple]):
+        """
+        Brings the routing state in line with `cost`/`capacity` edits on the edges between
+        `pairs`. Capacity is not a routing weight: the snapshot's capacity column is
+        replaced and cached routes get their `min_capacity` recomputed. A price edit drops
+        only what depends on the cost column (`invalidate_costs`); if it changes which
+        parallel edge is the cheapest, the snapshot is rebuilt.
+        """
+        snapshot = self.routing_snapshot
+        if snapshot is None:
+            return
+        changed = snapshot.refresh_edges(self, pairs)
+        if changed is None:
+            self.invalidate_routing_snapshot()
+        elif "cost" in changed:
+            self.invalidate_costs()
+        elif "capacity" in changed:
+            self.route_cache.refresh_min_capacity(snapshot.capacity)
+
+
+    def get_active_view(self) -> ActiveView:
+        """
+        Returns the mask-based active view aligned with the current routing snapshot.
+        Masks are read from node/edge `active` attributes only when the snapshot changes,
+        afterwards they are kept in sync by the (de)activation methods.
+        """
+        snapshot = self.get_routing_snapshot()
+        if self.active_view is None or self.active_view.snapshot is not snapshot:
+            self.active_view = ActiveView.from_graph(snapshot, self)
+        return self.active_view
+
+
+    def od_matrix(self, sources: list[int | str], targets: list[int | str], params: dict = None,
+                  node_mask: np.ndarray = None, edge_mask: np.ndarray = None, router=None) -> ODMatrix:
+        """
+        Cost, distance and lead-time matrices of the cheapest routes from every source to
+        every target on the active network (see `network.od_matrix.compute_od_matrix`).
+        `node_mask`/`edge_mask` (booleans over the routing snapshot) further restrict the
+        active view; results are cached per disruption fingerprint in `od_matrix_cache`.
+        """
+        return compute_od_matrix(self, sources, targets, params, node_mask, edge_mask, router)
+
+
     def remove_edges_attribute(self, attributes: list):
         for u, v, key, data in self.edges(data=True, keys=True):
             for attribute in attributes:
@@ -65,47 +218,76 @@ class SimulationGraph(nx.MultiGraph):
     
 
     def set_capacity(self, capacity, osmids=None, path=None):
+        pairs = []
         if path is not None:
             for u, v in zip(path[:-1], path[1:]):
                 for key in self[u][v]:
                     self[u][v][key]["capacity"] = capacity
+                pairs.append((u, v))
         elif osmids is not None:
             for u, v, key, data in self.edges(data=True, keys=True):
                 edge_osmids = data.get("osmid")
                 if (isinstance(edge_osmids, list) and any(edge_osmid in osmids for edge_osmid in edge_osmids)) or (isinstance(edge_osmids, int) and edge_osmids in osmids):
                     data["capacity"] = capacity
+                    pairs.append((u, v))
+        self.refresh_edge_columns(pairs)
         
     
     def set_price(self, price, osmids=None, path=None):
+        pairs = []
         if path is not None:
             for u, v in zip(path[:-1], path[1:]):
                 for key in self[u][v]:
                     self[u][v][key]["cost"] = price
+                pairs.append((u, v))
         elif osmids is not None:
             for u, v, key, data in self.edges(data=True, keys=True):
                 edge_osmids = data.get("osmid")
                 if (isinstance(edge_osmids, list) and any(edge_osmid in osmids for edge_osmid in edge_osmids)) or (isinstance(edge_osmids, int) and edge_osmids in osmids):
                     data["cost"] = price
+                    pairs.append((u, v))
+        self.refresh_edge_columns(pairs)
 
 
     def deactivate_nodes(self, nodes : list[int | str]):
-        for node, data in self.nodes(data=True):
-            if node in nodes:
-                data["active"] = False
-        # for node in nodes:
-        #     if node in self.nodes:
-        #         data = self.nodes[node]
-        #         data["active"] = False
+        self.set_nodes_active(nodes, False)
 
 
     def activate_nodes(self, nodes : list[int | str]):
-        for node, data in self.nodes(data=True):
-            if node in nodes:
-                data["active"] = True
-        # for node in nodes:
-        #     if node in self.nodes:
-        #         data = self.nodes[node]
-        #         data["active"] = True
+        self.set_nodes_active(nodes, True)
+
+
+    def set_nodes_active(self, nodes : list[int | str], active : bool):
+        nodes = [node for node in nodes if node in self]
+        for node in nodes:
+            self.nodes[node]["active"] = active
+
+        if self.active_view is not None and self.active_view.snapshot is self.routing_snapshot:
+            if active:
+                self.active_view.activate_nodes(nodes)
+            else:
+                self.active_view.deactivate_nodes(nodes)
+
+
+    def deactivate_edges(self, edges : list[tuple[int | str, int | str]]):
+        self.set_edges_active(edges, False)
+
+
+    def activate_edges(self, edges : list[tuple[int | str, int | str]]):
+        self.set_edges_active(edges, True)
+
+
+    def set_edges_active(self, edges : list[tuple[int | str, int | str]], active : bool):
+        edges = [(u, v) for u, v in edges if self.has_edge(u, v)]
+        for u, v in edges:
+            for key in self[u][v]:
+                self[u][v][key]["active"] = active
+
+        if self.active_view is not None and self.active_view.snapshot is self.routing_snapshot:
+            if active:
+                self.active_view.activate_edges(edges)
+            else:
+                self.active_view.deactivate_edges(edges)
 
 
     def safe_shortest_path(self, start_node : int | str, end_node : int | str, weight : str = "cost"):
@@ -126,15 +308,19 @@ class SimulationGraph(nx.MultiGraph):
 
 
     def reduce_capacity(self, capacity=1, path=None, osmids=None):
+        pairs = []
         if path is not None:
             for u, v in zip(path[:-1], path[1:]):
                 for key in self[u][v]:
                     self[u][v][key]["capacity"] -= capacity
+                pairs.append((u, v))
         elif osmids is not None:
             for u, v, key, data in self.edges(data=True, keys=True):
                 edge_osmids = data.get("osmid")
                 if (isinstance(edge_osmids, list) and any(edge_osmid in osmids for edge_osmid in edge_osmids)) or (isinstance(edge_osmids, int) and edge_osmids in osmids):
                     data["capacity"] -= capacity
+                    pairs.append((u, v))
+        self.refresh_edge_columns(pairs)
 
 
     def get_additional_attributes(self):
@@ -150,6 +336,7 @@ class SimulationGraph(nx.MultiGraph):
 
         self.add_nodes_from(multigraph2.nodes(data=True))
         self.add_edges_from(multigraph2.edges(keys=True, data=True))
+        self.invalidate_routing_snapshot()
 
         # mutligraph1 = nx.MultiGraph(self)
         # composed_graph = nx.compose(mutligraph1, multigraph2)
@@ -176,13 +363,20 @@ class SimulationGraph(nx.MultiGraph):
 
 
     def get_active_graph(self):
-        mutligraf = nx.MultiGraph(self)
-        sim_graph_cpy = self.__class__(default_capacity = self.default_capacity, default_price = self.default_price, incoming_graph_data = mutligraf)
-
-        deactivated_nodes = [node for node, data in sim_graph_cpy.nodes(data=True) if data["active"] == False]
-
-        sim_graph_cpy.remove_nodes_from(deactivated_nodes)
-        return sim_graph_cpy
+        """
+        Read-only view of the graph without inactive nodes and edges. Nothing is copied,
+        the view filters through the masks of `get_active_view()`.
+        """
+        view = self.get_active_view()
+        snapshot = view.snapshot
+
+        def filter_edge(u, v, key=None):
+            e = snapshot.find_edge(snapshot.node_index[u], snapshot.node_index[v])
+            return e is None or e not in view.inactive_edges
+
+        if view.inactive_edges:
+            return nx.subgraph_view(self, filter_node=view.is_node_active, filter_edge=filter_edge)
+        return nx.subgraph_view(self, filter_node=view.is_node_active)
     
 
     def reconstruct_path(self, came_from : dict, current : int):
@@ -194,34 +388,60 @@ class SimulationGraph(nx.MultiGraph):
 
 
     def astar(self, start_node: int | str, end_node: int | str, metric: str = "length"):
-        active_sim_graph = self.get_active_graph()
-        entry_queue = []
-        heapq.heappush(entry_queue, (0.0, 0.0, start_node))
-        
-        came_from = {}
-        g_score = {start_node: 0.0}
-
-        while len(entry_queue) > 0:
-            # print(g_score)
-            _, current_g, current_node = heapq.heappop(entry_queue)
+        """
+        A* search on the active network, weighting edges by `metric` ("length" or "cost").
+
+        Runs on the routing snapshot and its active view instead of copying the active graph.
+        If a `LandmarkTable` for `metric` is attached in `landmark_tables` its ALT lower bounds
+        guide the search, otherwise the search degrades to Dijkstra. Parallel edges are
+        collapsed to the cheapest one, as everywhere in routing.
+
+        Returns
+        -------
+        list | None
+            Node IDs of the path, or None if `end_node` is unreachable.
+        """
+        snapshot = self.get_routing_snapshot()
+        view = self.get_active_view()
+        source = snapshot.index_of(start_node)
+        target = snapshot.index_of(end_node)
+        if source is None or target is None:
+            return None
+        if source in view.inactive_nodes or target in view.inactive_nodes:
+            return None
 
-            if current_node == end_node:
-                return self.reconstruct_path(came_from, current_node)
+        offsets, neighbors, half_edges, _ = snapshot.adjacency_lists()
+        weights = snapshot.metric_list(metric)
+        blocked_nodes = view.inactive_nodes
+        blocked_edges = view.inactive_edges
+        table = self.landmark_tables.get(metric)
+        if table is not None and table.separates(source, target):
+            return None
+        h = table.lower_bounds(target).tolist() if table is not None else [0.0] * snapshot.number_of_nodes
 
-            # if current_g > g_score.get(current_node, float('inf')):
-            #     continue
+        entry_queue = [(h[source], 0.0, source)]
+        came_from = {}
+        g_score = {source: 0.0}
+        closed = set()
 
-            for neighbour in active_sim_graph.neighbors(current_node):
-                neighbour_g = current_g + self.haversine_nodes(current_node, neighbour, metric)
-                
+        while entry_queue:
+            _, current_g, current = heapq.heappop(entry_queue)
+            if current in closed:
+                continue
+            if current == target:
+                return snapshot.to_node_ids(self.reconstruct_path(came_from, current))
+            closed.add(current)
+
+            for i in range(offsets[current], offsets[current + 1]):
+                neighbour = neighbors[i]
+                e = half_edges[i]
+                if neighbour in closed or neighbour in blocked_nodes or e in blocked_edges:
+                    continue
+                neighbour_g = current_g + weights[e]
                 if neighbour_g < g_score.get(neighbour, float('inf')):
-                    came_from[neighbour] = current_node
+                    came_from[neighbour] = current
                     g_score[neighbour] = neighbour_g
-                    
-                    neighbour_h = self.heuristic(neighbour, end_node, metric)
-                    neighbour_f = neighbour_g + neighbour_h
-                    
-                    heapq.heappush(entry_queue, (neighbour_f, neighbour_g, neighbour))
+                    heapq.heappush(entry_queue, (neighbour_g + h[neighbour], neighbour_g, neighbour))
         return None
 
     def heuristic(self, start_node : int | str, end_node : int | str, metric : str, mode : str = "euclidean"):
@@ -308,6 +528,7 @@ class SimulationGraph(nx.MultiGraph):
         self.graph.update(G_final.graph)
         self.add_nodes_from(G_final.nodes(data=True))
         self.add_edges_from(G_final.edges(data=True, keys=True))
+        self.invalidate_routing_snapshot()
     
 
     def coherence(self, threshold: float = 100, type : str = "country") -> nx.MultiGraph:
@@ -364,6 +585,7 @@ class SimulationGraph(nx.MultiGraph):
         self.add_nodes_from(G_final.nodes(data=True))
         self.add_edges_from(G_final.edges(keys=True, data=True))
         self.graph.update(G_final.graph)
+        self.invalidate_routing_snapshot()
         final_empty = ox.project_graph(empty_graph, to_crs="EPSG:4326")
         final_empty.graph.update(empty_graph.graph)
         return final_empty
@@ -411,6 +633,7 @@ class SimulationGraph(nx.MultiGraph):
                 }
 
                 self.add_edge(source_node, nearest_node, **edge_data)
+        self.invalidate_routing_snapshot()
 
 
     def shortest_path_stats(self, start_node: int | str, end_node: int | str, metric: str = "length"):
@@ -419,41 +642,16 @@ class SimulationGraph(nx.MultiGraph):
         if path is None:
             warnings.warn(f"Path between start_node: {start_node} and end_node: {end_node} does not exists.")
             return None
-        
-        total_cost = 0
-        total_distance_km = 0
-        total_lead_time_days = 0
 
-        
-        for node in path[1:]:
-            edge_data = self[start_node][node][0]
-
-            length = edge_data.get("length", 0)/1000
-            total_cost += edge_data.get("cost", 0)
-            total_distance_km += length
-
-            duration = 0
-            if edge_data.get("type") == "sea_route":
-                duration = edge_data.get("duration_hours", 0)/24
-            elif edge_data.get("type") == "airline_route":
-                duration = (length/AVG_FLIGHT_SPEED_KMH)/24
-            elif edge_data.get("type") == "road":
-                speed_data = edge_data.get("maxspeed", DEFAULT_SPEED_KMH)
-                max_speed = convert_speed(speed_data, output_type="int")
-                if max_speed is None:
-                    avg_speed = DEFAULT_SPEED_KMH
-                else:
-                    avg_speed = min(max_speed, MAX_TRUCK_SPEED_KMH)
-                duration = (length/avg_speed)/24
-
-            total_lead_time_days += duration
-            start_node = node
-            
+        # sumy liczone z kolumn snapshotu (transport_mode, travel_hours, cost), bez parsowania tagów OSM
+        snapshot = self.get_routing_snapshot()
+        metrics = route_metrics(snapshot, snapshot.path_edges(path))
+
         return {
             "path" : path,
-            "estimated_cost": round(total_cost, 2),
-            "total_distance_km": round(total_distance_km, 2),
-            "estimated_lead_time_days": round(total_lead_time_days, 2)
+            "estimated_cost": round(metrics["cost"], 2),
+            "total_distance_km": round(metrics["distance_km"], 2),
+            "estimated_lead_time_days": round(metrics["lead_time_days"], 2)
         }
 
             
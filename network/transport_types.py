@@ -1,7 +1,29 @@
-from enum import Enum
+from enum import Enum, IntEnum
 
 # minimalny koszt przewozu towaru za 1km
 class MinimalCostType(Enum):
     ROAD = 3
     AIR_ROUTE = 6
-    SEA_ROUTE = 4
\ No newline at end of file
+    SEA_ROUTE = 4
+
+
+# rodzaj transportu krawędzi (kodowany jako int8 w snapshocie routingu)
+class TransportMode(IntEnum):
+    LAND = 0
+    AIR = 1
+    SEA = 2
+
+
+# algorytm wyszukiwania trasy dla pojedynczej pary węzłów
+class SearchStrategy(str, Enum):
+    DIJKSTRA = "dijkstra"
+    BIDIRECTIONAL = "bidirectional"
+    CONTRACTION_HIERARCHY = "contraction_hierarchy"
+    OVERLAY = "overlay"
+    HUB_TABLE = "hub_table"
+
+
+class NodeOrder(str, Enum):
+    INPUT = "input"
+    HILBERT = "hilbert"
+    REVERSE_CUTHILL_MCKEE = "rcm"
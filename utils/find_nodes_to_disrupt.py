@@ -42,8 +42,7 @@ def find_nodes_to_disrupt(graph, deliveries, max_depth):
 
     route_nodes = []
     for delivery in deliveries:
-        if delivery.route:
-            route_nodes.extend(delivery.route)
+        route_nodes.extend(delivery.route)
 
     if not route_nodes:
         print("⚠️ No routes found.")
@@ -85,6 +85,49 @@ def convert_speed(data: str | list | int | float | None, output_type: str = "flo
         return None
 
 
+def parse_maxspeed(ms: str | float | list | None) -> float | None:
+    """
+    ms może być: int/float, string ('50', '50 mph', '50;70'), list ['50','70'] itd.
+    Zwraca speed w km/h lub None jeśli nie da się sparsować.
+    """
+    if ms is None:
+        return None
+
+    if isinstance(ms, (int, float)):
+        return float(ms)
+
+    if isinstance(ms, (list, tuple)):
+        vals = [parse_maxspeed(x) for x in ms]
+        valid_vals = [v for v in vals if v is not None]
+        return max(valid_vals) if valid_vals else None
+
+    if isinstance(ms, str):
+        s = ms.strip().lower()
+        s = s.replace("[", "").replace("]", "").replace(
+            "(", "").replace(")", "").replace(" ", "")
+
+        def get_num(val_str):
+            try:
+                return float(''.join(c for c in val_str if (c.isdigit() or c == '.')))
+            except ValueError:
+                return None
+
+        is_mph = "mph" in s
+
+        for sep in [";", ",", "|"]:
+            if sep in s:
+                parts = [get_num(p) for p in s.split(sep) if p]
+                valid = [p for p in parts if p is not None]
+                val = max(valid) if valid else None
+                return val * 1.60934 if (val and is_mph) else val
+
+        val = get_num(s)
+        if val is not None:
+            return val * 1.60934 if is_mph else val
+
+    return None
+
+
 def normalize_country(country: str) -> str:
     country = country.replace("ł", "l").replace("Ł", "L")
 